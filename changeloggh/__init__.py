@@ -1,3 +1 @@
-from importlib.metadata import version
-
-__version__ = VERSION = version("changeloggh")
+__version__ = VERSION = "1.2.0"
@@ -0,0 +1,57 @@
+import os
+from pathlib import Path
+
+from changeloggh.file_utils import write_atomic
+
+CACHE_DIR_ENV = "CHANGELOGGH_CACHE_DIR"
+
+
+def cache_dir(name: str) -> Path | None:
+    """
+    Returns the on-disk cache directory for `name`, creating it if needed.
+    On-disk caches are opt-in, they are disabled unless CHANGELOGGH_CACHE_DIR is set.
+    """
+    root = os.environ.get(CACHE_DIR_ENV)
+    if not root:
+        return None
+
+    path = Path(root) / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def cache_get(name: str, key: str) -> bytes | None:
+    directory = cache_dir(name)
+    if directory is None:
+        return None
+
+    path = directory / key
+    try:
+        content = path.read_bytes()
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+
+    return content
+
+
+def cache_put(name: str, key: str, content: bytes, max_entries: int):
+    """
+    Stores an entry and removes the least recently used ones beyond `max_entries`.
+    """
+    directory = cache_dir(name)
+    if directory is None:
+        return
+
+    write_atomic(str(directory / key), content)
+
+    entries = []
+    for path in directory.iterdir():
+        try:
+            if not path.name.startswith("."):
+                entries.append((path.stat().st_mtime_ns, path))
+        except FileNotFoundError:
+            pass
+
+    for _, path in sorted(entries, reverse=True)[max_entries:]:
+        path.unlink(missing_ok=True)
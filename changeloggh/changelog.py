@@ -1,37 +1,109 @@
 import json
+import os
+import re
+import sys
 from datetime import date
+from contextlib import contextmanager
 from enum import Enum
-from typing import List, Any
-
-from jinja2 import Environment
-from semver import VersionInfo
-
+from functools import cache
+from itertools import chain, islice
+from typing import List, Any, Iterable, Iterator, TextIO
+
+from changeloggh import VERSION
+from changeloggh.cache_utils import cache_dir, cache_get, cache_put
+from changeloggh.file_utils import write_atomic, write_if_changed, file_lock
+from changeloggh.json_utils import JsonStreamReader
+from changeloggh.markdown_utils import (
+    CHANGE_TOKEN,
+    CONTINUATION_TOKEN,
+    ENTRY_TOKEN,
+    LINK_TOKEN,
+    TEXT_TOKEN,
+    VERSION_TOKEN,
+    repository_from_link,
+    tokenize,
+)
 from changeloggh.url_utils import url_join
-from changeloggh.version_utils import version_comparator, change_comparator
+from changeloggh.version_utils import (
+    bisect_versions,
+    change_key,
+    change_type_key,
+    insert_version,
+    is_unreleased,
+    normalize_version,
+    sort_versions,
+    UNRELEASED,
+    version_key,
+    version_range,
+)
 
 JSON_INDENT = 2
 CHANGELOG_PATH = "./CHANGELOG.md"
 CHANGELOG_LOCK_PATH = "./changelog.lock"
+CHANGELOG_JOURNAL_PATH = "./changelog.journal"
+CHANGELOG_SHARDS_PATH = "./changelog.d"
+CHANGELOG_MANIFEST_PATH = f"{CHANGELOG_SHARDS_PATH}/manifest.json"
+CHANGELOG_FRAGMENTS_PATH = "./changelog.unreleased"
+CHANGELOG_INDEX_PATH = "./changelog.index"
+FRAGMENT_WORKERS = 8
+FRAGMENT_CHUNK = 512
+PARSE_CHUNK_SIZE = 8 * 1024 * 1024
+CHANGELOG_STATE_PATH = "./.changeloggh"
+CHANGELOG_MUTEX_PATH = f"{CHANGELOG_STATE_PATH}/mutex"
+CHANGELOG_QUEUE_PATH = f"{CHANGELOG_STATE_PATH}/queue"
+CHANGELOG_RENDER_PATH = f"{CHANGELOG_STATE_PATH}/render.json"
+MODEL_CACHE_NAME = "model"
+MODEL_CACHE_SIZE = 8
+# Changes when the pickled model changes its shape
+MODEL_CACHE_FORMAT = 5
+FRAGMENT_CACHE_NAME = "fragments"
+FRAGMENT_CACHE_SIZE = 8
+JINJA_TEMPLATE_NAME = "CHANGELOG.md"
 JINJA_TEMPLATE = """
+{% macro header() %}
 # Changelog
 
 All notable changes to this project will be documented in this file.
 
 The format is based on [Keep a Changelog](https://keepachangelog.com/en/1.1.0/),
 and this project adheres to [Semantic Versioning](https://semver.org/spec/v2.0.0.html).
-{% if versions %}{% for version in versions %}
+{% endmacro %}{% macro section(version) %}
 ## {{version}}
 {% if version.changes %}{% for change in version.changes %}
 ### {{change}}
 {% if change.entries %}{% for item in change.entries %}
 - {{item}}{% endfor %}
-{% endif %}{% endfor %}{% endif %}{% endfor %}{% endif %}
+{% endif %}{% endfor %}{% endif %}{% endmacro %}{{ header() }}
+{%- for version in versions or [] %}{{ section(version) }}{% endfor %}
 {% for link in links %}{{link}}
 {% endfor %}
 """
+TAIL_PLACEHOLDER = "\0tail\0"
+# Start of every version object in the raw json of a partial load
+TAIL_VERSION_PATTERN = re.compile(r'\{\s*"version"\s*:\s*("[^"\\]*(?:\\.[^"\\]*)*")')
+# End of the raw json of a partial load when no key follows the versions
+TAIL_END_PATTERN = re.compile(r"\}\s*\]\s*\}\s*$")
+
+
+@cache
+def changelog_template():
+    """
+    Compiles JINJA_TEMPLATE once per process, every render path shares it.
+    If CHANGELOGGH_CACHE_DIR is set the compiled bytecode is also cached on disk.
+    """
+    from jinja2 import DictLoader, Environment, FileSystemBytecodeCache
+
+    bytecode_dir = cache_dir("jinja")
+    env = Environment(
+        loader=DictLoader({JINJA_TEMPLATE_NAME: JINJA_TEMPLATE}),
+        bytecode_cache=FileSystemBytecodeCache(str(bytecode_dir)) if bytecode_dir else None,
+    )
+    return env.get_template(JINJA_TEMPLATE_NAME)
 
 
 class Link:
+    __slots__ = ("version", "repository", "path")
+
     def __init__(self, version: str = "", repository: str = "", path: str = ""):
         self.version = version
         self.repository = repository
@@ -62,9 +134,19 @@ class BumpRule(Enum):
     patch = "patch"
 
 
+class Storage(Enum):
+    lock = "lock"
+    journal = "journal"
+    sharded = "sharded"
+    fragments = "fragments"
+
+
 class Change:
+    __slots__ = ("change_type", "entries")
+
     def __init__(self, change_type: str = "", entries: List[str] | None = None):
-        self.change_type = change_type
+        # There are only a few change types, every change shares the same string
+        self.change_type = sys.intern(change_type) if isinstance(change_type, str) else change_type
         self.entries = entries
 
     def __eq__(self, other):
@@ -75,7 +157,7 @@ class Change:
         if self.change_type:
             change_dict["type"] = self.change_type
         if self.entries:
-            change_dict["entries"] = self.entries
+            change_dict["entries"] = list(self.entries)
         return change_dict
 
     def __str__(self):
@@ -89,6 +171,15 @@ class Change:
 
 
 class Version:
+    """
+    Released versions never change, their changes and entries are frozen into tuples,
+    so they take less memory and copies of the changelog share them.
+    Unreleased keeps its changes by type in `buckets` and its normalized entries in `seen`,
+    see add().
+    """
+
+    __slots__ = ("version", "release_date", "changes", "buckets", "seen", "_sort_key")
+
     def __init__(
         self,
         version: str = "",
@@ -98,13 +189,81 @@ class Version:
         self.release_date = release_date
         self.changes = changes
         self.version = version
+        self.buckets: dict[str, Change] | None = None
+        self.seen: set[tuple[str, str]] | None = None
+        self._sort_key = None
+
+        if self.frozen:
+            for change in changes or []:
+                change.entries = tuple(change.entries) if change.entries else None
+            self.changes = tuple(sorted(changes, key=change_key)) if changes else None
+            return
 
         if self.changes:
-            self.changes.sort(key=change_comparator())
+            self.changes.sort(key=change_key)
+
+        self.buckets = {}
+        self.seen = set()
+        for change in self.changes or []:
+            self.buckets.setdefault(change.change_type, change)
+            self.seen.update(
+                (change.change_type, normalize_entry(entry)) for entry in change.entries or []
+            )
+
+    @property
+    def sort_key(self) -> tuple:
+        """
+        Parsed on first use, see version_key().
+        """
+        if self._sort_key is None:
+            self._sort_key = version_key(self.version)
+        return self._sort_key
+
+    @property
+    def frozen(self) -> bool:
+        return bool(self.version) and not is_unreleased(self.version)
 
     def __eq__(self, other):
         return self.version == other.version
 
+    def __deepcopy__(self, memo):
+        if self.frozen:
+            return self
+
+        import copy
+
+        return Version(self.version, self.release_date, copy.deepcopy(self.changes, memo))
+
+    def add(self, change_type: str, entry: str) -> bool:
+        """
+        Appends an entry to the bucket of its change type. Only a new type is inserted
+        in the sorted changes, any type is kept, ex.: a custom type from an imported markdown.
+        Returns False if the entry is there already, ex.: a retried ci job.
+        """
+        key = (change_type, normalize_entry(entry))
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+
+        change = self.buckets.get(change_type)
+        if change is None:
+            from bisect import insort
+
+            change = self.buckets[change_type] = Change(change_type, [])
+            if self.changes is None:
+                self.changes = []
+            insort(self.changes, change, key=change_key)
+
+        if change.entries is None:
+            change.entries = []
+        change.entries.append(entry)
+        return True
+
+    def clear(self):
+        self.changes = None
+        self.buckets = {}
+        self.seen = set()
+
     def to_dict(self):
         version_dict = {}
         if self.version:
@@ -118,6 +277,20 @@ class Version:
     def __str__(self):
         return self.to_string()
 
+    def fingerprint(self) -> str:
+        """
+        Hash of everything that is rendered for this version.
+        """
+        return fingerprint(
+            "\0".join(
+                [self.version, self.release_date or ""]
+                + [
+                    f"{change.change_type}\1" + "\1".join(change.entries or [])
+                    for change in self.changes or []
+                ]
+            )
+        )
+
     def to_string(self):
         if self.version:
             return (
@@ -130,97 +303,558 @@ class Version:
 
 
 class Changelog:
-    def __init__(self, repository: str = "", versions: List[Version] | None = None):
+    def __init__(
+        self,
+        repository: str = "",
+        versions: List[Version] | None = None,
+        storage: Storage = Storage.lock,
+    ):
         self.repository = repository
         self.versions = versions
+        self.storage = storage
+        self.operations = []
+        # First version that load_changelog did not parse, see materialize()
+        self.tail_version: str | None = None
+        # Raw json of the versions that were not parsed from changelog.lock
+        self.tail: str | None = None
+        # Versions in changelog.d/manifest.json with the sharded storage
+        self.shards: List[str] | None = None
+        # Fragment files collected into Unreleased, they are removed once it is saved
+        self.fragments: List[str] = []
+        # Loaded versions by normalized version, see find()
+        self.index: dict[str, Version] = {}
+        # storage_stat() when it was loaded, see search.update_index()
+        self.stamp: list | None = None
+        # Links of a subset computed from the whole changelog, see select()
+        self.selected_links: List[Link] | None = None
 
         if self.versions:
-            self.versions.sort(key=version_comparator())
+            sort_versions(self.versions)
+        self.reindex()
 
     def __str__(self):
         return self.to_string()
 
     def to_string(self):
+        """
+        Same output as rendering JINJA_TEMPLATE, but every section and the links block are
+        taken from the fragment cache when their content did not change.
+        """
+        if self.selected_links is not None:
+            return self.subset_to_string()
+
+        self.materialize()
+        template = changelog_template().module
+        cached = fragment_cache()
+        fragments = {}
+        sections = []
+
+        for version in self.versions or []:
+            key = version.fingerprint()
+            fragments[key] = cached.get(key) or str(template.section(version))
+            sections.append(fragments[key])
+
+        key = fingerprint(
+            "\n".join([self.repository] + [version.version for version in self.versions or []])
+        )
+        fragments[key] = cached.get(key) or "".join(
+            f"{link}\n" for link in self.links(self.versions)
+        )
+
+        save_fragment_cache(fragments)
+        return (str(template.header()) + "".join(sections) + "\n" + fragments[key]).strip()
+
+    def subset_to_string(self):
+        """
+        A subset is rendered without the fragment cache, so it does not evict CHANGELOG.md.
+        """
+        template = changelog_template().module
+        return (
+            str(template.header())
+            + "".join(str(template.section(version)) for version in self.versions or [])
+            + "\n"
+            + "".join(f"{link}\n" for link in self.selected_links)
+        ).strip()
+
+    def links(self, versions: List[Version] | None) -> List[Link]:
         links = []
 
-        if self.versions and len(self.versions) > 1 and self.repository:
-            for index, version in enumerate(self.versions[:-1]):
-                previous_tag = f"v{self.versions[index + 1].version}"
-                current_tag = f"v{version.version}"
+        if versions and len(versions) > 1 and self.repository:
+            for index, version in enumerate(versions):
+                previous = versions[index + 1].version if index + 1 < len(versions) else None
+                links.append(self.link(version.version, previous, index == 0))
 
-                if index == 0:
-                    current_tag = "HEAD"
+        return links
 
-                links.append(
-                    Link(
-                        version.version, self.repository, f"/compare/{previous_tag}...{current_tag}"
-                    )
-                )
+    def link(self, version: str, previous: str | None, head: bool = False) -> Link:
+        """
+        Compares a version with the previous one, the newest version with HEAD.
+        The first version links to its release.
+        """
+        if previous is None:
+            return Link(version, self.repository, f"/releases/tag/v{version}")
 
-            first_version = self.versions[-1]
-            links.append(
-                Link(
-                    first_version.version,
-                    self.repository,
-                    f"/releases/tag/v{first_version.version}",
-                )
-            )
+        current_tag = "HEAD" if head else f"v{version}"
+        return Link(version, self.repository, f"/compare/v{previous}...{current_tag}")
 
-        env = Environment()
-        template = env.from_string(JINJA_TEMPLATE)
-        return template.render(versions=self.versions, links=links).strip()
+    def select(
+        self,
+        limit: int | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        types: List[str] | None = None,
+    ) -> "Changelog":
+        """
+        Subset of the versions from since up to until, both included, with only the changes of
+        the given types, the newest `limit` of them. The newest version is found with a binary
+        search and the versions that were not loaded are parsed only until the subset is complete,
+        so only the subset is rendered and only its links are computed.
+        """
+        if limit is None and since is None and until is None and not types:
+            return self
+
+        oldest = version_key(normalize_version(since)) if since else None
+        newest = version_key(normalize_version(until)) if until else None
+        if oldest is not None and newest is not None and oldest > newest:
+            raise Exception(f"Version {since} is newer than {until}")
+
+        versions = self.versions or []
+        start = 0 if newest is None else bisect_versions(versions, newest, after_equal=False)
+        candidates = chain(islice(versions, start, None), self.unloaded_versions(newest))
+        keys = {change_type_key(change_type) for change_type in types or []}
+        with_links = self.repository and (len(versions) > 1 or self.tail_version is not None)
+        head = versions[0] if versions else None
+
+        selected = []
+        links = []
+        # Selected version that is linked with the next one, ex.: /compare/v1.0.0...v1.1.0
+        pending: Version | None = None
+        for version in candidates:
+            if pending is not None:
+                links.append(self.link(pending.version, version.version, pending is head))
+                pending = None
+            if oldest is not None and version.sort_key < oldest:
+                break
+            if limit is not None and len(selected) == limit:
+                break
+
+            if keys:
+                changes = [
+                    Change(change.change_type, list(change.entries or []))
+                    for change in version.changes or []
+                    if change_type_key(change.change_type) in keys
+                ]
+                if not changes:
+                    continue
+                selected.append(Version(version.version, version.release_date, changes))
+            else:
+                selected.append(version)
+            pending = version
+
+        if pending is not None:
+            links.append(self.link(pending.version, None))
+
+        subset = Changelog(self.repository, selected, self.storage)
+        subset.selected_links = links if with_links else []
+        return subset
+
+    def unloaded_versions(self, newest: tuple | None = None) -> Iterator[Version]:
+        """
+        Versions that a partial load did not parse, from the newest to the oldest.
+        They are parsed one at a time, the ones newer than `newest` are skipped.
+        """
+        if self.tail is not None:
+            decoder = json.JSONDecoder(object_hook=json_to_changelog)
+            for match in TAIL_VERSION_PATTERN.finditer(self.tail):
+                if newest is None or version_key(json.loads(match[1])) <= newest:
+                    yield decoder.raw_decode(self.tail, match.start())[0]
+        else:
+            for name in self.unloaded_shards():
+                if newest is None or version_key(name) <= newest:
+                    yield read_shard(name)
 
     def to_json(self, indent: int = None):
+        if self.tail is not None and indent == JSON_INDENT:
+            changelog_dict = self.head_to_dict()
+            changelog_dict.setdefault("versions", []).append(TAIL_PLACEHOLDER)
+            content = json.dumps(changelog_dict, indent=indent)
+            return content[: content.rindex(json.dumps(TAIL_PLACEHOLDER))] + self.tail
+
         return json.dumps(self.to_dict(), indent=indent)
 
-    def save(self):
-        with open(CHANGELOG_PATH, "w") as file:
-            file.write(self.to_string())
+    def materialize(self):
+        """
+        Parses the versions that a partial load left as raw json or in their shards.
+        """
+        if self.tail_version is None:
+            return
 
-        with open(CHANGELOG_LOCK_PATH, "w") as file:
-            file.write(self.to_json(indent=JSON_INDENT))
+        if self.tail is not None:
+            tail = json.loads('{"versions": [' + self.tail, object_hook=json_to_changelog)
+            versions = tail.versions or []
+        else:
+            versions = [read_shard(name) for name in self.unloaded_shards()]
+
+        self.versions = (self.versions or []) + versions
+        sort_versions(self.versions)
+        self.reindex()
+        self.tail = None
+        self.tail_version = None
+
+    def reindex(self):
+        self.index = {
+            normalize_version(version.version): version for version in self.versions or []
+        }
+
+    def find(self, version: str) -> Version | None:
+        """
+        Looks up a version in the index, a version that was not loaded is parsed on its own
+        from the raw json or from its shard.
+        """
+        key = normalize_version(version)
+        if key in self.index:
+            return self.index[key]
+
+        if self.tail is not None:
+            decoder = json.JSONDecoder(object_hook=json_to_changelog)
+            for match in TAIL_VERSION_PATTERN.finditer(self.tail):
+                if normalize_version(json.loads(match[1])) == key:
+                    return decoder.raw_decode(self.tail, match.start())[0]
+
+        for name in self.unloaded_shards():
+            if normalize_version(name) == key:
+                return read_shard(name)
+
+        return None
+
+    def show(self, version: str, format: str = "text") -> str:
+        """
+        Renders a single version, as a CHANGELOG.md section or as json.
+        """
+        found = self.find(version)
+        if found is None:
+            raise Exception(f"Version {version} does not exist")
+
+        if format == "json":
+            return json.dumps(found.to_dict())
+        return str(changelog_template().module.section(found)).strip()
+
+    def between(self, from_version: str, to_version: str) -> List[Version]:
+        """
+        Versions newer than from_version up to to_version, ex.: the versions of an upgrade
+        from 1.0.5 to 1.2.0. The loaded versions are found with a binary search, the ones
+        that were not loaded are parsed only if they are in the range.
+        """
+        keys = []
+        for version in [from_version, to_version]:
+            found = self.find(version)
+            if found is None:
+                raise Exception(f"Version {version} does not exist")
+            keys.append(found.sort_key)
+
+        if keys[0] > keys[1]:
+            raise Exception(f"Version {from_version} is newer than {to_version}")
+
+        versions = (self.versions or [])[version_range(self.versions or [], *keys)]
+        if self.tail_version is not None and keys[0] < version_key(self.tail_version):
+            versions += self.unloaded_between(*keys)
+        return versions
+
+    def unloaded_between(self, oldest: tuple, newest: tuple) -> List[Version]:
+        """
+        Versions that were not loaded with a sort key after oldest up to newest,
+        the raw json is scanned from the newest version and only the ones in the range are parsed.
+        """
+        if self.tail is None:
+            return [
+                read_shard(name)
+                for name in self.unloaded_shards()
+                if oldest < version_key(name) <= newest
+            ]
+
+        versions = []
+        decoder = json.JSONDecoder(object_hook=json_to_changelog)
+        for match in TAIL_VERSION_PATTERN.finditer(self.tail):
+            key = version_key(json.loads(match[1]))
+            if key <= oldest:
+                break
+            if key <= newest:
+                versions.append(decoder.raw_decode(self.tail, match.start())[0])
+        return versions
+
+    def diff(self, from_version: str, to_version: str, format: str = "markdown") -> str:
+        """
+        Renders the changes between two versions merged by change type,
+        as a CHANGELOG.md section, as text or as json.
+        """
+        versions = self.between(from_version, to_version)
+        changes = merge_changes(versions)
+
+        match format:
+            case "json":
+                return json.dumps(
+                    {
+                        "from": from_version,
+                        "to": to_version,
+                        "versions": [version.version for version in versions],
+                        "changes": [change.to_dict() for change in changes],
+                    }
+                )
+            case "text":
+                return "\n".join(
+                    f"{change}: {entry}" for change in changes for entry in change.entries
+                )
+            case _:
+                return "\n\n".join(
+                    [f"## [{from_version}...{to_version}]"]
+                    + [
+                        f"### {change}\n\n" + "\n".join(f"- {entry}" for entry in change.entries)
+                        for change in changes
+                    ]
+                )
 
-    def add(self, change_type: ChangeType, entry: str):
-        if self.versions is None:
-            self.versions = []
+    def unloaded_shards(self) -> List[str]:
+        if self.tail_version is None or not self.shards:
+            return []
+
+        loaded = {version.version for version in self.versions or []}
+        return [name for name in self.shards if name not in loaded]
+
+    def save(self) -> list[str]:
+        """
+        With the journal storage only the pending operations are appended to the journal,
+        otherwise both files are rewritten if their content changed.
+        Returns the paths that were written.
+        """
+        if self.storage == Storage.journal:
+            return self.save_journal()
+        else:
+            return self.save_snapshot()
+
+    def save_markdown(self) -> list[str]:
+        written = self.write_markdown()
+        save_render_state(self.storage)
+        return written
+
+    def write_markdown(self) -> list[str]:
+        """
+        The sections of the unparsed versions are copied from CHANGELOG.md only if it was
+        rendered from the storage as it is on disk, otherwise every version is rendered.
+        """
+        content = None
+        if self.tail_version is not None and os.path.exists(CHANGELOG_PATH):
+            with open(CHANGELOG_PATH, "r") as file:
+                markdown = file.read()
+            if render_state(self.storage, markdown) == load_render_state():
+                content = self.splice_markdown(markdown)
+
+        if content is None and self.tail_version is not None:
+            # The unparsed versions stay as they are, so changelog.lock is written back as is
+            versions = (self.versions or []) + list(self.unloaded_versions())
+            content = Changelog(self.repository, versions, self.storage).to_string()
+
+        if write_if_changed(CHANGELOG_PATH, content if content is not None else self.to_string()):
+            return [CHANGELOG_PATH]
+        return []
+
+    def splice_markdown(self, markdown: str) -> str | None:
+        """
+        Renders the loaded versions and copies the sections and links of the unparsed ones
+        from the current markdown. Returns None if they can not be found there.
+        """
+        tail_version = Version(self.tail_version)
+        title = f"\n## {tail_version.to_string()}"
+        section_start = markdown.find(title)
+        if section_start < 0 or markdown[section_start + len(title) :][:1] not in ["", " ", "\n"]:
+            return None
 
-        if len(self.versions) == 0 or (
-            len(self.versions) == 1 and self.versions[0].version != "Unreleased"
-        ):
-            self.versions.append(Version("Unreleased"))
-            self.versions.sort(key=version_comparator())
+        template = changelog_template().module
+        head = template.header().lstrip() + "".join(
+            str(template.section(version)) for version in self.versions or []
+        )
 
-        unreleased_version = self.versions[0]
+        links_start = markdown.find("\n[", section_start) + 1
+        if not self.repository:
+            return None if links_start else head + markdown[section_start:]
 
-        if unreleased_version.changes is None:
-            unreleased_version.changes = []
+        tail_link = markdown.find(
+            f"\n[{tail_version.version.capitalize().strip()}]: ", section_start
+        )
+        if not links_start or tail_link < links_start - 1:
+            return None
 
-        for change in unreleased_version.changes:
-            if change.change_type is not None and change.change_type == change_type.value:
-                if change.entries is None:
-                    change.entries = []
-                change.entries.append(entry)
-                break
+        links = self.links((self.versions or []) + [tail_version])[:-1]
+        return (
+            head
+            + markdown[section_start:links_start]
+            + "".join(f"{link}\n" for link in links)
+            + markdown[tail_link + 1 :]
+        )
+
+    def save_journal(self) -> list[str]:
+        written = []
+        if self.operations:
+            with open(CHANGELOG_JOURNAL_PATH, "a") as file:
+                file.write("".join(json.dumps(operation) + "\n" for operation in self.operations))
+            written.append(CHANGELOG_JOURNAL_PATH)
+
+        self.operations = []
+        self.update_search_index(written)
+        return written
+
+    def save_snapshot(self) -> list[str]:
+        """
+        Rewrites both files and folds the journal into changelog.lock.
+        """
+        if self.storage == Storage.sharded:
+            return self.save_shards()
+
+        written = self.write_markdown()
+        content = self.to_json(indent=JSON_INDENT)
+        if write_if_changed(CHANGELOG_LOCK_PATH, content):
+            written.append(CHANGELOG_LOCK_PATH)
+
+        if os.path.exists(CHANGELOG_JOURNAL_PATH):
+            os.remove(CHANGELOG_JOURNAL_PATH)
+
+        for path in self.fragments:
+            os.remove(path)
+
+        self.fragments = []
+        self.operations = []
+
+        if CHANGELOG_LOCK_PATH in written and self.tail is None and cache_dir(MODEL_CACHE_NAME):
+            save_model(model_key(content.encode(), os.stat(CHANGELOG_LOCK_PATH)), self)
+
+        save_render_state(self.storage)
+        self.update_search_index(written)
+        return written
+
+    def save_shards(self) -> list[str]:
+        """
+        Writes the shards of the loaded versions that changed, the manifest and
+        a changelog.lock without versions. Shards that were not loaded are not touched.
+        """
+        written = self.write_markdown()
+        os.makedirs(CHANGELOG_SHARDS_PATH, exist_ok=True)
+        names = [version.version for version in self.versions or []] + self.unloaded_shards()
+
+        for version in self.versions or []:
+            path = shard_path(version.version)
+            if write_if_changed(path, json.dumps(version.to_dict(), indent=JSON_INDENT)):
+                written.append(path)
+
+        manifest = json.dumps({"versions": names}, indent=JSON_INDENT)
+        if write_if_changed(CHANGELOG_MANIFEST_PATH, manifest):
+            written.append(CHANGELOG_MANIFEST_PATH)
+
+        for name in set(self.shards or []) - set(names):
+            if os.path.exists(shard_path(name)):
+                os.remove(shard_path(name))
+
+        lock = json.dumps(self.settings_to_dict(), indent=JSON_INDENT)
+        if write_if_changed(CHANGELOG_LOCK_PATH, lock):
+            written.append(CHANGELOG_LOCK_PATH)
+
+        self.shards = names
+        self.operations = []
+        save_render_state(self.storage)
+        self.update_search_index(written)
+        return written
+
+    def update_search_index(self, written: list[str]):
+        """
+        Once "search" created changelog.index, every save that writes something updates it.
+        """
+        if written and os.path.exists(CHANGELOG_INDEX_PATH):
+            from changeloggh.search import update_index
+
+            update_index(self)
+
+    @property
+    def dirty(self) -> bool:
+        """
+        Whether the model has changes that are not saved.
+        """
+        return bool(self.operations)
+
+    def record(self, operation: dict[str, Any]):
+        last = self.operations[-1] if self.operations else {}
+        if "entries" in operation and last.get("command") == operation["command"]:
+            last["entries"].extend(operation["entries"])
         else:
-            unreleased_version.changes.append(Change(change_type.value, [entry]))
+            self.operations.append(operation)
 
-        unreleased_version.changes.sort(key=change_comparator())
+    def add(self, change_type: ChangeType, entry: str):
+        if self.versions is None:
+            self.versions = []
+
+        # Released versions are frozen, new entries always go to Unreleased
+        if len(self.versions) == 0 or not is_unreleased(self.versions[0].version):
+            self.versions.insert(0, Version(UNRELEASED))
+            self.index[normalize_version(UNRELEASED)] = self.versions[0]
+
+        if self.versions[0].add(change_type.value, entry):
+            self.record({"command": change_type.name.lower(), "entries": [entry]})
+
+    def dedupe(self) -> int:
+        """
+        Removes the entries that are repeated in the same version and change type,
+        the first one is kept. Returns how many were removed.
+        """
+        self.materialize()
+        removed = 0
+
+        for position, version in enumerate(self.versions or []):
+            seen = set()
+            changes = []
+            duplicates = 0
+            for change in version.changes or []:
+                entries = []
+                for entry in change.entries or []:
+                    key = (change.change_type, normalize_entry(entry))
+                    if key in seen:
+                        duplicates += 1
+                    else:
+                        seen.add(key)
+                        entries.append(entry)
+                changes.append(Change(change.change_type, entries or None))
+
+            if duplicates:
+                removed += duplicates
+                self.versions[position] = Version(version.version, version.release_date, changes)
+
+        self.reindex()
+        return removed
 
     def to_dict(self):
+        self.materialize()
+        return self.head_to_dict()
+
+    def head_to_dict(self):
+        changelog_dict = self.settings_to_dict()
+        if self.versions:
+            changelog_dict["versions"] = [version.to_dict() for version in self.versions]
+        return changelog_dict
+
+    def settings_to_dict(self):
         changelog_dict = {}
         if self.repository:
             changelog_dict["repository"] = self.repository
-        if self.versions:
-            changelog_dict["versions"] = [version.to_dict() for version in self.versions]
+        if self.storage != Storage.lock:
+            changelog_dict["storage"] = self.storage.value
         return changelog_dict
 
     def latest(self):
+        if self.tail_version is not None and len(self.versions or []) < 2:
+            self.materialize()
+
         if not self.versions or (
-            len(self.versions) == 1 and self.versions[0].version == "Unreleased"
+            len(self.versions) == 1 and is_unreleased(self.versions[0].version)
         ):
             return "0.0.0"
 
-        if len(self.versions) == 1 and self.versions[0].version != "Unreleased":
+        if len(self.versions) == 1:
             return self.versions[0].version
 
         return self.versions[1].version
@@ -229,13 +863,11 @@ class Changelog:
         if not self.versions:
             raise Exception("There are not available versions")
 
-        if (
-            not self.versions[0].changes
-            or not self.versions[0].version
-            or self.versions[0].version != "Unreleased"
-        ):
+        if not self.versions[0].changes or not is_unreleased(self.versions[0].version):
             raise Exception("There are not available changes")
 
+        from semver import VersionInfo
+
         semver = VersionInfo.parse(self.latest())
 
         match rule:
@@ -246,81 +878,793 @@ class Changelog:
             case BumpRule.patch:
                 semver = semver.bump_patch()
 
-        self.versions.append(Version(str(semver), str(date.today()), self.versions[0].changes))
-        self.versions[0].changes = None
-        self.versions.sort(key=version_comparator())
-
-        return str(semver)
+        return self.release(str(semver))
 
-    def release(self, version: str):
+    def release(self, version: str, release_date: str | None = None):
         if not self.versions:
             raise Exception("There are not available versions")
 
-        if (
-            not self.versions[0].changes
-            or not self.versions[0].version
-            or self.versions[0].version != "Unreleased"
-        ):
+        if not self.versions[0].changes or not is_unreleased(self.versions[0].version):
             raise Exception("There are not available changes")
 
-        for inner_version in self.versions:
-            if inner_version.version == version:
-                raise Exception(f"Version {version} exists already")
+        if normalize_version(version) in self.index:
+            raise Exception(f"Version {version} exists already")
+
+        if self.tail is not None and re.search(
+            rf'"version"\s*:\s*{re.escape(json.dumps(version))}', self.tail
+        ):
+            raise Exception(f"Version {version} exists already")
+
+        if version in self.unloaded_shards():
+            raise Exception(f"Version {version} exists already")
+
+        from semver import VersionInfo
 
         semver = VersionInfo.parse(version)
-        self.versions.append(Version(str(semver), str(date.today()), self.versions[0].changes))
-        self.versions[0].changes = None
-        self.versions.sort(key=version_comparator())
+        if self.tail_version is not None and version_key(str(semver)) < version_key(
+            self.tail_version
+        ):
+            self.materialize()
+
+        release_date = release_date or str(date.today())
+        new_version = Version(str(semver), release_date, self.versions[0].changes)
+        insert_version(self.versions, new_version)
+        self.index[normalize_version(new_version.version)] = new_version
+        self.versions[0].clear()
+        self.record({"command": "release", "version": str(semver), "date": release_date})
         return str(semver)
 
+    def apply(self, operation: dict[str, Any]):
+        """
+        Applies an operation shaped like a cli command, ex.:
+        {"command": "fixed", "entries": ["Fix panel size"]}, {"command": "bump", "rule": "patch"}
+        or {"command": "release", "version": "1.0.0"}.
+        """
+        command = operation.get("command", "")
+
+        match command:
+            case "bump" if operation.get("rule") in BumpRule.__members__:
+                return self.bump(BumpRule[operation["rule"]])
+            case "bump":
+                raise Exception(f"Invalid bump rule {operation.get('rule')}")
+            case "release":
+                return self.release(operation.get("version", ""), operation.get("date"))
+            case _ if command.capitalize() in ChangeType.__members__:
+                for entry in operation.get("entries", []):
+                    self.add(ChangeType[command.capitalize()], entry)
+                return None
+            case _:
+                raise Exception(f"Unknown command {command}")
+
+    def apply_all(self, operations: Iterable[dict[str, Any]]) -> list[str | None]:
+        """
+        Applies many operations, ex.: the lines of a batch file or of the journal.
+        """
+        operations = list(operations)
+        results = []
+        for number, operation in enumerate(operations, start=1):
+            try:
+                results.append(self.apply(operation))
+            except Exception as ex:
+                if len(operations) == 1:
+                    raise
+                raise Exception(f"Operation {number} failed: {ex}")
+        return results
+
+
+def fingerprint(content: str) -> str:
+    import hashlib
+
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
+def merge_changes(versions: Iterable[Version]) -> List[Change]:
+    """
+    Entries of many versions by change type, in the order of the versions.
+    """
+    merged: dict[str, Change] = {}
+    for version in versions:
+        for change in version.changes or []:
+            if change.entries:
+                merged.setdefault(
+                    change.change_type, Change(change.change_type, [])
+                ).entries.extend(change.entries)
+    return sorted(merged.values(), key=change_key)
+
+
+def normalize_entry(entry: str) -> str:
+    """
+    Entries that only differ in case or whitespace are the same entry.
+    """
+    return " ".join(entry.split()).casefold()
+
+
+@cache
+def fragment_cache() -> dict[str, str]:
+    """
+    Rendered fragments of the last CHANGELOG.md by content hash. It lives for the process and,
+    if CHANGELOGGH_CACHE_DIR is set, it is loaded from disk once.
+    """
+    content = cache_get(FRAGMENT_CACHE_NAME, fragment_cache_key())
+    try:
+        return json.loads(content) if content else {}
+    except ValueError:
+        return {}
+
+
+def fragment_cache_key() -> str:
+    """
+    One entry per working directory, a new template or package version invalidates it.
+    """
+    return f"{fingerprint(os.getcwd() + JINJA_TEMPLATE + VERSION)}.json"
+
+
+def save_fragment_cache(fragments: dict[str, str]):
+    """
+    Keeps only the fragments of the last render, so the cache does not outgrow CHANGELOG.md.
+    """
+    cached = fragment_cache()
+    if fragments.keys() == cached.keys():
+        return
+
+    cached.clear()
+    cached.update(fragments)
+    cache_put(
+        FRAGMENT_CACHE_NAME,
+        fragment_cache_key(),
+        json.dumps(fragments).encode(),
+        FRAGMENT_CACHE_SIZE,
+    )
+
+
+def json_to_changelog(obj: dict[Any, Any]):
+    if "type" in obj:
+        return Change(change_type=obj["type"], entries=obj.get("entries"))
+    if "version" in obj:
+        return Version(
+            version=obj["version"], release_date=obj.get("date"), changes=obj.get("changes")
+        )
+    if "repository" in obj or "versions" in obj or "storage" in obj:
+        return Changelog(
+            repository=obj.get("repository", ""),
+            versions=obj.get("versions"),
+            storage=Storage(obj.get("storage", Storage.lock.value)),
+        )
+    return obj
+
+
+def load_changelog(limit: int | None = None) -> Changelog:
+    """
+    With a limit only the first versions are parsed, the rest of changelog.lock is kept
+    as raw json and it is written back as is unless a command needs it.
+    """
+    stamp = storage_stat()
+    changelog = None
+
+    if cache_dir(MODEL_CACHE_NAME) is not None:
+        with open(CHANGELOG_LOCK_PATH, "rb") as file:
+            key = model_key(file.read(), os.fstat(file.fileno()))
+        changelog = load_model(key)
+
+        if changelog is None and limit is None:
+            with open(CHANGELOG_LOCK_PATH, "r") as content:
+                changelog = json.load(content, object_hook=json_to_changelog)
+            save_model(key, changelog)
+
+    if changelog is None:
+        with open(CHANGELOG_LOCK_PATH, "r") as content:
+            if limit is None:
+                changelog = json.load(content, object_hook=json_to_changelog)
+            else:
+                changelog = load_partial(content, limit)
+
+    if changelog.storage == Storage.sharded:
+        load_shards(changelog, limit)
+
+    if changelog.storage == Storage.journal and os.path.exists(CHANGELOG_JOURNAL_PATH):
+        with open(CHANGELOG_JOURNAL_PATH, "r") as journal:
+            changelog.apply_all(read_operations(journal))
+        changelog.operations = []
+
+    if changelog.storage == Storage.fragments:
+        collect_fragments(changelog)
+
+    changelog.stamp = stamp
+    return changelog
 
-def load_changelog() -> Changelog:
-    def json_to_changelog(obj: dict[Any, Any]):
-        if "type" in obj:
-            return Change(change_type=obj["type"], entries=obj.get("entries"))
-        if "version" in obj:
-            return Version(
-                version=obj["version"], release_date=obj.get("date"), changes=obj.get("changes")
-            )
-        if "repository" in obj:
-            return Changelog(repository=obj["repository"], versions=obj.get("versions"))
-        return obj
 
+def storage_stat() -> list[tuple[int, int] | None]:
+    """
+    Modification time and size of every file and directory of the storages,
+    writing a file with write_atomic() changes the stat of its directory too.
+    """
+    stats = []
+    paths = [
+        CHANGELOG_LOCK_PATH,
+        CHANGELOG_JOURNAL_PATH,
+        CHANGELOG_SHARDS_PATH,
+        CHANGELOG_FRAGMENTS_PATH,
+    ]
+    for path in paths:
+        stat = os.stat(path) if os.path.exists(path) else None
+        stats.append((stat.st_mtime_ns, stat.st_size) if stat else None)
+    return stats
+
+
+def load_storage() -> Storage:
+    """
+    Reads the storage without parsing the versions, it expects the keys in the order
+    they are saved, the storage goes before the versions.
+    """
     with open(CHANGELOG_LOCK_PATH, "r") as content:
-        changelog = json.load(content, object_hook=json_to_changelog)
+        reader = JsonStreamReader(content)
+        reader.expect("{")
+        while reader.peek() == '"':
+            key = reader.value()
+            reader.expect(":")
+            if key == "versions":
+                break
 
-    return changelog
+            value = reader.value()
+            if key == "storage":
+                return Storage(value)
+
+            if reader.expect(",}") == "}":
+                break
+
+    return Storage.lock
+
+
+def read_versions() -> Iterator[dict[str, Any]]:
+    """
+    Streams the versions of changelog.lock as dicts, one at a time and without building
+    the model. With the other storages pending changes are not in changelog.lock,
+    so the changelog is loaded.
+    """
+    if load_storage() != Storage.lock:
+        for version in load_changelog().versions or []:
+            yield version.to_dict()
+        return
+
+    with open(CHANGELOG_LOCK_PATH, "r") as content:
+        reader = JsonStreamReader(content)
+        reader.expect("{")
+        while reader.peek() == '"':
+            key = reader.value()
+            reader.expect(":")
+            if key != "versions":
+                reader.value()
+            else:
+                reader.expect("[")
+                more = reader.peek() != "]"
+                if not more:
+                    reader.expect("]")
+                while more:
+                    yield reader.value()
+                    more = reader.expect(",]") == ","
+
+            if reader.expect(",}") == "}":
+                break
+
+
+def write_fragment(operation: dict[str, Any]) -> str:
+    """
+    Saves an add operation in its own file, so concurrent writers never touch the same file.
+    """
+    import time
+
+    os.makedirs(CHANGELOG_FRAGMENTS_PATH, exist_ok=True)
+    path = (
+        f"{CHANGELOG_FRAGMENTS_PATH}/"
+        f"{time.time_ns():020d}-{os.getpid()}-{os.urandom(4).hex()}.json"
+    )
+    write_atomic(path, json.dumps(operation))
+    return path
+
+
+def read_fragment(path: str) -> dict[str, Any]:
+    with open(path, "rb") as file:
+        content = file.read()
+
+    try:
+        operation = json.loads(content)
+    except ValueError:
+        operation = None
+
+    if (
+        not isinstance(operation, dict)
+        or str(operation.get("command", "")).capitalize() not in ChangeType.__members__
+    ):
+        raise Exception(f"Fragment {path} is not a valid change")
+
+    return operation
+
+
+def read_fragments(paths: List[str]) -> List[dict[str, Any]]:
+    return [read_fragment(path) for path in paths]
+
+
+def collect_fragments(changelog: Changelog):
+    """
+    Adds the entries of every fragment to Unreleased, the files are read in parallel and
+    an entry that is there already is skipped.
+    """
+    if not os.path.isdir(CHANGELOG_FRAGMENTS_PATH):
+        return
+
+    with os.scandir(CHANGELOG_FRAGMENTS_PATH) as entries:
+        paths = sorted(
+            f"{CHANGELOG_FRAGMENTS_PATH}/{entry.name}"
+            for entry in entries
+            if entry.name.endswith(".json") and not entry.name.startswith(".")
+        )
+    if not paths:
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    chunks = [
+        paths[index : index + FRAGMENT_CHUNK] for index in range(0, len(paths), FRAGMENT_CHUNK)
+    ]
+    with ThreadPoolExecutor(max_workers=FRAGMENT_WORKERS) as executor:
+        operations = [
+            operation for chunk in executor.map(read_fragments, chunks) for operation in chunk
+        ]
+
+    for operation in operations:
+        change_type = ChangeType[operation["command"].capitalize()]
+        for entry in operation.get("entries", []):
+            changelog.add(change_type, entry)
+
+    changelog.operations = []
+    changelog.fragments = paths
+
+
+def shard_path(version: str) -> str:
+    return f"{CHANGELOG_SHARDS_PATH}/{version}.json"
+
+
+def render_state(storage: Storage, markdown: str) -> dict[str, str]:
+    """
+    Digests of CHANGELOG.md and of the files it is rendered from. Shards are not read,
+    their modification time and size are hashed instead.
+    """
+    import hashlib
+
+    source = hashlib.sha256()
+    for path in [CHANGELOG_LOCK_PATH, CHANGELOG_JOURNAL_PATH]:
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                source.update(file.read())
+        source.update(b"\0")
 
+    if storage == Storage.sharded and os.path.exists(CHANGELOG_MANIFEST_PATH):
+        with open(CHANGELOG_MANIFEST_PATH, "r") as file:
+            for name in json.load(file).get("versions", []):
+                stat = os.stat(shard_path(name)) if os.path.exists(shard_path(name)) else None
+                source.update(f"{name}:{stat and (stat.st_mtime_ns, stat.st_size)}\0".encode())
 
-def empty_changelog(repository="") -> Changelog:
-    return Changelog(repository=repository, versions=[Version(version="Unreleased")])
+    return {
+        "source": source.hexdigest(),
+        "markdown": hashlib.sha256(markdown.encode()).hexdigest(),
+    }
 
 
-def parse_changelog() -> Changelog:
-    with open(CHANGELOG_PATH, "r") as content:
-        lines = content.readlines()
+def load_render_state() -> dict[str, str] | None:
+    try:
+        with open(CHANGELOG_RENDER_PATH, "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_render_state(storage: Storage):
+    """
+    Records the files CHANGELOG.md was rendered from, see Changelog.write_markdown().
+    Like the mutex and the queue, it is kept only once the CLI created its state directory.
+    """
+    if not os.path.isdir(CHANGELOG_STATE_PATH) or not os.path.exists(CHANGELOG_PATH):
+        return
+
+    with open(CHANGELOG_PATH, "r") as file:
+        state = render_state(storage, file.read())
+    write_if_changed(CHANGELOG_RENDER_PATH, json.dumps(state, indent=JSON_INDENT))
+
+
+def read_shard(version: str) -> Version:
+    with open(shard_path(version), "r") as file:
+        return json.load(file, object_hook=json_to_changelog)
+
+
+def load_shards(changelog: Changelog, limit: int | None = None):
+    """
+    Reads the manifest and the shards of the first `limit` versions, or all of them.
+    """
+    with open(CHANGELOG_MANIFEST_PATH, "r") as file:
+        names = json.load(file).get("versions", [])
+
+    loaded = names if limit is None else names[:limit]
+    changelog.versions = [read_shard(name) for name in loaded]
+    sort_versions(changelog.versions)
+    changelog.reindex()
+    changelog.shards = names
+    changelog.tail_version = names[len(loaded)] if len(names) > len(loaded) else None
+
+
+def model_key(content: bytes, stat: os.stat_result) -> str:
+    """
+    Cache key of the parsed changelog.lock, any edit changes its content hash or its size.
+    """
+    import hashlib
+
+    digest = hashlib.sha256(content)
+    digest.update(f":{stat.st_size}:{stat.st_mtime_ns}:{VERSION}:{MODEL_CACHE_FORMAT}".encode())
+    return f"{digest.hexdigest()}.pickle"
+
+
+def load_model(key: str) -> Changelog | None:
+    import pickle
+
+    content = cache_get(MODEL_CACHE_NAME, key)
+    if content is None:
+        return None
+
+    try:
+        changelog = pickle.loads(content)
+    except Exception:
+        return None
+
+    return changelog if isinstance(changelog, Changelog) else None
+
+
+def save_model(key: str, changelog: Changelog):
+    """
+    Caches the sorted model, so the next load skips parsing and sorting it.
+    The sharded storage is not cached, its changelog.lock does not change with the versions.
+    """
+    import pickle
+
+    if changelog.storage == Storage.sharded:
+        return
+
+    cache_put(
+        MODEL_CACHE_NAME, key, pickle.dumps(changelog, pickle.HIGHEST_PROTOCOL), MODEL_CACHE_SIZE
+    )
+
+
+def load_partial(content: TextIO, limit: int) -> Changelog:
+    reader = JsonStreamReader(content, object_hook=json_to_changelog)
+    fields = {}
+    tail = None
+
+    reader.expect("{")
+    while reader.peek() != "}":
+        key = reader.value()
+        reader.expect(":")
+
+        if key != "versions":
+            fields[key] = reader.value()
+        else:
+            versions = fields["versions"] = []
+            reader.expect("[")
+            more = reader.peek() != "]"
+            if not more:
+                reader.expect("]")
+            while more:
+                if len(versions) == limit:
+                    reader.peek()
+                    tail = reader.rest()
+                    break
+                versions.append(reader.value())
+                more = reader.expect(",]") == ","
+            if tail is not None:
+                break
+
+        if reader.expect(",}") == "}":
+            break
+
+    if tail is not None and not TAIL_END_PATTERN.search(tail, max(0, len(tail) - 4096)):
+        # A lock edited by hand may have keys after the versions, they are read by a full load
+        content.seek(0)
+        return json.load(content, object_hook=json_to_changelog)
+
+    changelog = json_to_changelog(fields)
+    if not isinstance(changelog, Changelog):
+        changelog = Changelog()
+
+    if tail is not None:
+        changelog.tail = tail
+        changelog.tail_version = json.JSONDecoder().raw_decode(tail)[0]["version"]
+        # A lock edited by hand may not be sorted, then every version is parsed and sorted
+        if not tail_sorted(tail, changelog.versions[-1].sort_key):
+            changelog.materialize()
+
+    return changelog
+
+
+def tail_sorted(tail: str, newest: tuple) -> bool:
+    """
+    Whether the versions of the raw json go from `newest` down to the oldest,
+    only their names are scanned, they are not parsed.
+    """
+    for quoted in TAIL_VERSION_PATTERN.findall(tail):
+        name = quoted[1:-1] if "\\" not in quoted else json.loads(quoted)
+        parts = name.split(".")
+        if len(parts) == 3 and name.replace(".", "").isdigit() and name.isascii():
+            # A release, keyed like version_key() without its regex
+            key = (0, int(parts[0]), int(parts[1]), int(parts[2]), (1,))
+        else:
+            key = version_key(name)
+        if key > newest:
+            return False
+        newest = key
+    return True
+
+
+def commit(operations: list[dict[str, Any]]) -> tuple[list[str | None], list[str]]:
+    """
+    Applies operations to changelog.lock with group commit. Every writer queues its operations
+    and waits for the lock, whoever gets it applies every queued operation with one load and
+    one save, so concurrent writers are merged into a single write.
+    Returns the result of every operation and the paths written by that save.
+    """
+    import time
+
+    os.makedirs(CHANGELOG_QUEUE_PATH, exist_ok=True)
+    name = f"{CHANGELOG_QUEUE_PATH}/{time.time_ns():020d}-{os.getpid()}-{os.urandom(4).hex()}"
+    write_atomic(f"{name}.json", json.dumps(operations))
+
+    try:
+        with file_lock(CHANGELOG_MUTEX_PATH):
+            if not os.path.exists(f"{name}.done"):
+                commit_queue()
+
+            with open(f"{name}.done", "r") as file:
+                response = json.load(file)
+            os.remove(f"{name}.done")
+    finally:
+        # A request that was not answered must not be applied by the next writer
+        if os.path.exists(f"{name}.json") or os.path.exists(f"{name}.done"):
+            with file_lock(CHANGELOG_MUTEX_PATH):
+                for path in [f"{name}.json", f"{name}.done"]:
+                    if os.path.exists(path):
+                        os.remove(path)
+
+    if "error" in response:
+        raise Exception(response["error"])
+
+    return response["results"], response["written"]
+
+
+def commit_queue():
+    """
+    Applies every queued request, it must be called holding the lock.
+    If the changelog can not be loaded or saved every request gets the error.
+    The requests and responses of writers that died are removed.
+    """
+    import copy
+    from glob import glob
+
+    for path in glob(f"{CHANGELOG_QUEUE_PATH}/*.done"):
+        if not queue_writer_alive(path):
+            os.remove(path)
+
+    requests = []
+    for request in sorted(glob(f"{CHANGELOG_QUEUE_PATH}/*.json")):
+        if queue_writer_alive(request):
+            requests.append(request)
+        else:
+            os.remove(request)
+
+    responses = {}
+    try:
+        # Unreleased and the latest release are enough to add, bump and release
+        changelog = load_changelog(limit=2)
+
+        for request in requests:
+            with open(request, "r") as file:
+                operations = json.load(file)
+
+            backup = copy.deepcopy(changelog) if len(operations) > 1 else None
+            try:
+                responses[request] = {"results": changelog.apply_all(operations)}
+            except Exception as ex:
+                responses[request] = {"error": str(ex)}
+                if backup is not None:
+                    changelog = backup
+
+        written = changelog.save() if changelog.dirty else []
+    except Exception as ex:
+        responses = {request: {"error": str(ex)} for request in requests}
+        written = []
+
+    for request, response in responses.items():
+        if "results" in response:
+            response["written"] = written
+        write_atomic(f"{request.removesuffix('.json')}.done", json.dumps(response))
+        os.remove(request)
+
+
+def queue_writer_alive(path: str) -> bool:
+    """
+    Whether the process that queued a request is running, its pid is in the file name,
+    see commit().
+    """
+    parts = os.path.basename(path).split("-")
+    if len(parts) < 3 or not parts[1].isdigit():
+        return True
+
+    try:
+        os.kill(int(parts[1]), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read_operations(lines: Iterable[str]) -> Iterable[dict[str, Any]]:
+    """
+    Reads one json operation per line, blank lines are ignored.
+    """
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+
+        try:
+            operation = json.loads(line)
+        except ValueError:
+            raise Exception(f"Line {number} is not valid json")
+
+        if not isinstance(operation, dict):
+            raise Exception(f"Line {number} is not a json object")
+
+        yield operation
+
+
+def empty_changelog(repository="", storage: Storage = Storage.lock) -> Changelog:
+    return Changelog(repository=repository, versions=[Version(version=UNRELEASED)], storage=storage)
+
+
+def parse_changelog(path: str = CHANGELOG_PATH) -> Changelog:
+    """
+    Builds the model in one pass, CHANGELOG.md is read line by line.
+    """
+    with open(path, "r") as content, gc_paused():
+        versions, repository = versions_from_tokens(tokenize(content))
+        return Changelog(versions=versions, repository=repository)
+
+
+def parse_changelog_parallel(path: str = CHANGELOG_PATH, jobs: int | None = None) -> Changelog:
+    """
+    Splits CHANGELOG.md at the version headers of a memory map, parses the pieces
+    in worker processes and joins the versions in order. Small files are parsed in process.
+    """
+    import mmap
+    from concurrent.futures import ProcessPoolExecutor
+
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size < PARSE_CHUNK_SIZE:
+            return parse_changelog(path)
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            boundaries = version_boundaries(content, PARSE_CHUNK_SIZE)
 
     versions = []
-    repo = ""
-
-    for line in lines:
-        if line.startswith("## "):
-            version_header = line.strip("##").strip().split(" - ")
-            str_version = version_header[0].strip("[").strip("]")
-            str_date = version_header[1] if len(version_header) > 1 else None
-            versions.append(Version(version=str_version, release_date=str_date, changes=[]))
-        if line.startswith("### "):
-            version = versions[-1]
-            version.changes.append(Change(change_type=line.strip("### ").strip(), entries=[]))
-        if line.startswith("- "):
-            version = versions[-1]
-            change = version.changes[-1]
-            change.entries.append(line.strip("- ").strip())
-        if line.startswith("[Unreleased]: "):
-            repo = line.strip().strip("[Unreleased]: ")
-            repo = repo[: repo.index("/compare")]
-
-    return Changelog(versions=versions, repository=repo)
+    repository = ""
+    with gc_paused(), ProcessPoolExecutor(max_workers=jobs) as executor:
+        chunks = executor.map(
+            parse_chunk, [path] * (len(boundaries) - 1), boundaries[:-1], boundaries[1:]
+        )
+        for chunk_versions, chunk_repository in chunks:
+            versions.extend(chunk_versions)
+            repository = repository or chunk_repository
+
+    return Changelog(versions=versions, repository=repository)
+
+
+def version_boundaries(content: bytes, chunk_size: int) -> List[int]:
+    """
+    Offsets of "## " lines about `chunk_size` bytes apart, plus the start and the end.
+    """
+    boundaries = [0]
+    while (position := content.find(b"\n## ", boundaries[-1] + chunk_size)) >= 0:
+        boundaries.append(position + 1)
+    boundaries.append(len(content))
+    return boundaries
+
+
+def parse_chunk(path: str, start: int, end: int) -> tuple[List[Version], str]:
+    import io
+    import mmap
+
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            text = content[start:end].decode()
+
+    with gc_paused():
+        return versions_from_tokens(tokenize(io.StringIO(text)))
+
+
+def import_changelog(path: str, force: bool = False) -> tuple[int, int]:
+    """
+    Parses a CHANGELOG.md and saves the changelog.lock next to it, it runs in a worker
+    process of "import", so it changes the working directory of that process.
+    The path must be absolute.
+    Returns the number of versions and entries.
+    """
+    if not os.path.isfile(path):
+        raise Exception("file does not exist")
+
+    os.chdir(os.path.dirname(path))
+
+    if not force and os.path.exists(CHANGELOG_LOCK_PATH):
+        raise Exception(f"{CHANGELOG_LOCK_PATH} file already exists. Use --force to override it")
+
+    changelog = parse_changelog(os.path.basename(path))
+    changelog.save()
+    entries = sum(
+        len(change.entries or [])
+        for version in changelog.versions or []
+        for change in version.changes or []
+    )
+    return len(changelog.versions or []), entries
+
+
+@contextmanager
+def gc_paused():
+    """
+    The model has no reference cycles, the cyclic collector only slows down building it.
+    """
+    import gc
+
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def versions_from_tokens(tokens: Iterable[tuple[str, ...]]) -> tuple[List[Version], str]:
+    """
+    Indented or unmarked lines right after an entry belong to that entry.
+    The repository is taken from the first compare or release link.
+    """
+    sections = []
+    repository = ""
+    change = None
+    in_entry = False
+
+    for token in tokens:
+        kind = token[0]
+
+        if kind == ENTRY_TOKEN and change is not None:
+            change.entries.append(token[1])
+            in_entry = True
+            continue
+
+        if in_entry and (kind == CONTINUATION_TOKEN or kind == TEXT_TOKEN):
+            change.entries[-1] += "\n" + token[1]
+            continue
+
+        in_entry = False
+
+        if kind == VERSION_TOKEN:
+            sections.append((token[1], token[2], []))
+            change = None
+        elif kind == CHANGE_TOKEN and sections:
+            change = Change(change_type=token[1], entries=[])
+            sections[-1][2].append(change)
+        elif kind == LINK_TOKEN and not repository:
+            repository = repository_from_link(token[2]) or ""
+
+    # Versions are built once their entries are complete, released ones are frozen
+    versions = [
+        Version(version, release_date, changes) for version, release_date, changes in sections
+    ]
+    return versions, repository
 
 
 if __name__ == "__main__":
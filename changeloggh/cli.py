@@ -1,26 +1,32 @@
+import json
+import os
 from pathlib import Path
-from typing import List
+from typing import List, Any
 
 import cloup
 from cloup import Section
-from rich import print_json
-from rich.console import Console
-from rich.markdown import Markdown
-from textual.app import App, ComposeResult
-from textual.binding import Binding
-from textual.widgets import MarkdownViewer, Footer
 
 from changeloggh import VERSION
 from changeloggh.changelog import (
     CHANGELOG_PATH,
     CHANGELOG_LOCK_PATH,
+    CHANGELOG_MUTEX_PATH,
+    commit,
     empty_changelog,
     load_changelog,
+    load_storage,
+    write_fragment,
     ChangeType,
-    BumpRule,
+    Storage,
     parse_changelog,
+    parse_changelog_parallel,
+    import_changelog,
+    read_operations,
+    read_versions,
     JSON_INDENT,
 )
+from changeloggh.daemon import CHANGELOG_SOCKET_PATH, FLUSH_DELAY, create_server, send
+from changeloggh.file_utils import file_lock
 
 START = Section("Start a changelog file")
 ADD = Section("Add new entries")
@@ -49,8 +55,21 @@ def main():
     help="Force saving an empty CHANGELOG file.",
     show_default=True,
 )
+@cloup.option(
+    "--storage",
+    type=cloup.Choice([storage.value for storage in Storage], case_sensitive=False),
+    default=Storage.lock.value,
+    help=(
+        'How changes are saved. "journal" appends every change to changelog.journal'
+        ' instead of rewriting the files, use the "compact" command to fold it.'
+        ' "sharded" keeps one file per version in the changelog.d directory.'
+        ' "fragments" saves every change in its own file in the changelog.unreleased'
+        ' directory, they are collected by "bump" and "release".'
+    ),
+    show_default=True,
+)
 @cloup.argument("repository", nargs=1)
-def init(force: bool, repository: str):
+def init(force: bool, storage: str, repository: str):
     """
     Initialize a CHANGELOG.md file.
 
@@ -67,8 +86,8 @@ def init(force: bool, repository: str):
                 print(f"{str_path} file already exists. Use --force to override the file.")
                 exit(1)
 
-    changelog = empty_changelog(repository)
-    changelog.save()
+    changelog = empty_changelog(repository, Storage(storage))
+    report(changelog.save_snapshot())
 
 
 @main.command("live", section=EXAMINE)
@@ -76,6 +95,9 @@ def live():
     """
     Show a live version of the CHANGELOG.md file.
     """
+    from textual.app import App, ComposeResult
+    from textual.binding import Binding
+    from textual.widgets import MarkdownViewer, Footer
 
     cl = load_changelog()
 
@@ -107,21 +129,249 @@ def live():
     help="What format to use.",
     show_default=True,
 )
-def print_changelog(format: str):
+@cloup.option(
+    "--limit", type=cloup.IntRange(min=1), default=None, help="Print only the newest N versions."
+)
+@cloup.option("--since", default=None, help="Print the versions from this one, ex.: 1.0.0.")
+@cloup.option("--until", default=None, help="Print the versions up to this one, ex.: 2.0.0.")
+@cloup.option(
+    "--type",
+    "types",
+    default=None,
+    help="Print only these change types, separated by commas, ex.: Fixed,Security.",
+)
+def print_changelog(
+    format: str, limit: int | None, since: str | None, until: str | None, types: str | None
+):
     """
     Print changelog file.
+
+    The filters select the versions before rendering them, ex.: changeloggh print --limit 5
     """
+    filters = {
+        "limit": limit,
+        "since": since,
+        "until": until,
+        "types": [change_type.strip() for change_type in types.split(",")] if types else None,
+    }
+    filters = {key: value for key, value in filters.items() if value is not None}
 
-    cl = load_changelog()
+    try:
+        response = forward({"command": "print", "format": format} | filters)
+        if response is None:
+            cl = load_changelog(limit=limit).select(**filters)
+            content = cl.to_json() if format == "json" else cl.to_string()
+        else:
+            content = response["output"]
+    except Exception as ex:
+        print(str(ex))
+        exit(1)
+
+    match format:
+        case "rich":
+            from rich.console import Console
+            from rich.markdown import Markdown
+
+            console = Console()
+            console.print(Markdown(content))
+        case "text":
+            print(content)
+        case "json":
+            from rich import print_json
+
+            print_json(content, indent=JSON_INDENT)
+
+
+@main.command("show", section=EXAMINE)
+@cloup.option(
+    "--format",
+    type=cloup.Choice(["rich", "text", "json"], case_sensitive=False),
+    default="rich",
+    help="What format to use.",
+    show_default=True,
+)
+@cloup.argument("version", nargs=1)
+def show(format: str, version: str):
+    """
+    Print a single version, the rest of the changelog is not parsed.
+
+    ex.: changeloggh show 1.0.0
+
+    \b
+    VERSION  Version to print, ex.: 1.0.0 or Unreleased.
+    """
+    path = Path(CHANGELOG_LOCK_PATH)
+    if not path.exists():
+        print(f'{CHANGELOG_LOCK_PATH} file does not exist. Use "init" command to initialize.')
+        exit(1)
+
+    try:
+        response = forward({"command": "show", "version": version, "format": format})
+        if response is None:
+            content = load_changelog(limit=1).show(version, format)
+        else:
+            content = response["output"]
+    except Exception as ex:
+        print(str(ex))
+        exit(1)
 
     match format:
         case "rich":
+            from rich.console import Console
+            from rich.markdown import Markdown
+
             console = Console()
-            console.print(Markdown(cl.to_string()))
+            console.print(Markdown(content))
         case "text":
-            print(cl.to_string())
+            print(content)
         case "json":
-            print_json(cl.to_json(), indent=JSON_INDENT)
+            from rich import print_json
+
+            print_json(content, indent=JSON_INDENT)
+
+
+@main.command("diff", section=EXAMINE)
+@cloup.option(
+    "--format",
+    type=cloup.Choice(["markdown", "text", "json"], case_sensitive=False),
+    default="markdown",
+    help="What format to use.",
+    show_default=True,
+)
+@cloup.argument("from_version", metavar="FROM", nargs=1)
+@cloup.argument("to_version", metavar="TO", nargs=1)
+def diff(format: str, from_version: str, to_version: str):
+    """
+    Print the changes between two versions merged by change type, ex.: for upgrade notes.
+
+    ex.: changeloggh diff 1.0.5 1.2.0
+
+    \b
+    FROM  Version to upgrade from, its changes are not included.
+    TO    Version to upgrade to, ex.: 1.2.0 or Unreleased.
+    """
+    path = Path(CHANGELOG_LOCK_PATH)
+    if not path.exists():
+        print(f'{CHANGELOG_LOCK_PATH} file does not exist. Use "init" command to initialize.')
+        exit(1)
+
+    try:
+        request = {"command": "diff", "from": from_version, "to": to_version, "format": format}
+        response = forward(request)
+        if response is None:
+            content = load_changelog(limit=1).diff(from_version, to_version, format)
+        else:
+            content = response["output"]
+    except Exception as ex:
+        print(str(ex))
+        exit(1)
+
+    print(json.dumps(json.loads(content), indent=JSON_INDENT) if format == "json" else content)
+
+
+@main.command("search", section=EXAMINE)
+@cloup.option(
+    "--format",
+    type=cloup.Choice(["text", "json"], case_sensitive=False),
+    default="text",
+    help="What format to use.",
+    show_default=True,
+)
+@cloup.option("--limit", type=int, default=20, help="Maximum number of entries.", show_default=True)
+@cloup.argument("terms", nargs=-1, required=True)
+def search_entries(format: str, limit: int, terms: List[str]):
+    """
+    Search the entries of every version.
+
+    Terms are words, "term*" matches a prefix and "a phrase" a phrase.
+    They can be combined with AND, OR, NOT and parentheses, AND by default.
+
+    ex.: changeloggh search login timeout OR "session expired"
+
+    The first search creates the changelog.index file, it is updated on every change.
+
+    \b
+    TERMS  Search query.
+    """
+    path = Path(CHANGELOG_LOCK_PATH)
+    if not path.exists():
+        print(f'{CHANGELOG_LOCK_PATH} file does not exist. Use "init" command to initialize.')
+        exit(1)
+
+    from changeloggh.search import search
+
+    try:
+        results = search(" ".join(terms), limit)
+    except Exception as ex:
+        print(str(ex))
+        exit(1)
+
+    if format == "json":
+        print(json.dumps(results, indent=JSON_INDENT))
+        return
+
+    if not results:
+        print("No entries found")
+    for result in results:
+        date = f" - {result['date']}" if result["date"] else ""
+        print(f"[{result['version']}]{date} {result['type']}: {result['entry']}")
+
+
+@main.command("stats", section=EXAMINE)
+@cloup.option(
+    "--by",
+    type=cloup.Choice(["month", "release"], case_sensitive=False),
+    default="month",
+    help="Count the entries per month or per release.",
+    show_default=True,
+)
+@cloup.option(
+    "--format",
+    type=cloup.Choice(["table", "json", "csv"], case_sensitive=False),
+    default="table",
+    help="What format to use.",
+    show_default=True,
+)
+def stats(by: str, format: str):
+    """
+    Print entries per change type, days between releases and
+    the share of "Fixed" over "Fixed" and "Added" entries.
+
+    ex.: changeloggh stats --by release --format csv
+    """
+    path = Path(CHANGELOG_LOCK_PATH)
+    if not path.exists():
+        print(f'{CHANGELOG_LOCK_PATH} file does not exist. Use "init" command to initialize.')
+        exit(1)
+
+    from changeloggh.stats import Stats
+
+    result = Stats().count(read_versions())
+
+    match format:
+        case "json":
+            print(json.dumps(result.to_dict(by), indent=JSON_INDENT))
+        case "csv":
+            print(result.to_csv(by), end="")
+        case "table":
+            from rich.console import Console
+            from rich.table import Table
+
+            def text(value: Any) -> str:
+                return "" if value is None else str(value)
+
+            summary = Table("metric", "value")
+            for metric, value in result.summary().items():
+                summary.add_row(metric, text(value))
+
+            rows = result.rows(by)
+            table = Table(*(rows[0] if rows else [by]))
+            for row in rows:
+                table.add_row(*(text(value) for value in row.values()))
+
+            console = Console()
+            console.print(summary)
+            console.print(table)
 
 
 @main.command("added", section=ADD)
@@ -208,15 +458,57 @@ def security(entries: List[str]):
     add_entry(ChangeType.Security, entries)
 
 
+@main.command("batch", section=ADD)
+@cloup.argument("file", type=cloup.File("r"), default="-")
+def batch(file):
+    """
+    Apply many operations with one load and one save.
+
+    Reads one json operation per line, ex.:
+
+    \b
+    {"command": "added", "entries": ["New feature", "New validation added"]}
+    {"command": "fixed", "entries": ["Fix panel size"]}
+    {"command": "bump", "rule": "minor"}
+    {"command": "release", "version": "2.0.0"}
+
+    If an operation fails nothing is saved.
+
+    \b
+    FILE  JSON lines file, by default it reads from stdin.
+    """
+    path = Path(CHANGELOG_LOCK_PATH)
+    if not path.exists():
+        print(f'{CHANGELOG_LOCK_PATH} file does not exist. Use "init" command to initialize.')
+        exit(1)
+
+    try:
+        results, written = commit(list(read_operations(file)))
+    except Exception as ex:
+        print(f"{str(ex)}. Nothing was saved.")
+        exit(1)
+
+    print(f"{len(results)} operations applied")
+    report(written)
+
+
 def add_entry(change_type, entries):
     path = Path(CHANGELOG_LOCK_PATH)
     if not path.exists():
         print(f'{CHANGELOG_LOCK_PATH} file does not exist. Use "init" command to initialize.')
         exit(1)
-    cl = load_changelog()
-    for entry in entries:
-        cl.add(change_type, entry)
-    cl.save()
+    operation = {"command": change_type.name.lower(), "entries": list(entries)}
+
+    try:
+        if load_storage() == Storage.fragments:
+            report([write_fragment(operation)])
+            return
+
+        response = forward(operation)
+        report(commit([operation])[1] if response is None else response["written"])
+    except Exception as ex:
+        print(str(ex))
+        exit(1)
 
 
 @main.command("update")
@@ -228,8 +520,45 @@ def update():
     if not path.exists():
         print(f'{CHANGELOG_LOCK_PATH} file does not exist. Use "init" command to initialize.')
         exit(1)
-    cl = load_changelog()
-    cl.save()
+    with file_lock(CHANGELOG_MUTEX_PATH):
+        cl = load_changelog()
+
+        if cl.storage in [Storage.journal, Storage.fragments]:
+            report(cl.save_markdown())
+        else:
+            report(cl.save())
+
+
+@main.command("compact")
+def compact():
+    """
+    Fold the changelog.journal file into the changelog.lock file.
+    """
+    path = Path(CHANGELOG_LOCK_PATH)
+    if not path.exists():
+        print(f'{CHANGELOG_LOCK_PATH} file does not exist. Use "init" command to initialize.')
+        exit(1)
+    with file_lock(CHANGELOG_MUTEX_PATH):
+        cl = load_changelog()
+        report(cl.save_snapshot())
+
+
+@main.command("dedupe")
+def dedupe():
+    """
+    Remove the entries that are repeated in a version, ignoring case and whitespace.
+
+    New entries are not added twice, this cleans the history written before that.
+    """
+    path = Path(CHANGELOG_LOCK_PATH)
+    if not path.exists():
+        print(f'{CHANGELOG_LOCK_PATH} file does not exist. Use "init" command to initialize.')
+        exit(1)
+    with file_lock(CHANGELOG_MUTEX_PATH):
+        cl = load_changelog()
+        removed = cl.dedupe()
+        print(f"{removed} duplicated entries removed")
+        report(cl.save_snapshot() if removed else [])
 
 
 @main.command("latest", section=EXAMINE)
@@ -241,8 +570,13 @@ def latest():
     if not path.exists():
         print(f'{CHANGELOG_LOCK_PATH} file does not exist. Use "init" command to initialize.')
         exit(1)
-    cl = load_changelog()
-    print(cl.latest())
+    response = forward({"command": "latest"})
+
+    if response is None:
+        cl = load_changelog(limit=2)
+        print(cl.latest())
+    else:
+        print(response["output"])
 
 
 @main.command("bump", section=RELEASE)
@@ -254,10 +588,16 @@ def bump(rule: str):
     Bump to a next version.
     """
     try:
-        cl = load_changelog()
-        new_version = cl.bump(BumpRule[rule])
-        cl.save()
+        operation = {"command": "bump", "rule": rule}
+        response = forward(operation)
+        if response is None:
+            results, written = commit([operation])
+            new_version = results[0]
+        else:
+            new_version, written = response["output"], response["written"]
+
         print(new_version)
+        report(written)
     except Exception as ex:
         print(
             f"{str(ex)}. Use {{added|changed|deprecated|removed|fixed|security}} commands to add"
@@ -273,10 +613,16 @@ def release(version: str):
     Release a specific version.
     """
     try:
-        cl = load_changelog()
-        new_version = cl.release(version)
-        cl.save()
+        operation = {"command": "release", "version": version}
+        response = forward(operation)
+        if response is None:
+            results, written = commit([operation])
+            new_version = results[0]
+        else:
+            new_version, written = response["output"], response["written"]
+
         print(new_version)
+        report(written)
     except Exception as ex:
         print(
             f"{str(ex)}. Use {{added|changed|deprecated|removed|fixed|security}} commands to add"
@@ -285,6 +631,67 @@ def release(version: str):
         exit(1)
 
 
+@main.command("serve")
+@cloup.option(
+    "--delay",
+    type=float,
+    default=FLUSH_DELAY,
+    help="Seconds to wait for more changes before writing the files.",
+    show_default=True,
+)
+def serve(delay: float):
+    """
+    Run a daemon that keeps the changelog in memory.
+
+    While it is running, the "added", "changed", "deprecated", "fixed", "removed",
+    "security", "bump", "release", "latest", "print", "show" and "diff" commands are forwarded to it
+    through the ./.changeloggh/daemon.sock unix socket.
+    """
+    import signal
+
+    path = Path(CHANGELOG_LOCK_PATH)
+    if not path.exists():
+        print(f'{CHANGELOG_LOCK_PATH} file does not exist. Use "init" command to initialize.')
+        exit(1)
+
+    try:
+        server = create_server(delay=delay)
+    except Exception as ex:
+        print(str(ex))
+        exit(1)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: exit(0))
+
+    with server:
+        print(f"Serving on {CHANGELOG_SOCKET_PATH}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def report(written: list[str]):
+    """
+    Prints the written files to stderr, so the output of the commands can be piped.
+    """
+    import sys
+
+    if written:
+        print(f"Wrote {', '.join(os.path.normpath(path) for path in written)}", file=sys.stderr)
+    else:
+        print("Nothing to write, the files are up to date", file=sys.stderr)
+
+
+def forward(request: dict[str, Any]) -> dict[str, Any] | None:
+    """
+    Runs a command in the daemon started by "serve", returns None if it is not running.
+    """
+    response = send(request)
+    if response is not None and "error" in response:
+        raise Exception(response["error"])
+    return response
+
+
 @main.command("import", section=START)
 @cloup.option(
     "--force",
@@ -293,10 +700,33 @@ def release(version: str):
     help='Force to override the "changelog.lock" file.',
     show_default=True,
 )
-def import_md(force: bool):
+@cloup.option(
+    "--parallel",
+    is_flag=True,
+    default=False,
+    help="Split a huge CHANGELOG.md at its versions and parse the pieces in parallel.",
+)
+@cloup.option(
+    "--jobs",
+    "-j",
+    type=int,
+    default=None,
+    help="Worker processes, by default one per cpu.",
+)
+@cloup.argument("paths", nargs=-1)
+def import_md(force: bool, parallel: bool, jobs: int | None, paths: List[str]):
     """
     Import a markdown file.
+
+    With PATHS, every CHANGELOG.md is imported in parallel and its changelog.lock
+    is saved next to it, ex.: changeloggh import "repos/*/CHANGELOG.md"
+
+    \b
+    PATHS  Files, directories or glob patterns.
     """
+    if paths:
+        import_many(paths, force, jobs)
+        return
 
     if not force:
         path = Path(CHANGELOG_LOCK_PATH)
@@ -304,10 +734,42 @@ def import_md(force: bool):
             print(f"{CHANGELOG_LOCK_PATH} file already exists. Use --force to override the file.")
             exit(1)
 
-    cl = parse_changelog()
-    cl.save()
+    from rich import print_json
+
+    cl = parse_changelog_parallel(jobs=jobs) if parallel else parse_changelog()
+    report(cl.save())
     print_json(cl.to_json(), indent=JSON_INDENT)
 
 
+def import_many(patterns: List[str], force: bool, jobs: int | None):
+    from concurrent.futures import ProcessPoolExecutor
+    from glob import glob
+
+    paths = []
+    for pattern in patterns:
+        for path in sorted(glob(pattern, recursive=True)) or [pattern]:
+            if os.path.isdir(path):
+                path = os.path.join(path, os.path.basename(CHANGELOG_PATH))
+            if path not in paths:
+                paths.append(path)
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(import_changelog, os.path.abspath(path), force) for path in paths
+        ]
+        for path, future in zip(paths, futures):
+            try:
+                versions, entries = future.result()
+                print(f"{path}: {versions} versions, {entries} entries")
+            except Exception as ex:
+                failures += 1
+                print(f"{path}: failed, {ex}")
+
+    print(f"{len(paths) - failures} imported, {failures} failed")
+    if failures:
+        exit(1)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,197 @@
+import json
+import os
+from typing import Any
+
+from changeloggh.changelog import (
+    CHANGELOG_MUTEX_PATH,
+    CHANGELOG_STATE_PATH,
+    load_changelog,
+    storage_stat,
+)
+from changeloggh.file_utils import file_lock
+
+CHANGELOG_SOCKET_PATH = f"{CHANGELOG_STATE_PATH}/daemon.sock"
+FLUSH_DELAY = 0.05
+READ_COMMANDS = ["latest", "print", "show", "diff"]
+
+
+def send(request: dict[str, Any], path: str = CHANGELOG_SOCKET_PATH) -> dict[str, Any] | None:
+    """
+    Sends a request to a running daemon. Returns None if there is no daemon,
+    so the caller can fall back to run the command in process.
+    """
+    if not os.path.exists(path):
+        return None
+
+    import socket
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            return None
+
+        client.sendall(json.dumps(request).encode() + b"\n")
+        with client.makefile("rb") as stream:
+            response = stream.readline()
+
+    if not response:
+        return None
+
+    return json.loads(response)
+
+
+class ChangelogDaemon:
+    """
+    Keeps the parsed changelog in memory. Writes are coalesced: a mutation is applied
+    in memory right away, and every mutation that arrives within `delay` seconds is saved
+    in a single write. Clients get their answer once their mutation is on disk.
+    """
+
+    def __init__(self, delay: float = FLUSH_DELAY):
+        import threading
+
+        self.delay = delay
+        self.condition = threading.Condition()
+        self.changelog = load_changelog()
+        self.stat = storage_stat()
+        self.writes = 0
+        self.flushed = 0
+        self.flush_error = None
+        self.written = []
+        self.stopped = False
+        self.flusher = threading.Thread(target=self.flush_loop, daemon=True)
+        self.flusher.start()
+
+    def reload_if_changed(self):
+        if self.writes == self.flushed and storage_stat() != self.stat:
+            self.changelog = load_changelog()
+            self.stat = storage_stat()
+
+    def rebase_if_changed(self):
+        """
+        Another process wrote the files since the last flush,
+        so the pending operations are applied again on top of them.
+        """
+        if storage_stat() != self.stat:
+            operations = self.changelog.operations
+            self.changelog = load_changelog()
+            self.changelog.apply_all(operations)
+
+    def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        try:
+            command = request.get("command")
+            if command in READ_COMMANDS:
+                with self.condition:
+                    self.reload_if_changed()
+                    return {"output": self.read(request)}
+            output, written = self.write(request)
+            return {"output": output, "written": written}
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def read(self, request: dict[str, Any]) -> str:
+        match request["command"]:
+            case "latest":
+                return self.changelog.latest()
+            case "print":
+                changelog = self.changelog.select(
+                    request.get("limit"),
+                    request.get("since"),
+                    request.get("until"),
+                    request.get("types"),
+                )
+                if request.get("format") == "json":
+                    return changelog.to_json()
+                return changelog.to_string()
+            case "show":
+                return self.changelog.show(
+                    request.get("version", ""), request.get("format", "text")
+                )
+            case "diff":
+                return self.changelog.diff(
+                    request.get("from", ""),
+                    request.get("to", ""),
+                    request.get("format", "markdown"),
+                )
+            case _:
+                return self.changelog.to_string()
+
+    def write(self, request: dict[str, Any]) -> tuple[str | None, list[str]]:
+        with self.condition:
+            self.reload_if_changed()
+            output = self.changelog.apply(request)
+            self.writes += 1
+            ticket = self.writes
+            self.condition.notify_all()
+
+            while self.flushed < ticket:
+                self.condition.wait()
+
+            if self.flush_error:
+                raise Exception(self.flush_error)
+
+            return output, self.written
+
+    def flush_loop(self):
+        import time
+
+        while True:
+            with self.condition:
+                while self.flushed == self.writes and not self.stopped:
+                    self.condition.wait()
+                if self.stopped and self.flushed == self.writes:
+                    return
+
+            time.sleep(self.delay)
+
+            with self.condition, file_lock(CHANGELOG_MUTEX_PATH):
+                ticket = self.writes
+                try:
+                    self.rebase_if_changed()
+                    self.written = self.changelog.save() if self.changelog.dirty else []
+                    self.stat = storage_stat()
+                    self.flush_error = None
+                except Exception as ex:
+                    self.flush_error = str(ex)
+                    # The mutations that were not saved are dropped, the next request reloads
+                    self.stat = None
+                self.flushed = ticket
+                self.condition.notify_all()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        self.flusher.join()
+
+
+def create_server(path: str = CHANGELOG_SOCKET_PATH, delay: float = FLUSH_DELAY):
+    import socketserver
+
+    if send({"command": "latest"}, path) is not None:
+        raise Exception(f"There is a daemon running on {path} already")
+
+    if os.path.exists(path):
+        os.remove(path)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    daemon = ChangelogDaemon(delay)
+
+    class RequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            request = self.rfile.readline()
+            if request:
+                response = daemon.handle(json.loads(request))
+                self.wfile.write(json.dumps(response).encode() + b"\n")
+
+    class Server(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+        def server_close(self):
+            super().server_close()
+            daemon.stop()
+            if os.path.exists(path):
+                os.remove(path)
+
+    return Server(path, RequestHandler)
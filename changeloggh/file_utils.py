@@ -0,0 +1,62 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+def write_atomic(path: str, content: str | bytes):
+    """
+    Writes to a temporary file next to `path` and renames it, readers see the old
+    content or the new one, never a truncated file.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory
+    )
+    try:
+        with os.fdopen(fd, "wb" if isinstance(content, bytes) else "w") as file:
+            os.fchmod(file.fileno(), file_mode(path))
+            file.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def write_if_changed(path: str, content: str | bytes) -> bool:
+    """
+    Writes only if the file content is different, an unchanged file keeps its mtime.
+    Returns whether the file was written.
+    """
+    data = content.encode() if isinstance(content, str) else content
+    if os.path.exists(path) and os.path.getsize(path) == len(data):
+        with open(path, "rb") as file:
+            if file.read() == data:
+                return False
+
+    write_atomic(path, content)
+    return True
+
+
+def file_mode(path: str) -> int:
+    if os.path.exists(path):
+        return os.stat(path).st_mode & 0o777
+
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Exclusive advisory lock, it blocks until every other holder releases it.
+    """
+    import fcntl
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
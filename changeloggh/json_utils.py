@@ -0,0 +1,76 @@
+import json
+from typing import Any, Callable, TextIO
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = " \t\n\r"
+
+
+class JsonStreamReader:
+    """
+    Reads a json document piece by piece, the file is read in chunks only as far as needed.
+    """
+
+    def __init__(
+        self,
+        file: TextIO,
+        object_hook: Callable[[dict[Any, Any]], Any] | None = None,
+        chunk_size: int = CHUNK_SIZE,
+    ):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder(object_hook=object_hook)
+
+    def read_more(self, size: int | None = None) -> bool:
+        if self.eof:
+            return False
+
+        chunk = self.file.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Skips whitespaces and returns the next character, or "" at the end of the file.
+        """
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer) or not self.read_more():
+                return self.buffer[self.position : self.position + 1]
+
+    def expect(self, characters: str) -> str:
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"Expecting one of {characters!r}, found {character!r}")
+        self.position += 1
+        return character
+
+    def value(self) -> Any:
+        """
+        Decodes the next value, a value that does not fit in the buffer is decoded again
+        after doubling the read size, so a large value is decoded a logarithmic number of times.
+        """
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, self.position = self.decoder.raw_decode(self.buffer, self.position)
+                return value
+            except json.JSONDecodeError:
+                if not self.read_more(size):
+                    raise
+                size *= 2
+
+    def rest(self) -> str:
+        """
+        Returns the unread text without parsing it.
+        """
+        return self.buffer[self.position :] + self.file.read()
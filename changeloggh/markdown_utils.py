@@ -0,0 +1,57 @@
+import re
+from typing import Iterable, Iterator
+
+VERSION_TOKEN = "version"
+CHANGE_TOKEN = "change"
+ENTRY_TOKEN = "entry"
+CONTINUATION_TOKEN = "continuation"
+LINK_TOKEN = "link"
+BLANK_TOKEN = "blank"
+TEXT_TOKEN = "text"
+
+VERSION_PATTERN = re.compile(r"## \[?([^\]\s]*)\]?(?: - (.*\S))?\s*")
+CHANGE_PATTERN = re.compile(r"### (.*\S)\s*")
+ENTRY_PATTERN = re.compile(r"[-*] (.*\S)?\s*")
+LINK_PATTERN = re.compile(r"\[([^\]]+)\]: (\S+)\s*")
+
+
+def tokenize(lines: Iterable[str]) -> Iterator[tuple[str, ...]]:
+    """
+    Classifies CHANGELOG.md lines one at a time, ex.: ("version", "1.0.0", "2023-03-17"),
+    ("change", "Added"), ("entry", "New feature") or ("link", "1.0.0", "https://...").
+    Indented lines are ("continuation", line) of a multi-line entry.
+    """
+    for line in lines:
+        first = line[:1]
+
+        if first == "-" or first == "*":
+            if match := ENTRY_PATTERN.fullmatch(line):
+                yield ENTRY_TOKEN, match[1] or ""
+                continue
+        elif first == "#":
+            if match := VERSION_PATTERN.fullmatch(line):
+                yield VERSION_TOKEN, match[1], match[2]
+                continue
+            if match := CHANGE_PATTERN.fullmatch(line):
+                yield CHANGE_TOKEN, match[1]
+                continue
+        elif first == "[":
+            if match := LINK_PATTERN.fullmatch(line):
+                yield LINK_TOKEN, match[1], match[2]
+                continue
+        elif first == " " or first == "\t":
+            if line.strip():
+                yield CONTINUATION_TOKEN, line.rstrip()
+                continue
+
+        yield (TEXT_TOKEN, line.rstrip()) if line.strip() else (BLANK_TOKEN,)
+
+
+def repository_from_link(url: str) -> str | None:
+    """
+    Repository of a compare or release link, ex.: https://github.com/user/repo/compare/v1...v2.
+    """
+    for marker in ["/compare/", "/releases/tag/"]:
+        if marker in url:
+            return url[: url.index(marker)]
+    return None
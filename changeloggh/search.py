@@ -0,0 +1,165 @@
+import json
+import re
+import sqlite3
+from contextlib import closing
+from typing import Any
+
+from changeloggh.changelog import (
+    CHANGELOG_INDEX_PATH,
+    Changelog,
+    load_changelog,
+    storage_stat,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS versions (
+    version TEXT PRIMARY KEY, fingerprint TEXT, first INTEGER, last INTEGER
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries USING fts5(
+    entry, version UNINDEXED, type UNINDEXED, date UNINDEXED
+);
+"""
+QUERY_TOKEN_PATTERN = re.compile(r'[()]|"[^"]*"\*?|[^\s()]+')
+QUERY_OPERATORS = ["AND", "OR", "NOT"]
+
+
+def connect(path: str = CHANGELOG_INDEX_PATH) -> sqlite3.Connection:
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def update_index(changelog: Changelog, path: str = CHANGELOG_INDEX_PATH) -> int:
+    """
+    Indexes again only the versions whose content changed since the last update and
+    the versions newer than them, returns how many. Rows are inserted from the oldest version
+    and entry to the newest, so the newest entries have the highest rowids even after an old
+    version is edited. A changelog that was partially loaded
+    updates the versions it has, but only if the index was up to date when it was loaded,
+    otherwise the next search loads the whole changelog and updates the rest.
+    """
+    partial = changelog.tail_version is not None
+
+    with closing(connect(path)) as connection, connection:
+        if partial and read_stamp(connection) != json.dumps(changelog.stamp):
+            return 0
+
+        indexed = {
+            version: (fingerprint, first, last)
+            for version, fingerprint, first, last in connection.execute(
+                "SELECT version, fingerprint, first, last FROM versions"
+            )
+        }
+        rowid = max([last for _, _, last in indexed.values()], default=0) + 1
+        updated = 0
+
+        for version in reversed(changelog.versions or []):
+            fingerprint = version.fingerprint()
+            # After the first changed version every newer one is inserted again after it
+            if not updated and indexed.get(version.version, [None])[0] == fingerprint:
+                continue
+
+            if version.version in indexed:
+                remove_version(connection, version.version, *indexed[version.version][1:])
+
+            rows = [
+                (entry, version.version, change.change_type, version.release_date)
+                for change in reversed(version.changes or [])
+                for entry in reversed(change.entries or [])
+            ]
+            connection.executemany(
+                "INSERT INTO entries (rowid, entry, version, type, date) VALUES (?, ?, ?, ?, ?)",
+                [(rowid + number, *row) for number, row in enumerate(rows)],
+            )
+            connection.execute(
+                "INSERT INTO versions VALUES (?, ?, ?, ?)",
+                (version.version, fingerprint, rowid, rowid + len(rows) - 1),
+            )
+            rowid += len(rows)
+            updated += 1
+
+        if not partial:
+            names = {version.version for version in changelog.versions or []}
+            for name in indexed.keys() - names:
+                remove_version(connection, name, *indexed[name][1:])
+
+        connection.execute(
+            "INSERT OR REPLACE INTO meta VALUES ('stamp', ?)", (json.dumps(storage_stat()),)
+        )
+
+    return updated
+
+
+def read_stamp(connection: sqlite3.Connection) -> str | None:
+    """
+    storage_stat() of the last update as json.
+    """
+    stamp = connection.execute("SELECT value FROM meta WHERE key = 'stamp'").fetchone()
+    return stamp[0] if stamp else None
+
+
+def remove_version(connection: sqlite3.Connection, version: str, first: int, last: int):
+    connection.execute("DELETE FROM entries WHERE rowid BETWEEN ? AND ?", (first, last))
+    connection.execute("DELETE FROM versions WHERE version = ?", (version,))
+
+
+def refresh_index(path: str = CHANGELOG_INDEX_PATH):
+    """
+    Creates the index or updates it if the files changed since it was updated,
+    ex.: a fragment was added or changelog.lock was edited by hand.
+    """
+    with closing(connect(path)) as connection:
+        stamp = read_stamp(connection)
+
+    if stamp != json.dumps(storage_stat()):
+        update_index(load_changelog(), path)
+
+
+def to_fts_query(query: str) -> str:
+    """
+    Every term is matched as a word, "term*" as a prefix and "a phrase" as a phrase.
+    Terms are combined with AND, OR, NOT and parentheses, AND by default.
+    """
+    terms = []
+    for token in QUERY_TOKEN_PATTERN.findall(query):
+        if token in ["(", ")"] or token in QUERY_OPERATORS:
+            terms.append(token)
+            continue
+
+        prefix = token.endswith("*")
+        text = token.rstrip("*")
+        if len(text) > 1 and text.startswith('"') and text.endswith('"'):
+            text = text[1:-1]
+        if text:
+            terms.append('"' + text.replace('"', '""') + '"' + ("*" if prefix else ""))
+
+    return " ".join(terms)
+
+
+def search(query: str, limit: int = 20, path: str = CHANGELOG_INDEX_PATH) -> list[dict[str, Any]]:
+    """
+    Returns the matching entries of the newest versions first with their version,
+    change type and date. Ranking every match by relevance is skipped, it takes about
+    a second for a common term in a big changelog and most entries are a single line.
+    """
+    fts_query = to_fts_query(query)
+    if not fts_query:
+        raise Exception("Empty query")
+
+    refresh_index(path)
+
+    with closing(connect(path)) as connection:
+        try:
+            rows = connection.execute(
+                "SELECT version, type, date, entry FROM entries WHERE entries MATCH ?"
+                " ORDER BY rowid DESC LIMIT ?",
+                (fts_query, limit),
+            ).fetchall()
+        except sqlite3.OperationalError:
+            raise Exception(f"Invalid query {query}")
+
+    return [
+        {"version": version, "type": change_type, "date": date, "entry": entry}
+        for version, change_type, date, entry in rows
+    ]
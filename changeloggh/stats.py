@@ -0,0 +1,191 @@
+from array import array
+from datetime import date
+from typing import Any, Iterable
+
+from changeloggh.changelog import ChangeType
+from changeloggh.version_utils import is_unreleased
+
+MONTH_GROUP = "month"
+# Release rows allocated at once, see Stats.grow()
+STATS_BLOCK = 4096
+
+
+class Stats:
+    """
+    Release cadence and change mix of a changelog, counted in one pass over its versions.
+    Counters are arrays with a row per release or per month, one array per change type.
+    """
+
+    def __init__(self):
+        self.types: list[str] = []
+        # change type: entries per release, rows from the newest release to the oldest
+        self.release_counts: dict[str, array] = {}
+        self.releases: list[tuple[str, str | None]] = []
+        # days since the previous release, -1 if a date is missing
+        self.days = array("q")
+        # change type: entries per month, rows in the order the months are found
+        self.month_counts: dict[str, array] = {}
+        self.months: dict[str, int] = {}
+        self.month_releases = array("q")
+        self.unreleased = 0
+
+        for change_type in ChangeType:
+            self.column(change_type.value)
+
+    def column(self, change_type: str):
+        """
+        Adds a change type found in the changelog, ex.: a custom type from an imported markdown.
+        """
+        self.types.append(change_type)
+        self.release_counts[change_type] = array("q", bytes(8 * len(self.days)))
+        self.month_counts[change_type] = array("q", bytes(8 * len(self.months)))
+
+    def grow(self):
+        """
+        Allocates rows for the next releases, a release only increments the counters of its
+        change types instead of appending a row to every counter.
+        """
+        rows = max(len(self.days), STATS_BLOCK)
+        for counts in self.release_counts.values():
+            counts.frombytes(bytes(8 * rows))
+        self.days.extend(array("q", [-1]) * rows)
+
+    def count(self, versions: Iterable[dict[str, Any]]):
+        """
+        Counts versions shaped like in changelog.lock, from the newest to the oldest,
+        ex.: {"version": "1.0.0", "date": "2023-03-17", "changes": [{"type": "Added", ...}]}.
+        """
+        release_counts, month_counts, months = self.release_counts, self.month_counts, self.months
+        month_releases, add_release, days = self.month_releases, self.releases.append, self.days
+        # release date: (day number, month), parsed once per distinct date
+        dates: dict[str | None, tuple[int, str] | None] = {}
+        previous: int | None = None
+        row = len(self.releases)
+
+        for version in versions:
+            name = version.get("version")
+            changes = version.get("changes") or []
+            if not name or is_unreleased(name):
+                for change in changes:
+                    self.unreleased += len(change.get("entries") or [])
+                continue
+
+            if row == len(days):
+                self.grow()
+
+            release_date = version.get("date")
+            if release_date not in dates:
+                parsed = parse_date(release_date)
+                dates[release_date] = (parsed.toordinal(), release_date[:7]) if parsed else None
+            day = dates[release_date]
+            add_release((name, release_date))
+
+            month_row = None
+            if day is not None:
+                if previous is not None:
+                    days[row - 1] = previous - day[0]
+                month_row = months.get(day[1])
+                if month_row is None:
+                    month_row = months[day[1]] = len(months)
+                    month_releases.append(0)
+                    for counts in month_counts.values():
+                        counts.append(0)
+                month_releases[month_row] += 1
+            previous = day[0] if day is not None else None
+
+            for change in changes:
+                change_type = change.get("type", "")
+                entries = len(change.get("entries") or [])
+                if change_type not in release_counts:
+                    self.column(change_type)
+                release_counts[change_type][row] += entries
+                if month_row is not None:
+                    month_counts[change_type][month_row] += entries
+            row += 1
+
+        for counts in release_counts.values():
+            del counts[row:]
+        del days[row:]
+        return self
+
+    def table(self, group: str) -> tuple[list[str], list[tuple]]:
+        """
+        Header and rows per month or per release, from the oldest to the newest.
+        """
+        if group == MONTH_GROUP:
+            months = sorted(self.months.items())
+            order = [row for _, row in months]
+            keys = [
+                [month for month, _ in months],
+                [self.month_releases[row] for row in order],
+            ]
+            columns = [[counts[row] for row in order] for counts in self.month_counts.values()]
+            header = [MONTH_GROUP, "releases"]
+        else:
+            keys = [
+                [version for version, _ in reversed(self.releases)],
+                [release_date for _, release_date in reversed(self.releases)],
+                [days if days >= 0 else None for days in reversed(self.days)],
+            ]
+            columns = [counts[::-1] for counts in self.release_counts.values()]
+            header = ["version", "date", "days"]
+
+        fixed = columns[self.types.index(ChangeType.Fixed.value)]
+        added = columns[self.types.index(ChangeType.Added.value)]
+        shares = list(map(fixed_share, fixed, added))
+        return header + self.types + ["fixed_share"], list(zip(*keys, *columns, shares))
+
+    def rows(self, group: str) -> list[dict[str, Any]]:
+        header, rows = self.table(group)
+        return [dict(zip(header, row)) for row in rows]
+
+    def summary(self) -> dict[str, Any]:
+        from statistics import median
+
+        counts = {change_type: sum(self.release_counts[change_type]) for change_type in self.types}
+        days = [days for days in self.days if days >= 0]
+        return (
+            {
+                "releases": len(self.releases),
+                "entries": sum(counts.values()),
+                "unreleased": self.unreleased,
+            }
+            | counts
+            | {
+                "fixed_share": fixed_share(
+                    counts[ChangeType.Fixed.value], counts[ChangeType.Added.value]
+                ),
+                "days_min": min(days, default=None),
+                "days_median": median(days) if days else None,
+                "days_mean": round(sum(days) / len(days), 1) if days else None,
+                "days_max": max(days, default=None),
+            }
+        )
+
+    def to_dict(self, group: str = MONTH_GROUP) -> dict[str, Any]:
+        return {"summary": self.summary(), group + "s": self.rows(group)}
+
+    def to_csv(self, group: str = MONTH_GROUP) -> str:
+        import csv
+        import io
+
+        header, rows = self.table(group)
+        output = io.StringIO()
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(header if rows else [group])
+        writer.writerows(rows)
+        return output.getvalue()
+
+
+def parse_date(value: str | None) -> date | None:
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def fixed_share(fixed: int, added: int) -> float | None:
+    """
+    Fixed entries over Fixed and Added entries.
+    """
+    return round(fixed / (fixed + added), 3) if fixed + added else None
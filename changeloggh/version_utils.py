@@ -1,9 +1,122 @@
-from functools import cmp_to_key
+import re
+from functools import cmp_to_key, lru_cache
 
-import semver
+UNRELEASED = "Unreleased"
+UNRELEASED_KEY = (1,)
+VERSION_PATTERN = re.compile(
+    r"(0|[1-9]\d*)\.(0|[1-9]\d*)\.(0|[1-9]\d*)"
+    r"(?:-((?:0|[1-9]\d*|\d*[a-zA-Z-][0-9a-zA-Z-]*)"
+    r"(?:\.(?:0|[1-9]\d*|\d*[a-zA-Z-][0-9a-zA-Z-]*))*))?"
+    r"(?:\+[0-9a-zA-Z-]+(?:\.[0-9a-zA-Z-]+)*)?"
+)
+
+
+@lru_cache(maxsize=64 * 1024)
+def version_key(version: str) -> tuple:
+    """
+    Sort key of a version string with the same precedence as semver, build metadata is ignored.
+    Keys sort from the oldest release to Unreleased, see sort_versions().
+    """
+    version = version.lower()
+    if version == UNRELEASED.lower():
+        return UNRELEASED_KEY
+
+    match = VERSION_PATTERN.fullmatch(version)
+    if match is None:
+        raise ValueError(f"{version} is not valid SemVer string")
+
+    major, minor, patch, prerelease = match.groups()
+    if prerelease is None:
+        # A release goes after all its pre-releases
+        prerelease_key = (1,)
+    else:
+        prerelease_key = (
+            0,
+            tuple(
+                (0, int(part)) if part.isdigit() else (1, part) for part in prerelease.split(".")
+            ),
+        )
+
+    return 0, int(major), int(minor), int(patch), prerelease_key
+
+
+def normalize_version(version: str) -> str:
+    """
+    Key of a version in the index of a changelog, ex.: "V1.0.0 " and "1.0.0" are the same.
+    """
+    version = version.strip().lower()
+    if version[:1] == "v" and version[1:2].isdigit():
+        version = version[1:]
+    return version
+
+
+def is_unreleased(version: str | None) -> bool:
+    """
+    Whether the version is Unreleased, written in any case, ex.: "unreleased" imported from
+    a CHANGELOG.md.
+    """
+    return bool(version) and normalize_version(version) == UNRELEASED.lower()
+
+
+def sort_versions(versions: list):
+    """
+    Unreleased first and then from the newest to the oldest release, equal versions
+    keep their order. Every version is parsed once.
+    """
+    if len(versions) > 1:
+        versions.sort(key=lambda version: version.sort_key, reverse=True)
+
+
+def bisect_versions(versions: list, key: tuple, after_equal: bool = True) -> int:
+    """
+    Position of a sort key in a list ordered by sort_versions() with a binary search,
+    after the versions that are equal to it or before them.
+    """
+    low, high = 0, len(versions)
+    while low < high:
+        middle = (low + high) // 2
+        middle_key = versions[middle].sort_key
+        if middle_key > key or (after_equal and middle_key == key):
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def insert_version(versions: list, version):
+    """
+    Inserts a version in a list ordered by sort_versions(), after the versions that are equal to it.
+    """
+    versions.insert(bisect_versions(versions, version.sort_key), version)
+
+
+def version_range(versions: list, oldest: tuple, newest: tuple) -> slice:
+    """
+    Versions of a list ordered by sort_versions() that are newer than `oldest`
+    up to `newest`, ex.: the versions released after 1.0.5 up to 1.2.0.
+    """
+    return slice(
+        bisect_versions(versions, newest, after_equal=False),
+        bisect_versions(versions, oldest, after_equal=False),
+    )
+
+
+@lru_cache(maxsize=None)
+def change_type_key(change_type: str) -> str:
+    return change_type.lower()
+
+
+def change_key(change) -> str:
+    return change_type_key(change.change_type)
 
 
 def version_comparator():
+    """
+    Compares two versions with semver, it parses both on every comparison.
+    sort_versions() orders them the same way parsing each version once.
+    """
+    import semver
+
     def compare(a, b):
         a_version = a.version.lower()
         b_version = b.version.lower()
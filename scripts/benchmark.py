@@ -0,0 +1,536 @@
+import json
+import os
+import tempfile
+import time
+import timeit
+from unittest.mock import patch
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+from changeloggh.changelog import (
+    Change,
+    Changelog,
+    ChangeType,
+    JINJA_TEMPLATE,
+    Storage,
+    Version,
+    changelog_template,
+    empty_changelog,
+    load_changelog,
+    parse_changelog,
+    parse_changelog_parallel,
+    write_fragment,
+)
+from changeloggh.cache_utils import CACHE_DIR_ENV
+from changeloggh.version_utils import sort_versions, version_comparator, version_key
+
+REPOSITORY = "https://github.com/sauljabin/changeloggh"
+
+
+def synthetic_changelog(versions: int, entries: int) -> Changelog:
+    change_types = [change_type.value for change_type in ChangeType]
+    return Changelog(
+        repository=REPOSITORY,
+        versions=[Version("Unreleased")]
+        + [
+            Version(
+                f"{index // 100}.{index // 10 % 10}.{index % 10}",
+                "2023-03-17",
+                [
+                    Change(
+                        change_types[index % len(change_types)],
+                        [f"Entry {index}.{entry}" for entry in range(entries)],
+                    )
+                ],
+            )
+            for index in range(versions, 0, -1)
+        ],
+    )
+
+
+def per_call(function, number: int) -> float:
+    return min(timeit.repeat(function, number=number, repeat=5)) / number
+
+
+@click.group()
+def main() -> None:
+    """
+    \b
+    Examples:
+        poetry run python -m scripts.benchmark render
+        poetry run python -m scripts.benchmark load --versions 4000
+        poetry run python -m scripts.benchmark fragments --versions 4000
+        poetry run python -m scripts.benchmark collect --fragments 20000
+        poetry run python -m scripts.benchmark parse --size 100
+        poetry run python -m scripts.benchmark memory --versions 200000
+        poetry run python -m scripts.benchmark sort --versions 10000 --versions 100000
+        poetry run python -m scripts.benchmark search --versions 200000
+        poetry run python -m scripts.benchmark diff --versions 200000
+        poetry run python -m scripts.benchmark stats --versions 400000
+        poetry run python -m scripts.benchmark subset --versions 200000
+    """
+
+
+@main.command()
+@click.option("--versions", default=10, show_default=True, help="Versions in the changelog.")
+@click.option("--entries", default=3, show_default=True, help="Entries per version.")
+@click.option("--number", default=200, show_default=True, help="Renders per measurement.")
+def render(versions: int, entries: int, number: int) -> None:
+    """
+    Per-render cost of CHANGELOG.md with and without the compiled template cache.
+    """
+    from jinja2 import Environment
+
+    cl = synthetic_changelog(versions, entries)
+
+    def uncached():
+        Environment().from_string(JINJA_TEMPLATE).render(versions=cl.versions, links=[])
+
+    def cached():
+        changelog_template().render(versions=cl.versions, links=[])
+
+    before = per_call(uncached, number)
+    after = per_call(cached, number)
+
+    table = Table("versions", "entries", "compile per render", "cached template", "speedup")
+    table.add_row(
+        str(versions),
+        str(versions * entries),
+        f"{before * 1e6:.1f}µs",
+        f"{after * 1e6:.1f}µs",
+        f"{before / after:.1f}x",
+    )
+    Console().print(table)
+
+
+@main.command()
+@click.option("--versions", default=4000, show_default=True, help="Versions in the changelog.")
+@click.option("--entries", default=3, show_default=True, help="Entries per version.")
+@click.option("--number", default=5, show_default=True, help="Loads per measurement.")
+def load(versions: int, entries: int, number: int) -> None:
+    """
+    Per-load cost of changelog.lock with and without the parsed model cache.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            with patch.dict(os.environ, {CACHE_DIR_ENV: ""}):
+                synthetic_changelog(versions, entries).save()
+                before = per_call(load_changelog, number)
+
+            with patch.dict(os.environ, {CACHE_DIR_ENV: f"{directory}/cache"}):
+                load_changelog()
+                after = per_call(load_changelog, number)
+        finally:
+            os.chdir(cwd)
+
+    table = Table("versions", "entries", "json parse and sort", "cached model", "speedup")
+    table.add_row(
+        str(versions),
+        str(versions * entries),
+        f"{before * 1e3:.1f}ms",
+        f"{after * 1e3:.1f}ms",
+        f"{before / after:.1f}x",
+    )
+    Console().print(table)
+
+
+@main.command()
+@click.option("--versions", default=4000, show_default=True, help="Versions in the changelog.")
+@click.option("--entries", default=3, show_default=True, help="Entries per version.")
+@click.option("--number", default=5, show_default=True, help="Renders per measurement.")
+def fragments(versions: int, entries: int, number: int) -> None:
+    """
+    Cost of CHANGELOG.md after an add, rendering every version or the changed one only.
+    """
+    cl = synthetic_changelog(versions, entries)
+
+    def full():
+        cl.add(ChangeType.Added, "Entry")
+        changelog_template().render(versions=cl.versions, links=cl.links(cl.versions))
+
+    def cached():
+        cl.add(ChangeType.Added, "Entry")
+        cl.to_string()
+
+    cl.to_string()
+    before = per_call(full, number)
+    after = per_call(cached, number)
+
+    table = Table("versions", "entries", "every section", "fragment cache", "speedup")
+    table.add_row(
+        str(versions),
+        str(versions * entries),
+        f"{before * 1e3:.1f}ms",
+        f"{after * 1e3:.1f}ms",
+        f"{before / after:.1f}x",
+    )
+    Console().print(table)
+
+
+@main.command()
+@click.option("--fragments", default=20000, show_default=True, help="Unreleased fragments.")
+def collect(fragments: int) -> None:
+    """
+    Time to collect the fragments of the "fragments" storage into Unreleased.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            empty_changelog(REPOSITORY, Storage.fragments).save()
+            change_types = [change_type.name.lower() for change_type in ChangeType]
+            for index in range(fragments):
+                write_fragment(
+                    {"command": change_types[index % len(change_types)], "entries": [f"{index}"]}
+                )
+
+            start = time.perf_counter()
+            cl = load_changelog()
+            elapsed = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+
+    table = Table("fragments", "entries", "collect")
+    table.add_row(
+        str(fragments),
+        str(sum(len(change.entries) for change in cl.versions[0].changes)),
+        f"{elapsed * 1e3:.1f}ms",
+    )
+    Console().print(table)
+
+
+def write_synthetic_markdown(path: str, size: int):
+    """
+    Writes a CHANGELOG.md of about `size` bytes, one section at a time.
+    """
+    change_types = [change_type.value for change_type in ChangeType]
+    written = 0
+    index = 0
+    with open(path, "w") as file:
+        file.write(changelog_template().module.header().lstrip())
+        while written < size:
+            version = Version(
+                f"{index // 10000}.{index // 100 % 100}.{index % 100}",
+                "2023-03-17",
+                [
+                    Change(change_type, [f"Entry {index} - {change_type}", "Second entry"])
+                    for change_type in change_types[: index % len(change_types) + 1]
+                ],
+            )
+            section = str(changelog_template().module.section(version))
+            written += file.write(section)
+            index += 1
+        file.write(f"\n[0.0.0]: {REPOSITORY}/releases/tag/v0.0.0\n")
+
+
+@main.command()
+@click.option("--size", default=100, show_default=True, help="Size of CHANGELOG.md in MB.")
+@click.option("--memory", is_flag=True, help="Trace the peak memory, it is much slower.")
+@click.option("--parallel", is_flag=True, help="Parse chunks in worker processes.")
+@click.option("--jobs", "-j", type=int, help="Number of worker processes.")
+def parse(size: int, memory: bool, parallel: bool, jobs: int | None) -> None:
+    """
+    Time and memory of the "import" command parser on a synthetic CHANGELOG.md.
+    """
+    import tracemalloc
+
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            write_synthetic_markdown("CHANGELOG.md", size * 1024 * 1024)
+            if memory:
+                tracemalloc.start()
+
+            start = time.perf_counter()
+            cl = parse_changelog_parallel(jobs=jobs) if parallel else parse_changelog()
+            elapsed = time.perf_counter() - start
+
+            peak = tracemalloc.get_traced_memory()[1] if memory else None
+            tracemalloc.stop()
+        finally:
+            os.chdir(cwd)
+
+    table = Table("size", "versions", "entries", "time", "throughput", "peak memory")
+    table.add_row(
+        f"{size}MB",
+        str(len(cl.versions)),
+        str(sum(len(change.entries) for v in cl.versions for change in v.changes)),
+        f"{elapsed:.2f}s",
+        f"{size / elapsed:.1f}MB/s",
+        f"{peak / 1024 / 1024:.1f}MB" if peak is not None else "-",
+    )
+    Console().print(table)
+
+
+@main.command()
+@click.option("--versions", default=200000, show_default=True, help="Versions in the changelog.")
+@click.option("--entries", default=5, show_default=True, help="Entries per version.")
+def memory(versions: int, entries: int) -> None:
+    """
+    Memory of the model loaded from changelog.lock, traced with tracemalloc.
+    """
+    import tracemalloc
+
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            with open("changelog.lock", "w") as file:
+                json.dump(synthetic_changelog(versions, entries).to_dict(), file)
+
+            with patch.dict(os.environ, {CACHE_DIR_ENV: ""}):
+                tracemalloc.start()
+                cl = load_changelog()
+                size, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+        finally:
+            os.chdir(cwd)
+
+    total = sum(len(change.entries) for version in cl.versions for change in version.changes or [])
+    table = Table("versions", "entries", "model", "peak", "per entry")
+    table.add_row(
+        str(len(cl.versions)),
+        str(total),
+        f"{size / 1024 / 1024:.1f}MB",
+        f"{peak / 1024 / 1024:.1f}MB",
+        f"{size / total:.0f}B",
+    )
+    Console().print(table)
+
+
+@main.command()
+@click.option(
+    "--versions",
+    multiple=True,
+    default=[10000, 100000],
+    show_default=True,
+    help="Versions in the changelog, it can be repeated.",
+)
+def sort(versions: tuple[int]) -> None:
+    """
+    Cost of sorting shuffled versions with the semver comparator or with the cached keys.
+    """
+    import random
+
+    table = Table("versions", "semver comparator", "sort keys", "speedup")
+    for size in versions:
+        names = ["Unreleased"] + [
+            f"{index // 10000}.{index // 100 % 100}.{index % 100}" for index in range(size - 1)
+        ]
+        random.Random(size).shuffle(names)
+
+        data = [Version(name) for name in names]
+        start = time.perf_counter()
+        data.sort(key=version_comparator())
+        before = time.perf_counter() - start
+
+        version_key.cache_clear()
+        data = [Version(name) for name in names]
+        start = time.perf_counter()
+        sort_versions(data)
+        after = time.perf_counter() - start
+
+        table.add_row(
+            str(size), f"{before * 1e3:.1f}ms", f"{after * 1e3:.1f}ms", f"{before / after:.1f}x"
+        )
+    Console().print(table)
+
+
+@main.command()
+@click.option("--versions", default=200000, show_default=True, help="Versions in the changelog.")
+@click.option("--entries", default=5, show_default=True, help="Entries per version.")
+@click.option(
+    "--query",
+    "queries",
+    multiple=True,
+    default=["login timeout", "log*", "(login OR session) NOT timeout", '"export csv"'],
+    show_default=True,
+    help="Queries to measure, it can be repeated.",
+)
+def search(versions: int, entries: int, queries: tuple[str]) -> None:
+    """
+    Time to build changelog.index, to update it after an add and to run queries.
+    """
+    import random
+
+    from changeloggh.search import search as search_entries, update_index
+
+    generator = random.Random(versions)
+    verbs = ["Fix", "Add", "Remove", "Improve", "Update", "Export", "Deprecate"]
+    nouns = ["login", "logout", "session", "timeout", "csv", "json", "panel", "cache", "token"]
+    cl = synthetic_changelog(versions, 0)
+    for version in cl.versions[1:]:
+        for change in version.changes:
+            change.entries = tuple(
+                f"{generator.choice(verbs)} {generator.choice(nouns)} {generator.choice(nouns)}"
+                for _ in range(entries)
+            )
+
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            with patch.dict(os.environ, {CACHE_DIR_ENV: ""}):
+                cl.save()
+                start = time.perf_counter()
+                update_index(cl)
+                build = time.perf_counter() - start
+
+                cl.add(ChangeType.Fixed, "Fix login timeout")
+                start = time.perf_counter()
+                cl.save()
+                add = time.perf_counter() - start
+
+                table = Table("query", "matches", "time")
+                for query in queries:
+                    search_entries(query, limit=20)
+                    start = time.perf_counter()
+                    results = search_entries(query, limit=20)
+                    table.add_row(
+                        query, str(len(results)), f"{(time.perf_counter() - start) * 1e3:.1f}ms"
+                    )
+        finally:
+            os.chdir(cwd)
+
+    console = Console()
+    console.print(f"{versions * entries} entries, index built in {build:.1f}s")
+    console.print(f"save after an add, with the index update: {add * 1e3:.0f}ms")
+    console.print(table)
+
+
+@main.command()
+@click.option("--versions", default=200000, show_default=True, help="Versions in the changelog.")
+@click.option("--entries", default=5, show_default=True, help="Entries per version.")
+@click.option("--span", default=20, show_default=True, help="Versions in the diff.")
+def diff(versions: int, entries: int, span: int) -> None:
+    """
+    Cost of a diff of the newest versions, in memory and from changelog.lock.
+    """
+    cl = synthetic_changelog(versions, entries)
+    to_version, from_version = cl.versions[1].version, cl.versions[span + 1].version
+
+    def scan():
+        keys = version_key(from_version), version_key(to_version)
+        return [version for version in cl.versions if keys[0] < version.sort_key <= keys[1]]
+
+    table = Table("diff", "time")
+    table.add_row("scan every version", f"{per_call(scan, 5) * 1e3:.2f}ms")
+    table.add_row(
+        "binary search", f"{per_call(lambda: cl.between(from_version, to_version), 50) * 1e3:.2f}ms"
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            with patch.dict(os.environ, {CACHE_DIR_ENV: ""}):
+                cl.save()
+                load_and_diff = per_call(
+                    lambda: load_changelog(limit=1).diff(from_version, to_version), 1
+                )
+                load_and_print = per_call(lambda: load_changelog().to_string(), 1)
+                table.add_row("load changelog.lock and diff", f"{load_and_diff * 1e3:.0f}ms")
+                table.add_row("load changelog.lock and print", f"{load_and_print * 1e3:.0f}ms")
+        finally:
+            os.chdir(cwd)
+
+    Console().print(f"{versions} versions, {span} in the diff")
+    Console().print(table)
+
+
+@main.command()
+@click.option("--versions", default=400000, show_default=True, help="Versions in the changelog.")
+@click.option("--entries", default=5, show_default=True, help="Entries per version.")
+def stats(versions: int, entries: int) -> None:
+    """
+    Cost of the stats of a changelog, in memory and from changelog.lock.
+    """
+    from changeloggh.changelog import read_versions
+    from changeloggh.stats import Stats
+
+    cl = synthetic_changelog(versions, entries)
+    start = time.perf_counter()
+    Stats().count(version.to_dict() for version in cl.versions).to_csv("release")
+    count = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            with patch.dict(os.environ, {CACHE_DIR_ENV: ""}):
+                cl.save_snapshot()
+                del cl
+                start = time.perf_counter()
+                Stats().count(read_versions()).to_csv("month")
+                stream = time.perf_counter() - start
+                start = time.perf_counter()
+                Stats().count(version.to_dict() for version in load_changelog().versions)
+                load = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+
+    table = Table("stats", "time")
+    table.add_row("count in memory and csv per release", f"{count * 1e3:.0f}ms")
+    table.add_row("stream changelog.lock, count and csv per month", f"{stream * 1e3:.0f}ms")
+    table.add_row("load the model of changelog.lock and count", f"{load * 1e3:.0f}ms")
+    Console().print(f"{versions} versions, {versions * entries} entries")
+    Console().print(table)
+
+
+@main.command()
+@click.option("--versions", default=200000, show_default=True, help="Versions in the changelog.")
+@click.option("--entries", default=5, show_default=True, help="Entries per version.")
+@click.option("--limit", default=10, show_default=True, help="Versions printed with --limit.")
+def subset(versions: int, entries: int, limit: int) -> None:
+    """
+    Cost of "print" with filters, the subset is selected before rendering it.
+    """
+    from rich.markdown import Markdown
+
+    cl = synthetic_changelog(versions, entries)
+    newest = cl.versions[1].version
+    console = Console(file=open(os.devnull, "w"))
+
+    def render(changelog: Changelog):
+        console.print(Markdown(changelog.to_string()))
+
+    table = Table("print", "time")
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            with patch.dict(os.environ, {CACHE_DIR_ENV: ""}):
+                cl.save_snapshot()
+                cases = [
+                    ("text, whole changelog", lambda: load_changelog().to_string()),
+                    (
+                        f"text, --limit {limit}",
+                        lambda: load_changelog(limit=limit).select(limit=limit).to_string(),
+                    ),
+                    (
+                        f"rich, --limit {limit}",
+                        lambda: render(load_changelog(limit=limit).select(limit=limit)),
+                    ),
+                    (
+                        f"rich, --until {newest} --type Fixed --limit {limit}",
+                        lambda: render(
+                            load_changelog(limit=limit).select(limit, until=newest, types=["Fixed"])
+                        ),
+                    ),
+                ]
+                for name, function in cases:
+                    table.add_row(name, f"{per_call(function, 1) * 1e3:.0f}ms")
+        finally:
+            os.chdir(cwd)
+
+    Console().print(f"{versions} versions, {versions * entries} entries")
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    main()
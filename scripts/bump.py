@@ -3,6 +3,8 @@ from rich.console import Console
 
 from scripts import CommandProcessor
 
+PACKAGE_INIT_PATH = "changeloggh/__init__.py"
+
 
 @click.command()
 @click.argument(
@@ -22,6 +24,7 @@ def main(rule: str) -> None:
     """
     bump_version(rule)
     new_app_version = get_app_version()
+    update_package_version(new_app_version)
     changelog_release(new_app_version)
 
     console = Console()
@@ -37,6 +40,11 @@ def main(rule: str) -> None:
     confirm_changes(new_app_version)
 
 
+def update_package_version(version: str) -> None:
+    with open(PACKAGE_INIT_PATH, "w") as file:
+        file.write(f'__version__ = VERSION = "{version}"\n')
+
+
 def changelog_release(version: str) -> None:
     init_commands = {
         f"upgrading changelog to a [purple bold]{version}[/] version": (
@@ -0,0 +1,101 @@
+import re
+import shlex
+import subprocess
+import sys
+import tempfile
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+\d+\s+\|\s+(\S+)$")
+HEAVY_MODULES = ["textual", "rich", "jinja2", "semver"]
+
+# command: (max number of imported modules, modules that must not be imported)
+BUDGETS = {
+    "--help": (210, HEAVY_MODULES),
+    "latest": (220, ["textual", "rich", "jinja2"]),
+    "added 'New feature'": (250, ["textual", "rich"]),
+    "fixed 'Fix bug'": (250, ["textual", "rich"]),
+    "update": (250, ["textual", "rich"]),
+    "print --format text": (250, ["textual", "rich"]),
+}
+
+
+def import_times(command: str, cwd: str) -> dict[str, int]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "changeloggh", *shlex.split(command)],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+
+    if result.returncode:
+        raise click.ClickException(f'"{command}" failed:\n{result.stdout}{result.stderr}')
+
+    times = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            times[match.group(2)] = int(match.group(1))
+    return times
+
+
+@click.command()
+@click.option(
+    "--max-time",
+    type=float,
+    default=None,
+    help="Also fail if a command spends more than these milliseconds importing.",
+)
+def main(max_time: float | None) -> None:
+    """
+    Measure the imports of every command with "python -X importtime"
+    and fail if a command imports more modules than its budget,
+    imports a forbidden module or exceeds --max-time.
+
+    \b
+    Examples:
+        poetry run python -m scripts.startup
+        poetry run python -m scripts.startup --max-time 50
+    """
+    console = Console()
+    table = Table("command", "imports", "budget", "time", "forbidden")
+    failed = False
+
+    with tempfile.TemporaryDirectory() as cwd:
+        import_times("init https://github.com/sauljabin/changeloggh", cwd)
+
+        for command, (budget, forbidden) in BUDGETS.items():
+            times = import_times(command, cwd)
+            total = sum(times.values()) / 1000
+            too_slow = max_time is not None and total > max_time
+            leaked = sorted(
+                {
+                    module
+                    for module in forbidden
+                    for name in times
+                    if name == module or name.startswith(f"{module}.")
+                }
+            )
+
+            if len(times) > budget or too_slow or leaked:
+                failed = True
+
+            table.add_row(
+                command,
+                f"[{'red' if len(times) > budget else 'green'}]{len(times)}[/]",
+                str(budget),
+                f"[{'red' if too_slow else 'green'}]{total:.1f}ms[/]",
+                f"[red]{', '.join(leaked)}[/]" if leaked else "",
+            )
+
+    console.print(table)
+
+    if failed:
+        console.print("[bold red]Import budget exceeded[/]")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
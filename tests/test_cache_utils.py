@@ -0,0 +1,42 @@
+import os
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from changeloggh.cache_utils import cache_dir, cache_get, cache_put, CACHE_DIR_ENV
+
+
+class TestApp(TestCase):
+    @patch.dict(os.environ, {CACHE_DIR_ENV: ""})
+    def test_disabled_by_default(self):
+        self.assertIsNone(cache_dir("jinja"))
+
+    def test_create_cache_dir(self):
+        with tempfile.TemporaryDirectory() as root:
+            with patch.dict(os.environ, {CACHE_DIR_ENV: root}):
+                path = cache_dir("jinja")
+
+            self.assertEqual(Path(root) / "jinja", path)
+            self.assertTrue(path.is_dir())
+
+    def test_get_and_put(self):
+        with tempfile.TemporaryDirectory() as root:
+            with patch.dict(os.environ, {CACHE_DIR_ENV: root}):
+                self.assertIsNone(cache_get("model", "a"))
+
+                cache_put("model", "a", b"content", max_entries=2)
+
+                self.assertEqual(b"content", cache_get("model", "a"))
+
+    def test_remove_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as root:
+            with patch.dict(os.environ, {CACHE_DIR_ENV: root}):
+                for index, key in enumerate(["a", "b"]):
+                    cache_put("model", key, key.encode(), max_entries=2)
+                    os.utime(Path(root) / "model" / key, ns=(index, index))
+                cache_get("model", "a")
+
+                cache_put("model", "c", b"c", max_entries=2)
+
+                self.assertEqual(["a", "c"], sorted(os.listdir(Path(root) / "model")))
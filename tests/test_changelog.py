@@ -1,8 +1,13 @@
 import copy
 import json
+import multiprocessing
+import os
+import random
+import tempfile
+from contextlib import contextmanager
 from datetime import date
 from unittest import TestCase
-from unittest.mock import patch, mock_open, call
+from unittest.mock import patch, mock_open
 
 from changeloggh.changelog import (
     Change,
@@ -13,8 +18,32 @@ from changeloggh.changelog import (
     ChangeType,
     BumpRule,
     parse_changelog,
+    read_operations,
     JSON_INDENT,
+    changelog_template,
+    Storage,
+    commit,
+    CHANGELOG_JOURNAL_PATH,
+    CHANGELOG_LOCK_PATH,
+    CHANGELOG_QUEUE_PATH,
+    CHANGELOG_RENDER_PATH,
+    CHANGELOG_STATE_PATH,
+    CHANGELOG_SHARDS_PATH,
+    CHANGELOG_MANIFEST_PATH,
+    read_shard,
+    read_versions,
+    load_storage,
+    write_fragment,
+    parse_changelog_parallel,
+    version_boundaries,
+    CHANGELOG_FRAGMENTS_PATH,
+    MODEL_CACHE_NAME,
+    MODEL_CACHE_SIZE,
+    FRAGMENT_CACHE_NAME,
+    fragment_cache,
 )
+from changeloggh.cache_utils import CACHE_DIR_ENV
+from changeloggh.version_utils import change_comparator, version_comparator
 
 REPO_EXAMPLE = "https://github.com/sauljabin/changeloggh"
 
@@ -116,6 +145,22 @@ DICT_EXAMPLE = {
     ],
 }
 
+
+@contextmanager
+def working_directory():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as path:
+        os.chdir(path)
+        try:
+            yield path
+        finally:
+            os.chdir(cwd)
+
+
+def commit_entry(entry):
+    commit([{"command": "fixed", "entries": [entry]}])
+
+
 JSON_EXAMPLE = json.dumps(DICT_EXAMPLE)
 JSON_INDENT_EXAMPLE = json.dumps(DICT_EXAMPLE, indent=JSON_INDENT)
 
@@ -128,6 +173,21 @@ class TestApp(TestCase):
         self.assertEqual(CHANGELOG_EXAMPLE, str(cl))
         self.assertEqual(CHANGELOG_EXAMPLE, cl.to_string())
 
+    def test_template_is_compiled_once(self):
+        self.assertIs(changelog_template(), changelog_template())
+
+    def test_template_bytecode_cache(self):
+        with tempfile.TemporaryDirectory() as root:
+            changelog_template.cache_clear()
+            try:
+                with patch.dict(os.environ, {CACHE_DIR_ENV: root}):
+                    cl = Changelog(repository=REPO_EXAMPLE, versions=VERSIONS_EXAMPLE)
+                    self.assertEqual(CHANGELOG_EXAMPLE, cl.to_string())
+            finally:
+                changelog_template.cache_clear()
+
+            self.assertEqual(1, len(os.listdir(os.path.join(root, "jinja"))))
+
     def test_string_only_header(self):
         cl = Changelog()
         self.assertEqual(CHANGELOG_HEADER_EXAMPLE, str(cl))
@@ -145,19 +205,17 @@ class TestApp(TestCase):
         cl = Changelog(repository=REPO_EXAMPLE, versions=VERSIONS_EXAMPLE)
         self.assertEqual(DICT_EXAMPLE, cl.to_dict())
 
-    @patch("builtins.open", new_callable=mock_open)
-    def test_save(self, mock_function_open):
+    def test_save(self):
         cl = Changelog(repository=REPO_EXAMPLE, versions=VERSIONS_EXAMPLE)
 
-        cl.save()
-
-        mock_function_open.assert_has_calls(
-            [call("./CHANGELOG.md", "w"), call("./changelog.lock", "w")], any_order=True
-        )
+        with working_directory():
+            cl.save()
 
-        mock_function_open.return_value.write.assert_has_calls(
-            [call(CHANGELOG_EXAMPLE), call(JSON_INDENT_EXAMPLE)]
-        )
+            self.assertEqual(["CHANGELOG.md", "changelog.lock"], sorted(os.listdir()))
+            with open("./CHANGELOG.md") as file:
+                self.assertEqual(CHANGELOG_EXAMPLE, file.read())
+            with open("./changelog.lock") as file:
+                self.assertEqual(JSON_INDENT_EXAMPLE, file.read())
 
     def test_empty_changelog(self):
         cl = empty_changelog()
@@ -264,6 +322,135 @@ class TestApp(TestCase):
         ]
         self.assertEqual(expected, cl.to_dict()["versions"])
 
+    def test_add_goes_to_unreleased_if_there_are_many_releases(self):
+        cl = Changelog(
+            versions=[
+                Version("1.0.1", "2023-03-17", [Change("Fixed", ["Fix"])]),
+                Version("1.0.0", "2023-03-17", [Change("Added", ["Feature"])]),
+            ],
+        )
+
+        cl.add(ChangeType.Added, "New")
+
+        self.assertEqual("Unreleased", cl.versions[0].version)
+        self.assertEqual(["New"], cl.versions[0].changes[0].entries)
+        self.assertEqual(
+            {"type": "Fixed", "entries": ["Fix"]}, cl.to_dict()["versions"][1]["changes"][0]
+        )
+
+    def test_released_versions_are_frozen(self):
+        cl = Changelog(versions=[Version("Unreleased", changes=[Change("Added", ["New"])])])
+
+        cl.release("1.0.0", "2023-03-17")
+
+        self.assertEqual(("New",), cl.versions[1].changes[0].entries)
+        self.assertIsInstance(cl.versions[1].changes, tuple)
+        self.assertIsNone(cl.versions[0].changes)
+
+    def test_copies_share_released_versions(self):
+        cl = self.history()
+
+        copied = copy.deepcopy(cl)
+
+        self.assertIsNot(cl.versions[0], copied.versions[0])
+        self.assertIsNot(cl.versions[0].changes, copied.versions[0].changes)
+        for version, copied_version in zip(cl.versions[1:], copied.versions[1:]):
+            self.assertIs(version, copied_version)
+        self.assertEqual(cl.to_dict(), copied.to_dict())
+
+    def test_change_types_are_interned(self):
+        changes = json.loads(
+            '[{"type": "Added"}, {"type": "Added"}]',
+            object_hook=lambda obj: Change(obj["type"]),
+        )
+
+        self.assertIs(changes[0].change_type, changes[1].change_type)
+
+    def test_add_and_release_keep_comparator_order(self):
+        generator = random.Random(18)
+        change_types = list(ChangeType)
+        cl = Changelog(versions=[Version("Unreleased")])
+
+        for number in range(300):
+            cl.add(generator.choice(change_types), f"Entry {number}")
+            changes = cl.versions[0].changes
+            self.assertEqual(sorted(changes, key=change_comparator()), changes)
+
+            if generator.random() < 0.1:
+                version = ".".join(str(generator.randint(0, 9)) for _ in range(3))
+                if version not in [inner_version.version for inner_version in cl.versions]:
+                    cl.release(version, "2024-01-01")
+                    expected = sorted(cl.versions, key=version_comparator())
+                    self.assertEqual(
+                        [inner_version.version for inner_version in expected],
+                        [inner_version.version for inner_version in cl.versions],
+                    )
+
+    def test_add_keeps_custom_change_types(self):
+        unreleased = Version("Unreleased", changes=[Change("Performance", ["Faster"])])
+        cl = Changelog(versions=[unreleased])
+
+        cl.add(ChangeType.Security, "Patch")
+        cl.add(ChangeType.Added, "New")
+        cl.add(ChangeType.Added, "Other")
+
+        self.assertEqual(
+            [
+                {"type": "Added", "entries": ["New", "Other"]},
+                {"type": "Performance", "entries": ["Faster"]},
+                {"type": "Security", "entries": ["Patch"]},
+            ],
+            cl.to_dict()["versions"][0]["changes"],
+        )
+        self.assertEqual(["Added", "Performance", "Security"], sorted(unreleased.buckets))
+        self.assertIs(unreleased.changes[0], unreleased.buckets["Added"])
+
+    def test_release_clears_the_buckets(self):
+        cl = Changelog(versions=[Version("Unreleased")])
+        cl.add(ChangeType.Added, "New")
+
+        cl.release("1.0.0", "2023-03-17")
+        cl.add(ChangeType.Added, "Next")
+
+        self.assertEqual(["Next"], cl.versions[0].changes[0].entries)
+        self.assertEqual(("New",), cl.versions[1].changes[0].entries)
+        self.assertIsNone(cl.versions[1].buckets)
+
+    def test_add_skips_repeated_entries(self):
+        cl = Changelog(versions=[Version("Unreleased", changes=[Change("Fixed", ["Fix bug"])])])
+
+        cl.add(ChangeType.Fixed, "fix  BUG ")
+        cl.add(ChangeType.Added, "Fix bug")
+        cl.add(ChangeType.Added, "Fix bug")
+
+        self.assertEqual(
+            [{"type": "Added", "entries": ["Fix bug"]}, {"type": "Fixed", "entries": ["Fix bug"]}],
+            cl.to_dict()["versions"][0]["changes"],
+        )
+        self.assertEqual([{"command": "added", "entries": ["Fix bug"]}], cl.operations)
+
+    def test_retried_commit_writes_nothing(self):
+        with working_directory():
+            empty_changelog(REPO_EXAMPLE).save()
+
+            self.assertEqual(2, len(commit([{"command": "fixed", "entries": ["Fix"]}])[1]))
+            self.assertEqual(([None], []), commit([{"command": "fixed", "entries": ["Fix"]}]))
+
+    def test_dedupe(self):
+        entries = [f"Entry {number % 1000}" for number in range(100000)]
+        cl = Changelog(
+            versions=[
+                Version("Unreleased", changes=[Change("Added", list(entries))]),
+                Version("1.0.0", "2023-03-17", [Change("Added", ["Entry 1"] + entries)]),
+            ]
+        )
+
+        self.assertEqual(99000 + 99000 + 1, cl.dedupe())
+        self.assertEqual(1000, len(cl.versions[0].changes[0].entries))
+        self.assertEqual(1000, len(cl.versions[1].changes[0].entries))
+        self.assertIs(cl.versions[1], cl.find("1.0.0"))
+        self.assertEqual(0, cl.dedupe())
+
     def test_add_and_sort_change_added(self):
         cl = Changelog(versions=copy.deepcopy(VERSIONS_EXAMPLE))
 
@@ -628,3 +815,934 @@ class TestApp(TestCase):
     def test_import(self, mock_open_function):
         cl = parse_changelog()
         self.assertEqual(DICT_EXAMPLE, cl.to_dict())
+
+    def test_apply_operations(self):
+        cl = Changelog(versions=[Version("Unreleased")])
+
+        self.assertIsNone(cl.apply({"command": "fixed", "entries": ["Fix 1", "Fix 2"]}))
+        self.assertEqual("0.1.0", cl.apply({"command": "bump", "rule": "minor"}))
+        cl.apply({"command": "added", "entries": ["Feature"]})
+        self.assertEqual("1.0.0", cl.apply({"command": "release", "version": "1.0.0"}))
+
+        self.assertEqual(
+            {
+                "versions": [
+                    {"version": "Unreleased"},
+                    {
+                        "version": "1.0.0",
+                        "date": str(date.today()),
+                        "changes": [{"type": "Added", "entries": ["Feature"]}],
+                    },
+                    {
+                        "version": "0.1.0",
+                        "date": str(date.today()),
+                        "changes": [{"type": "Fixed", "entries": ["Fix 1", "Fix 2"]}],
+                    },
+                ]
+            },
+            cl.to_dict(),
+        )
+
+    def test_raise_error_if_operation_is_unknown(self):
+        with self.assertRaises(Exception) as context:
+            Changelog().apply({"command": "print"})
+
+        self.assertEqual("Unknown command print", str(context.exception))
+
+    def test_apply_all_operations(self):
+        cl = Changelog(versions=[Version("Unreleased")])
+
+        results = cl.apply_all(
+            [
+                {"command": "security", "entries": ["Patch"]},
+                {"command": "added", "entries": ["Feature 1"]},
+                {"command": "fixed", "entries": ["Fix"]},
+                {"command": "added", "entries": ["Feature 2"]},
+            ]
+        )
+
+        self.assertEqual([None, None, None, None], results)
+        self.assertEqual(
+            {
+                "version": "Unreleased",
+                "changes": [
+                    {"type": "Added", "entries": ["Feature 1", "Feature 2"]},
+                    {"type": "Fixed", "entries": ["Fix"]},
+                    {"type": "Security", "entries": ["Patch"]},
+                ],
+            },
+            cl.to_dict()["versions"][0],
+        )
+
+    def test_raise_error_if_an_operation_fails(self):
+        with self.assertRaises(Exception) as context:
+            Changelog(versions=[Version("Unreleased")]).apply_all(
+                [{"command": "added", "entries": ["Feature"]}, {"command": "bump", "rule": "x"}]
+            )
+
+        self.assertEqual("Operation 2 failed: Invalid bump rule x", str(context.exception))
+
+    def test_read_operations(self):
+        lines = ['{"command": "added", "entries": ["Feature"]}\n', "\n", '{"command": "latest"}']
+
+        self.assertEqual(
+            [{"command": "added", "entries": ["Feature"]}, {"command": "latest"}],
+            list(read_operations(lines)),
+        )
+
+    def test_raise_error_if_operation_is_not_json(self):
+        for line, message in [("nope", "is not valid json"), ("[]", "is not a json object")]:
+            with self.assertRaises(Exception) as context:
+                list(read_operations(["", line]))
+
+            self.assertEqual(f"Line 2 {message}", str(context.exception))
+
+    def test_journal_storage_appends_operations(self):
+        with working_directory():
+            empty_changelog(REPO_EXAMPLE, Storage.journal).save_snapshot()
+            with open(CHANGELOG_LOCK_PATH) as file:
+                snapshot = file.read()
+
+            cl = load_changelog()
+            cl.add(ChangeType.Added, "Feature 1")
+            cl.add(ChangeType.Added, "Feature 2")
+            cl.release("1.0.0", "2023-03-17")
+            cl.save()
+
+            cl = load_changelog()
+            cl.add(ChangeType.Fixed, "Fix")
+            cl.save()
+
+            with open(CHANGELOG_LOCK_PATH) as file:
+                self.assertEqual(snapshot, file.read())
+
+            with open(CHANGELOG_JOURNAL_PATH) as file:
+                self.assertEqual(
+                    [
+                        {"command": "added", "entries": ["Feature 1", "Feature 2"]},
+                        {"command": "release", "version": "1.0.0", "date": "2023-03-17"},
+                        {"command": "fixed", "entries": ["Fix"]},
+                    ],
+                    list(read_operations(file)),
+                )
+
+            self.assertEqual(
+                {
+                    "repository": REPO_EXAMPLE,
+                    "storage": "journal",
+                    "versions": [
+                        {
+                            "version": "Unreleased",
+                            "changes": [{"type": "Fixed", "entries": ["Fix"]}],
+                        },
+                        {
+                            "version": "1.0.0",
+                            "date": "2023-03-17",
+                            "changes": [{"type": "Added", "entries": ["Feature 1", "Feature 2"]}],
+                        },
+                    ],
+                },
+                load_changelog().to_dict(),
+            )
+
+    def test_save_snapshot_folds_journal(self):
+        with working_directory():
+            empty_changelog(REPO_EXAMPLE, Storage.journal).save_snapshot()
+            cl = load_changelog()
+            cl.add(ChangeType.Added, "Feature")
+            cl.save()
+
+            load_changelog().save_snapshot()
+
+            self.assertFalse(os.path.exists(CHANGELOG_JOURNAL_PATH))
+            self.assertEqual(cl.to_dict(), load_changelog().to_dict())
+            with open("CHANGELOG.md") as file:
+                self.assertIn("- Feature", file.read())
+
+    def test_commit(self):
+        with working_directory():
+            empty_changelog(REPO_EXAMPLE).save()
+
+            self.assertEqual(
+                ([None], ["./CHANGELOG.md", "./changelog.lock"]),
+                commit([{"command": "added", "entries": ["Feature"]}]),
+            )
+            self.assertEqual(
+                (["0.1.0"], ["./CHANGELOG.md", "./changelog.lock"]),
+                commit([{"command": "bump", "rule": "minor"}]),
+            )
+            self.assertEqual(([None], []), commit([{"command": "added", "entries": []}]))
+
+            self.assertEqual("0.1.0", load_changelog().latest())
+            self.assertEqual([], os.listdir(CHANGELOG_QUEUE_PATH))
+
+    def test_commit_merges_queued_requests(self):
+        with working_directory():
+            empty_changelog(REPO_EXAMPLE).save()
+            os.makedirs(CHANGELOG_QUEUE_PATH)
+            first, second = f"0-{os.getpid()}-1", f"0-{os.getpid()}-2"
+            for name, operations in [
+                (first, [{"command": "added", "entries": ["Feature"]}]),
+                (second, [{"command": "fixed", "entries": ["Fix"]}, {"command": "bump"}]),
+            ]:
+                with open(f"{CHANGELOG_QUEUE_PATH}/{name}.json", "w") as file:
+                    json.dump(operations, file)
+
+            with patch.object(Changelog, "save", autospec=True, side_effect=Changelog.save) as save:
+                self.assertEqual(["1.0.0"], commit([{"command": "release", "version": "1.0.0"}])[0])
+
+            save.assert_called_once()
+            self.assertEqual(
+                [f"{first}.done", f"{second}.done"], sorted(os.listdir(CHANGELOG_QUEUE_PATH))
+            )
+            with open(f"{CHANGELOG_QUEUE_PATH}/{second}.done") as file:
+                self.assertEqual(
+                    {"error": "Operation 2 failed: Invalid bump rule None"}, json.load(file)
+                )
+
+            cl = load_changelog()
+            self.assertEqual("1.0.0", cl.latest())
+            self.assertEqual(
+                [{"type": "Added", "entries": ["Feature"]}], cl.to_dict()["versions"][1]["changes"]
+            )
+
+    def test_raise_error_if_commit_fails(self):
+        with working_directory():
+            empty_changelog(REPO_EXAMPLE).save()
+
+            with self.assertRaises(Exception) as context:
+                commit([{"command": "bump", "rule": "minor"}])
+
+            self.assertEqual("There are not available changes", str(context.exception))
+
+    def test_failed_commit_is_not_applied_later(self):
+        with working_directory():
+            empty_changelog(REPO_EXAMPLE).save()
+            with open(CHANGELOG_LOCK_PATH) as file:
+                lock = file.read()
+            with open(CHANGELOG_LOCK_PATH, "w") as file:
+                file.write("{")
+
+            with self.assertRaises(Exception):
+                commit([{"command": "added", "entries": ["Ghost entry"]}])
+            self.assertEqual([], os.listdir(CHANGELOG_QUEUE_PATH))
+
+            with open(CHANGELOG_LOCK_PATH, "w") as file:
+                file.write(lock)
+            with patch("changeloggh.changelog.load_changelog", side_effect=Exception("Failed")):
+                with self.assertRaisesRegex(Exception, "Failed"):
+                    commit([{"command": "fixed", "entries": ["Lost"]}])
+            with patch.object(Changelog, "save", side_effect=Exception("Disk full")):
+                with self.assertRaisesRegex(Exception, "Disk full"):
+                    commit([{"command": "fixed", "entries": ["Unsaved"]}])
+            commit([{"command": "fixed", "entries": ["Real"]}])
+
+            self.assertEqual(
+                [{"type": "Fixed", "entries": ["Real"]}],
+                load_changelog().to_dict()["versions"][0]["changes"],
+            )
+            self.assertEqual([], os.listdir(CHANGELOG_QUEUE_PATH))
+
+    def test_commit_removes_requests_of_dead_writers(self):
+        with working_directory():
+            empty_changelog(REPO_EXAMPLE).save()
+            process = multiprocessing.Process(target=os.getpid)
+            process.start()
+            process.join()
+            os.makedirs(CHANGELOG_QUEUE_PATH)
+            for name in [f"0-{process.pid}-1.json", f"0-{process.pid}-2.done"]:
+                with open(f"{CHANGELOG_QUEUE_PATH}/{name}", "w") as file:
+                    json.dump([{"command": "added", "entries": ["Ghost entry"]}], file)
+
+            commit([{"command": "fixed", "entries": ["Real"]}])
+
+            self.assertEqual(
+                [{"type": "Fixed", "entries": ["Real"]}],
+                load_changelog().to_dict()["versions"][0]["changes"],
+            )
+            self.assertEqual([], os.listdir(CHANGELOG_QUEUE_PATH))
+
+    def test_commit_concurrent_writers(self):
+        entries = [f"Fix {index}" for index in range(24)]
+
+        with working_directory():
+            empty_changelog(REPO_EXAMPLE).save()
+
+            processes = [
+                multiprocessing.Process(target=commit_entry, args=(entry,)) for entry in entries
+            ]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+
+            self.assertEqual([0] * len(entries), [process.exitcode for process in processes])
+            cl = load_changelog()
+            self.assertEqual(sorted(entries), sorted(cl.versions[0].changes[0].entries))
+            with open("./CHANGELOG.md") as file:
+                self.assertEqual(cl.to_string(), file.read())
+
+    def history(self, repository: str = REPO_EXAMPLE) -> Changelog:
+        cl = empty_changelog(repository)
+        for minor in range(5):
+            cl.add(ChangeType.Added, f"Feature {minor}")
+            cl.add(ChangeType.Fixed, f"Fix {minor}")
+            cl.release(f"1.{minor}.0", "2024-01-01")
+        cl.add(ChangeType.Added, "Pending")
+        return cl
+
+    def test_partial_load_keeps_the_rest_as_text(self):
+        with working_directory():
+            self.history().save()
+            with open(CHANGELOG_LOCK_PATH) as file:
+                lock = file.read()
+
+            cl = load_changelog(limit=2)
+
+            self.assertEqual(["Unreleased", "1.4.0"], [v.version for v in cl.versions])
+            self.assertEqual("1.3.0", cl.tail_version)
+            self.assertEqual("1.4.0", cl.latest())
+            self.assertEqual(lock, cl.to_json(indent=JSON_INDENT))
+
+    def test_partial_load_saves_the_same_files(self):
+        for repository in [REPO_EXAMPLE, ""]:
+            with working_directory():
+                self.history(repository).save()
+                full = load_changelog()
+                full.add(ChangeType.Fixed, "Fix 5")
+                full.bump(BumpRule.minor)
+
+                cl = load_changelog(limit=2)
+                cl.add(ChangeType.Fixed, "Fix 5")
+                cl.bump(BumpRule.minor)
+                cl.save()
+
+                self.assertIsNotNone(cl.tail)
+                self.assertEqual(full.to_json(indent=JSON_INDENT), cl.to_json(indent=JSON_INDENT))
+                with open(CHANGELOG_LOCK_PATH) as file:
+                    self.assertEqual(full.to_json(indent=JSON_INDENT), file.read())
+                with open("CHANGELOG.md") as file:
+                    self.assertEqual(full.to_string(), file.read())
+
+    def test_partial_load_release_into_history(self):
+        with working_directory():
+            self.history().save()
+            cl = load_changelog(limit=2)
+            cl.add(ChangeType.Fixed, "Backport")
+
+            with self.assertRaises(Exception) as context:
+                cl.release("1.2.0")
+            self.assertEqual("Version 1.2.0 exists already", str(context.exception))
+
+            cl.release("1.2.1", "2024-01-01")
+
+            self.assertIsNone(cl.tail)
+            self.assertEqual(
+                ["Unreleased", "1.4.0", "1.3.0", "1.2.1", "1.2.0", "1.1.0", "1.0.0"],
+                [v.version for v in cl.versions],
+            )
+
+    def test_partial_load_without_versions(self):
+        with working_directory():
+            with open(CHANGELOG_LOCK_PATH, "w") as file:
+                json.dump({"repository": REPO_EXAMPLE, "versions": []}, file)
+
+            cl = load_changelog(limit=2)
+
+            self.assertEqual([], cl.versions)
+            self.assertEqual(REPO_EXAMPLE, cl.repository)
+            self.assertIsNone(cl.tail)
+            self.assertEqual("0.0.0", cl.latest())
+            cl.add(ChangeType.Added, "New")
+            self.assertEqual(["New"], list(cl.versions[0].changes[0].entries))
+
+    def test_partial_load_of_keys_after_the_versions(self):
+        with working_directory():
+            self.history().save()
+            with open(CHANGELOG_LOCK_PATH) as file:
+                lock = json.load(file)
+            with open(CHANGELOG_LOCK_PATH, "w") as file:
+                json.dump({"versions": lock["versions"], "repository": REPO_EXAMPLE}, file)
+
+            cl = load_changelog(limit=2)
+            cl.add(ChangeType.Added, "New")
+            cl.save()
+
+            self.assertEqual(REPO_EXAMPLE, cl.repository)
+            self.assertIsNone(cl.tail)
+            with open("CHANGELOG.md") as file:
+                markdown = file.read()
+            self.assertIn(f"[Unreleased]: {REPO_EXAMPLE}/compare/v1.4.0...HEAD", markdown)
+            self.assertEqual(load_changelog().to_string(), markdown)
+
+    def test_partial_load_without_markdown(self):
+        with working_directory():
+            self.history().save()
+            os.remove("CHANGELOG.md")
+
+            cl = load_changelog(limit=2)
+            cl.save()
+
+            with open("CHANGELOG.md") as file:
+                self.assertEqual(load_changelog().to_string(), file.read())
+
+    def test_partial_load_splices_the_rendered_markdown(self):
+        with working_directory():
+            os.makedirs(CHANGELOG_STATE_PATH)
+            self.history().save()
+
+            cl = load_changelog(limit=2)
+            cl.add(ChangeType.Added, "New")
+            with patch.object(Changelog, "to_string") as to_string:
+                cl.save()
+
+            to_string.assert_not_called()
+            self.assertTrue(os.path.exists(CHANGELOG_RENDER_PATH))
+            with open("CHANGELOG.md") as file:
+                self.assertEqual(load_changelog().to_string(), file.read())
+
+    def test_partial_load_renders_files_edited_by_hand(self):
+        for path, old, new in [
+            (CHANGELOG_LOCK_PATH, '"Feature 0"', '"First feature"'),
+            ("CHANGELOG.md", "- Fix 1", "- Edited fix"),
+        ]:
+            with working_directory():
+                os.makedirs(CHANGELOG_STATE_PATH)
+                self.history().save()
+                with open(path) as file:
+                    content = file.read()
+                with open(path, "w") as file:
+                    file.write(content.replace(old, new))
+
+                cl = load_changelog(limit=2)
+                cl.add(ChangeType.Added, "New")
+                cl.save()
+
+                self.assertIsNotNone(cl.tail)
+                with open("CHANGELOG.md") as file:
+                    self.assertEqual(load_changelog().to_string(), file.read())
+
+    def test_partial_load_of_an_unsorted_lock(self):
+        with working_directory():
+            self.history().save()
+            with open(CHANGELOG_LOCK_PATH) as file:
+                lock = json.load(file)
+            versions = {version["version"]: version for version in lock["versions"]}
+            lock["versions"] = [versions[name] for name in ["Unreleased", "1.2.0", "1.0.0"]]
+            lock["versions"].append(dict(versions["1.4.0"], version="2.0.0"))
+            with open(CHANGELOG_LOCK_PATH, "w") as file:
+                json.dump(lock, file, indent=JSON_INDENT)
+
+            cl = load_changelog(limit=2)
+
+            self.assertIsNone(cl.tail)
+            self.assertEqual("2.0.0", cl.latest())
+            self.assertEqual(
+                ["Unreleased", "2.0.0", "1.2.0", "1.0.0"], [v.version for v in cl.versions]
+            )
+            cl.add(ChangeType.Fixed, "Fix 5")
+            cl.bump(BumpRule.patch)
+            self.assertEqual("2.0.1", cl.versions[1].version)
+
+    def test_unreleased_in_lower_case(self):
+        cl = Changelog(
+            repository=REPO_EXAMPLE,
+            versions=[Version("unreleased"), Version("1.0.0", "2023-03-17")],
+        )
+        self.assertEqual("1.0.0", cl.latest())
+
+        cl.add(ChangeType.Fixed, "Fix")
+
+        self.assertEqual(["unreleased", "1.0.0"], [v.version for v in cl.versions])
+        self.assertFalse(cl.versions[0].frozen)
+        self.assertIs(cl.versions[0], cl.find("Unreleased"))
+        self.assertEqual(1, cl.to_string().lower().count("## [unreleased]"))
+        cl.bump(BumpRule.patch)
+        self.assertEqual(["unreleased", "1.0.1", "1.0.0"], [v.version for v in cl.versions])
+
+    def test_version_index(self):
+        cl = Changelog(versions=[Version("Unreleased"), Version("1.0.0", "2023-03-17")])
+
+        cl.add(ChangeType.Added, "New")
+        cl.release("1.1.0", "2023-03-18")
+
+        self.assertEqual({"unreleased", "1.1.0", "1.0.0"}, set(cl.index))
+        self.assertIs(cl.versions[1], cl.find("V1.1.0"))
+        self.assertIsNone(cl.find("2.0.0"))
+        cl.add(ChangeType.Fixed, "Fix")
+        with self.assertRaisesRegex(Exception, "Version V1.0.0 exists already"):
+            cl.release("V1.0.0")
+
+    def test_find_version_without_loading_the_rest(self):
+        with working_directory():
+            self.history().save()
+            cl = load_changelog(limit=2)
+
+            with patch.object(Changelog, "materialize") as materialize:
+                version = cl.find("1.1.0")
+
+            materialize.assert_not_called()
+            self.assertEqual(("Feature 1",), version.changes[0].entries)
+            self.assertIsNotNone(cl.tail)
+            self.assertEqual(
+                "## [1.1.0] - 2024-01-01\n\n### Added\n\n- Feature 1\n\n### Fixed\n\n- Fix 1",
+                cl.show("1.1.0"),
+            )
+
+    def test_diff(self):
+        cl = self.history()
+
+        self.assertEqual(["1.3.0", "1.2.0"], [v.version for v in cl.between("1.1.0", "v1.3.0")])
+        self.assertEqual(
+            "## [1.2.0...Unreleased]\n\n### Added\n\n- Pending\n- Feature 4\n- Feature 3"
+            "\n\n### Fixed\n\n- Fix 4\n- Fix 3",
+            cl.diff("1.2.0", "Unreleased"),
+        )
+        self.assertEqual(
+            "Added: Feature 1\nFixed: Fix 1",
+            cl.diff("1.0.0", "1.1.0", "text"),
+        )
+        self.assertEqual(
+            {
+                "from": "1.0.0",
+                "to": "1.1.0",
+                "versions": ["1.1.0"],
+                "changes": [
+                    {"type": "Added", "entries": ["Feature 1"]},
+                    {"type": "Fixed", "entries": ["Fix 1"]},
+                ],
+            },
+            json.loads(cl.diff("1.0.0", "1.1.0", "json")),
+        )
+        self.assertEqual("## [1.1.0...1.1.0]", cl.diff("1.1.0", "1.1.0"))
+
+    def test_raise_error_if_diff_versions_are_wrong(self):
+        cl = self.history()
+
+        with self.assertRaisesRegex(Exception, "Version 2.0.0 does not exist"):
+            cl.diff("1.0.0", "2.0.0")
+        with self.assertRaisesRegex(Exception, "Version 1.2.0 is newer than 1.1.0"):
+            cl.diff("1.2.0", "1.1.0")
+
+    def test_diff_parses_only_the_versions_it_needs(self):
+        for storage in [Storage.lock, Storage.sharded]:
+            with working_directory():
+                cl = self.history()
+                cl.storage = storage
+                cl.save()
+                cl = load_changelog(limit=3)
+
+                with (
+                    patch.object(Changelog, "materialize") as materialize,
+                    patch("changeloggh.changelog.read_shard", wraps=read_shard) as shard,
+                ):
+                    self.assertEqual(
+                        "Added: Feature 4\nFixed: Fix 4", cl.diff("1.3.0", "1.4.0", "text")
+                    )
+                    self.assertEqual(
+                        "Added: Feature 4\nAdded: Feature 3\nAdded: Feature 2\n"
+                        "Fixed: Fix 4\nFixed: Fix 3\nFixed: Fix 2",
+                        cl.diff("1.1.0", "1.4.0", "text"),
+                    )
+
+                materialize.assert_not_called()
+                self.assertEqual(3, len(cl.versions))
+                if storage == Storage.sharded:
+                    self.assertEqual({"1.1.0", "1.2.0"}, {c.args[0] for c in shard.call_args_list})
+
+    def test_read_versions(self):
+        for storage in [Storage.lock, Storage.journal]:
+            with working_directory():
+                cl = self.history()
+                cl.storage = storage
+                cl.save_snapshot()
+                commit([{"command": "fixed", "entries": ["Fix pending"]}])
+
+                self.assertEqual(
+                    [version.to_dict() for version in load_changelog().versions],
+                    list(read_versions()),
+                )
+
+    def test_select_everything_renders_the_whole_changelog(self):
+        cl = self.history()
+
+        self.assertEqual(cl.to_string(), cl.select(since="1.0.0").to_string())
+        self.assertIs(cl, cl.select())
+
+    def test_select_newest_versions(self):
+        with working_directory():
+            self.history().save()
+            cl = load_changelog(limit=2)
+
+            with patch.object(Changelog, "materialize") as materialize:
+                subset = cl.select(limit=2)
+
+            materialize.assert_not_called()
+            self.assertEqual(["Unreleased", "1.4.0"], [v.version for v in subset.versions])
+            self.assertEqual(
+                [
+                    f"[Unreleased]: {REPO_EXAMPLE}/compare/v1.4.0...HEAD",
+                    f"[1.4.0]: {REPO_EXAMPLE}/compare/v1.3.0...v1.4.0",
+                ],
+                subset.to_string().splitlines()[-2:],
+            )
+
+    def test_select_versions_and_types(self):
+        with working_directory():
+            self.history().save()
+            cl = load_changelog(limit=2)
+
+            subset = cl.select(since="v1.1.0", until="1.3.0", types=["fixed"])
+
+            self.assertEqual(["1.3.0", "1.2.0", "1.1.0"], [v.version for v in subset.versions])
+            self.assertEqual(
+                {
+                    "versions": [
+                        {
+                            "version": "1.1.0",
+                            "date": "2024-01-01",
+                            "changes": [{"type": "Fixed", "entries": ["Fix 1"]}],
+                        }
+                    ]
+                },
+                {"versions": subset.to_dict()["versions"][2:]},
+            )
+            self.assertEqual(
+                f"[1.1.0]: {REPO_EXAMPLE}/compare/v1.0.0...v1.1.0",
+                subset.to_string().splitlines()[-1],
+            )
+            self.assertEqual(
+                ["1.0.0"],
+                [v.version for v in cl.select(limit=1, until="1.0.0").versions],
+            )
+            self.assertEqual(
+                f"[1.0.0]: {REPO_EXAMPLE}/releases/tag/v1.0.0",
+                cl.select(until="1.0.0").to_string().splitlines()[-1],
+            )
+            self.assertEqual(
+                ["Unreleased"], [v.version for v in cl.select(types=["Added"], limit=1).versions]
+            )
+            self.assertEqual([], cl.select(types=["Security"]).versions)
+            self.assertEqual(("Fix 4",), cl.versions[1].changes[1].entries)
+
+    def test_select_parses_only_the_versions_it_needs(self):
+        for storage in [Storage.lock, Storage.sharded]:
+            with working_directory():
+                cl = self.history()
+                cl.storage = storage
+                cl.save()
+                cl = load_changelog(limit=2)
+
+                with (
+                    patch.object(Changelog, "materialize") as materialize,
+                    patch("changeloggh.changelog.read_shard", wraps=read_shard) as shard,
+                ):
+                    subset = cl.select(limit=2, until="1.3.0", types=["Fixed"])
+
+                materialize.assert_not_called()
+                self.assertEqual(["1.3.0", "1.2.0"], [v.version for v in subset.versions])
+                self.assertEqual(
+                    [
+                        f"[1.3.0]: {REPO_EXAMPLE}/compare/v1.2.0...v1.3.0",
+                        f"[1.2.0]: {REPO_EXAMPLE}/compare/v1.1.0...v1.2.0",
+                    ],
+                    [str(link) for link in subset.selected_links],
+                )
+                if storage == Storage.sharded:
+                    self.assertEqual(
+                        ["1.3.0", "1.2.0", "1.1.0"], [c.args[0] for c in shard.call_args_list]
+                    )
+
+    def test_raise_error_if_selected_versions_are_wrong(self):
+        cl = self.history()
+
+        with self.assertRaisesRegex(Exception, "Version 1.2.0 is newer than 1.1.0"):
+            cl.select(since="1.2.0", until="1.1.0")
+        with self.assertRaisesRegex(ValueError, "1.0 is not valid SemVer string"):
+            cl.select(since="1.0")
+
+    def test_find_version_in_unloaded_shard(self):
+        with working_directory():
+            cl = self.history()
+            cl.storage = Storage.sharded
+            cl.save()
+            cl = load_changelog(limit=1)
+
+            with patch("changeloggh.changelog.read_shard", wraps=read_shard) as shard:
+                version = cl.find("1.1.0")
+
+            shard.assert_called_once_with("1.1.0")
+            self.assertEqual("1.1.0", version.version)
+            self.assertEqual(1, len(cl.versions))
+
+    def test_model_cache(self):
+        with working_directory(), tempfile.TemporaryDirectory() as root:
+            with patch.dict(os.environ, {CACHE_DIR_ENV: root}):
+                self.history().save()
+
+                with patch("changeloggh.changelog.json_to_changelog") as parse:
+                    cl = load_changelog()
+                    parse.assert_not_called()
+
+                self.assertEqual(self.history().to_dict(), cl.to_dict())
+                self.assertEqual([], cl.operations)
+                self.assertEqual(1, len(os.listdir(os.path.join(root, MODEL_CACHE_NAME))))
+
+    def test_model_cache_invalidated_by_hand_edits(self):
+        with working_directory(), tempfile.TemporaryDirectory() as root:
+            with patch.dict(os.environ, {CACHE_DIR_ENV: root}):
+                self.history().save()
+                load_changelog()
+
+                with open(CHANGELOG_LOCK_PATH) as file:
+                    lock = file.read()
+                with open(CHANGELOG_LOCK_PATH, "w") as file:
+                    file.write(lock.replace("Feature 4", "Edited"))
+
+                self.assertEqual(("Edited",), load_changelog().versions[1].changes[0].entries)
+
+    def test_model_cache_is_bounded(self):
+        with working_directory(), tempfile.TemporaryDirectory() as root:
+            with patch.dict(os.environ, {CACHE_DIR_ENV: root}):
+                cl = empty_changelog(REPO_EXAMPLE)
+                for index in range(MODEL_CACHE_SIZE + 3):
+                    cl.add(ChangeType.Added, f"Feature {index}")
+                    cl.save()
+
+                self.assertEqual(
+                    MODEL_CACHE_SIZE, len(os.listdir(os.path.join(root, MODEL_CACHE_NAME)))
+                )
+
+    def test_model_cache_ignores_corrupt_entries(self):
+        with working_directory(), tempfile.TemporaryDirectory() as root:
+            with patch.dict(os.environ, {CACHE_DIR_ENV: root}):
+                self.history().save()
+                directory = os.path.join(root, MODEL_CACHE_NAME)
+                for name in os.listdir(directory):
+                    with open(os.path.join(directory, name), "wb") as file:
+                        file.write(b"corrupt")
+
+                self.assertEqual(self.history().to_dict(), load_changelog().to_dict())
+
+    def test_save_skips_unchanged_files(self):
+        with working_directory():
+            self.assertEqual(["./CHANGELOG.md", "./changelog.lock"], self.history().save())
+            for path in ["./CHANGELOG.md", CHANGELOG_LOCK_PATH]:
+                os.utime(path, ns=(0, 0))
+
+            cl = load_changelog()
+            self.assertFalse(cl.dirty)
+            self.assertEqual([], cl.save())
+
+            cl.add(ChangeType.Fixed, "Fix")
+            self.assertTrue(cl.dirty)
+            self.assertEqual(["./CHANGELOG.md", "./changelog.lock"], cl.save())
+            self.assertFalse(cl.dirty)
+            self.assertNotEqual(0, os.stat(CHANGELOG_LOCK_PATH).st_mtime_ns)
+
+    def test_fragment_cache(self):
+        fragment_cache.cache_clear()
+        module = changelog_template().module
+        cl = self.history()
+        expected = changelog_template().render(versions=cl.versions, links=cl.links(cl.versions))
+
+        with patch.object(module, "section", wraps=module.section) as section:
+            self.assertEqual(expected.strip(), cl.to_string())
+            self.assertEqual(6, section.call_count)
+
+            section.reset_mock()
+            cl.add(ChangeType.Fixed, "Fix")
+            cl.to_string()
+            section.assert_called_once_with(cl.versions[0])
+
+    def test_fragment_cache_on_disk(self):
+        with working_directory(), tempfile.TemporaryDirectory() as root:
+            with patch.dict(os.environ, {CACHE_DIR_ENV: root}):
+                fragment_cache.cache_clear()
+                expected = self.history().to_string()
+                fragment_cache.cache_clear()
+
+                module = changelog_template().module
+                with patch.object(module, "section", wraps=module.section) as section:
+                    self.assertEqual(expected, self.history().to_string())
+                    section.assert_not_called()
+
+                self.assertEqual(1, len(os.listdir(os.path.join(root, FRAGMENT_CACHE_NAME))))
+            fragment_cache.cache_clear()
+
+    def test_sharded_storage(self):
+        with working_directory():
+            cl = self.history()
+            cl.storage = Storage.sharded
+            cl.save()
+
+            self.assertEqual(
+                sorted(["manifest.json"] + [f"{v.version}.json" for v in cl.versions]),
+                sorted(os.listdir(CHANGELOG_SHARDS_PATH)),
+            )
+            with open(CHANGELOG_LOCK_PATH) as file:
+                self.assertEqual(
+                    {"repository": REPO_EXAMPLE, "storage": "sharded"}, json.load(file)
+                )
+            with open("CHANGELOG.md") as file:
+                self.assertEqual(cl.to_string(), file.read())
+            self.assertEqual(cl.to_dict(), load_changelog().to_dict())
+
+    def test_sharded_storage_writes_only_new_shards(self):
+        with working_directory():
+            cl = self.history()
+            cl.storage = Storage.sharded
+            cl.save()
+
+            with patch("changeloggh.changelog.read_shard", wraps=read_shard) as read:
+                partial = load_changelog(limit=2)
+                self.assertEqual(2, read.call_count)
+
+            partial.add(ChangeType.Fixed, "Fix 5")
+            self.assertEqual("1.5.0", partial.bump(BumpRule.minor))
+            self.assertEqual(
+                [
+                    "./CHANGELOG.md",
+                    f"{CHANGELOG_SHARDS_PATH}/Unreleased.json",
+                    f"{CHANGELOG_SHARDS_PATH}/1.5.0.json",
+                    CHANGELOG_MANIFEST_PATH,
+                ],
+                partial.save(),
+            )
+
+            cl.add(ChangeType.Fixed, "Fix 5")
+            cl.bump(BumpRule.minor)
+            self.assertEqual(cl.to_dict(), load_changelog().to_dict())
+            with open("CHANGELOG.md") as file:
+                self.assertEqual(cl.to_string(), file.read())
+
+    def test_sharded_storage_release_into_history(self):
+        with working_directory():
+            cl = self.history()
+            cl.storage = Storage.sharded
+            cl.save()
+
+            partial = load_changelog(limit=2)
+            partial.add(ChangeType.Fixed, "Backport")
+            with self.assertRaises(Exception) as context:
+                partial.release("1.0.0")
+            self.assertEqual("Version 1.0.0 exists already", str(context.exception))
+
+            partial.release("1.0.1", "2024-01-01")
+            partial.save()
+
+            self.assertIn("1.0.1", [v.version for v in load_changelog().versions])
+
+    def test_load_storage(self):
+        with working_directory():
+            self.history().save()
+            self.assertEqual(Storage.lock, load_storage())
+
+            empty_changelog(REPO_EXAMPLE, Storage.fragments).save()
+            self.assertEqual(Storage.fragments, load_storage())
+
+    def test_collect_fragments(self):
+        with working_directory():
+            cl = self.history()
+            cl.storage = Storage.fragments
+            cl.save()
+            write_fragment({"command": "added", "entries": ["Pending", "Feature 5"]})
+            write_fragment({"command": "fixed", "entries": ["Fix 5"]})
+            write_fragment({"command": "added", "entries": ["Feature 5"]})
+
+            collected = load_changelog(limit=2)
+
+            self.assertEqual(
+                [
+                    {"type": "Added", "entries": ["Pending", "Feature 5"]},
+                    {"type": "Fixed", "entries": ["Fix 5"]},
+                ],
+                collected.to_dict()["versions"][0]["changes"],
+            )
+            self.assertFalse(collected.dirty)
+
+            collected.bump(BumpRule.minor)
+            collected.save()
+
+            self.assertEqual([], os.listdir(CHANGELOG_FRAGMENTS_PATH))
+            cl = load_changelog()
+            self.assertEqual("1.5.0", cl.latest())
+            self.assertEqual(
+                ["Pending", "Feature 5"], cl.to_dict()["versions"][1]["changes"][0]["entries"]
+            )
+
+    def test_raise_error_if_fragment_is_invalid(self):
+        with working_directory():
+            empty_changelog(REPO_EXAMPLE, Storage.fragments).save()
+            path = write_fragment({"command": "unknown", "entries": ["Feature"]})
+
+            with self.assertRaises(Exception) as context:
+                load_changelog()
+
+            self.assertEqual(f"Fragment {path} is not a valid change", str(context.exception))
+
+    def test_import_keeps_entries_intact(self):
+        cl = Changelog(
+            repository=REPO_EXAMPLE,
+            versions=[
+                Version("Unreleased"),
+                Version(
+                    "1.0.0",
+                    "2023-03-17",
+                    [
+                        Change("Added", ["- Leading dash", "Trailing dash -", "Multi\n  line"]),
+                        Change("Security", ["Security patch"]),
+                    ],
+                ),
+            ],
+        )
+
+        with working_directory():
+            cl.save_markdown()
+            imported = parse_changelog()
+
+        self.assertEqual(cl.to_dict(), imported.to_dict())
+
+    def test_import_repository_without_unreleased(self):
+        cl = Changelog(
+            repository=REPO_EXAMPLE,
+            versions=[
+                Version("1.0.1", "2023-03-17", [Change("Fixed", ["Fix"])]),
+                Version("1.0.0", "2023-03-17", [Change("Added", ["Feature"])]),
+            ],
+        )
+
+        with working_directory():
+            cl.save_markdown()
+            imported = parse_changelog()
+
+        self.assertEqual(REPO_EXAMPLE, imported.repository)
+
+    def test_parse_changelog_parallel(self):
+        versions = [Version("Unreleased", changes=[Change("Added", ["Pending\n  work"])])] + [
+            Version(f"1.{minor}.0", "2024-01-01", [Change("Fixed", [f"Fix {minor}"])])
+            for minor in range(50, 0, -1)
+        ]
+        cl = Changelog(repository=REPO_EXAMPLE, versions=versions)
+
+        with working_directory():
+            cl.save_markdown()
+            boundaries = []
+
+            def split(content, chunk_size):
+                boundaries.extend(version_boundaries(content, chunk_size))
+                return boundaries
+
+            with patch("changeloggh.changelog.PARSE_CHUNK_SIZE", 256):
+                with patch("changeloggh.changelog.version_boundaries", side_effect=split):
+                    parsed = parse_changelog_parallel(jobs=2)
+
+            self.assertGreater(len(boundaries), 10)
+            self.assertEqual(cl.to_dict(), parsed.to_dict())
+            self.assertEqual(parse_changelog().to_dict(), parsed.to_dict())
+
+    def test_version_boundaries(self):
+        content = b"# Changelog\n\n## [Unreleased]\n\n## [1.0.0]\n- ## not a header\n## [0.1.0]\n"
+
+        self.assertEqual([0, 13, 30, 59, len(content)], version_boundaries(content, 1))
+        self.assertEqual([0, len(content)], version_boundaries(content, 100))
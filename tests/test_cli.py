@@ -1,12 +1,26 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
 from unittest import TestCase
 from unittest.mock import patch, call, MagicMock
 
 from click.testing import CliRunner
 
 from changeloggh import VERSION
-from changeloggh.changelog import Changelog, ChangeType, BumpRule, Version, Change
+from changeloggh.changelog import (
+    Changelog,
+    Version,
+    Change,
+    Storage,
+    CHANGELOG_QUEUE_PATH,
+    CHANGELOG_MUTEX_PATH,
+    load_changelog,
+)
 from changeloggh.cli import main
 from tests.test_changelog import (
+    working_directory,
     REPO_EXAMPLE,
     CHANGELOG_EXAMPLE,
     JSON_INDENT_EXAMPLE,
@@ -21,6 +35,27 @@ class TestApp(TestCase):
         self.assertEqual(result.exit_code, 0)
         self.assertIn(VERSION, result.output)
 
+    def test_version_matches_pyproject(self):
+        with open(Path(__file__).parent.parent / "pyproject.toml") as file:
+            pyproject = file.read()
+
+        self.assertIn(f'version = "{VERSION}"', pyproject)
+
+    def test_import_cli_without_heavy_dependencies(self):
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, changeloggh.cli; print(' '.join(sys.modules))",
+            ],
+            capture_output=True,
+            text=True,
+        )
+
+        packages = {module.split(".")[0] for module in result.stdout.split()}
+        for package in ["textual", "rich", "jinja2", "semver"]:
+            self.assertNotIn(package, packages)
+
     @patch("changeloggh.cli.Path")
     def test_reject_init_if_file_already_exists(self, mock_class_path):
         runner = CliRunner()
@@ -59,8 +94,8 @@ class TestApp(TestCase):
         runner = CliRunner()
         result = runner.invoke(main, ["init", REPO_EXAMPLE])
 
-        mock_function_empty.assert_called_with(REPO_EXAMPLE)
-        mock_function_empty.return_value.save.assert_called_once()
+        mock_function_empty.assert_called_with(REPO_EXAMPLE, Storage.lock)
+        mock_function_empty.return_value.save_snapshot.assert_called_once()
         self.assertEqual(0, result.exit_code)
 
     @patch("changeloggh.cli.empty_changelog")
@@ -70,8 +105,8 @@ class TestApp(TestCase):
         runner = CliRunner()
         result = runner.invoke(main, ["init", "--force", REPO_EXAMPLE])
 
-        mock_function_empty.assert_called_with(REPO_EXAMPLE)
-        mock_function_empty.return_value.save.assert_called_once()
+        mock_function_empty.assert_called_with(REPO_EXAMPLE, Storage.lock)
+        mock_function_empty.return_value.save_snapshot.assert_called_once()
         self.assertEqual(0, result.exit_code)
 
     @patch("changeloggh.cli.load_changelog")
@@ -98,8 +133,40 @@ class TestApp(TestCase):
         self.assertEqual(0, result.exit_code)
         self.assertEqual(JSON_INDENT_EXAMPLE, result.output.strip())
 
-    @patch("changeloggh.cli.Markdown")
-    @patch("changeloggh.cli.Console")
+    @patch("changeloggh.cli.load_changelog")
+    def test_print_filters(self, mock_function_load):
+        mock_function_load.return_value = Changelog(
+            repository=REPO_EXAMPLE, versions=VERSIONS_EXAMPLE
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(
+            main,
+            ["print", "--format", "text", "--limit", "1", "--until", "1.0.1", "--type", "security"],
+        )
+
+        mock_function_load.assert_called_once_with(limit=1)
+        self.assertEqual(0, result.exit_code)
+        self.assertEqual(
+            "## [1.0.1] - 2023-03-17\n\n### Security\n\n- New patch\n\n"
+            f"[1.0.1]: {REPO_EXAMPLE}/compare/v0.0.1...v1.0.1",
+            result.output.strip()[result.output.index("## [1.0.1]") :],
+        )
+
+    @patch("changeloggh.cli.load_changelog")
+    def test_print_invalid_filters(self, mock_function_load):
+        mock_function_load.return_value = Changelog(
+            repository=REPO_EXAMPLE, versions=VERSIONS_EXAMPLE
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(main, ["print", "--since", "1.0.1", "--until", "0.0.1"])
+
+        self.assertEqual(1, result.exit_code)
+        self.assertEqual("Version 1.0.1 is newer than 0.0.1", result.output.strip())
+
+    @patch("rich.markdown.Markdown")
+    @patch("rich.console.Console")
     @patch("changeloggh.cli.load_changelog")
     def test_print_default(self, mock_function_load, mock_console_function, mock_md_class):
         cl = Changelog(repository=REPO_EXAMPLE, versions=VERSIONS_EXAMPLE)
@@ -112,27 +179,52 @@ class TestApp(TestCase):
         mock_console_function.return_value.print.assert_called_once_with(mock_md_class.return_value)
         self.assertEqual(0, result.exit_code)
 
-    @patch("changeloggh.cli.load_changelog", new_callable=MagicMock())
+    @patch("changeloggh.cli.load_storage", return_value=Storage.lock)
+    @patch("changeloggh.cli.commit")
     @patch("changeloggh.cli.Path")
-    def test_add_changes_file(self, mock_class_path, mock_function_load):
+    def test_add_changes_file(self, mock_class_path, mock_function_commit, mock_function_storage):
+        mock_function_commit.return_value = ([None], ["./CHANGELOG.md", "./changelog.lock"])
         for change in ["added", "changed", "deprecated", "fixed", "removed", "security"]:
             mock_class_path.return_value.exists.return_value = True
-            mock_function_load.return_value = MagicMock()
 
             feature1 = "feature 1"
             feature2 = "feature 2"
             runner = CliRunner()
             result = runner.invoke(main, [change, feature1, feature2])
 
-            mock_function_load.assert_called()
-            mock_function_load.return_value.add.assert_has_calls(
-                [
-                    call(ChangeType[change.capitalize()], feature1),
-                    call(ChangeType[change.capitalize()], feature2),
-                ]
+            mock_function_commit.assert_called_with(
+                [{"command": change, "entries": [feature1, feature2]}]
             )
-            mock_function_load.return_value.save.assert_called_once()
             self.assertEqual(0, result.exit_code)
+            self.assertEqual("Wrote CHANGELOG.md, changelog.lock", result.stderr.strip())
+
+    @patch("changeloggh.cli.load_storage", return_value=Storage.lock)
+    @patch("changeloggh.changelog.load_changelog")
+    @patch("changeloggh.cli.Path")
+    def test_add_changes_with_group_commit(
+        self, mock_class_path, mock_function_load, mock_function_storage
+    ):
+        mock_class_path.return_value.exists.return_value = True
+        cl = Changelog(versions=[Version("Unreleased")])
+        cl.save = MagicMock(return_value=["./CHANGELOG.md"])
+        mock_function_load.return_value = cl
+
+        with working_directory():
+            runner = CliRunner()
+            result = runner.invoke(main, ["added", "feature 1", "feature 2"])
+
+            self.assertEqual([".changeloggh"], os.listdir())
+            self.assertEqual([], os.listdir(CHANGELOG_QUEUE_PATH))
+
+        cl.save.assert_called_once()
+        self.assertEqual(
+            {
+                "version": "Unreleased",
+                "changes": [{"type": "Added", "entries": ["feature 1", "feature 2"]}],
+            },
+            cl.to_dict()["versions"][0],
+        )
+        self.assertEqual(0, result.exit_code)
 
     @patch("changeloggh.cli.Path")
     def test_reject_add_changes_if_file_does_not_exist(self, mock_class_path):
@@ -149,6 +241,118 @@ class TestApp(TestCase):
                 result.output.strip(),
             )
 
+    @patch("changeloggh.cli.Path")
+    @patch("changeloggh.cli.load_changelog")
+    def test_show_text(self, mock_function_load, mock_class_path):
+        mock_class_path.return_value.exists.return_value = True
+        mock_function_load.return_value = Changelog(
+            repository=REPO_EXAMPLE, versions=VERSIONS_EXAMPLE
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(main, ["show", "v1.0.1", "--format", "text"])
+
+        mock_function_load.assert_called_once_with(limit=1)
+        self.assertEqual(0, result.exit_code)
+        self.assertEqual(
+            "## [1.0.1] - 2023-03-17\n\n### Added\n\n- New feature\n- Tests\n\n"
+            "### Security\n\n- New patch",
+            result.output.strip(),
+        )
+
+    @patch("changeloggh.cli.Path")
+    @patch("changeloggh.cli.load_changelog")
+    def test_show_json(self, mock_function_load, mock_class_path):
+        mock_class_path.return_value.exists.return_value = True
+        mock_function_load.return_value = Changelog(
+            repository=REPO_EXAMPLE, versions=VERSIONS_EXAMPLE
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(main, ["show", "0.0.1", "--format", "json"])
+
+        self.assertEqual(0, result.exit_code)
+        self.assertEqual(
+            {
+                "version": "0.0.1",
+                "date": "2023-03-17",
+                "changes": [{"type": "Added", "entries": ["Initial setup"]}],
+            },
+            json.loads(result.output),
+        )
+
+    @patch("changeloggh.cli.Path")
+    @patch("changeloggh.cli.load_changelog")
+    def test_show_missing_version(self, mock_function_load, mock_class_path):
+        mock_class_path.return_value.exists.return_value = True
+        mock_function_load.return_value = Changelog(
+            repository=REPO_EXAMPLE, versions=VERSIONS_EXAMPLE
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(main, ["show", "2.0.0"])
+
+        self.assertEqual(1, result.exit_code)
+        self.assertEqual("Version 2.0.0 does not exist", result.output.strip())
+
+    @patch("changeloggh.cli.Path")
+    @patch("changeloggh.cli.load_changelog")
+    def test_diff(self, mock_function_load, mock_class_path):
+        mock_class_path.return_value.exists.return_value = True
+        mock_function_load.return_value = Changelog(
+            repository=REPO_EXAMPLE, versions=VERSIONS_EXAMPLE
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(main, ["diff", "0.0.1", "Unreleased"])
+
+        mock_function_load.assert_called_once_with(limit=1)
+        self.assertEqual(0, result.exit_code)
+        self.assertEqual(
+            "## [0.0.1...Unreleased]\n\n### Added\n\n- New command\n- New feature\n- Tests\n\n"
+            "### Security\n\n- New patch",
+            result.output.strip(),
+        )
+
+    @patch("changeloggh.cli.Path")
+    @patch("changeloggh.cli.load_changelog")
+    def test_diff_json(self, mock_function_load, mock_class_path):
+        mock_class_path.return_value.exists.return_value = True
+        mock_function_load.return_value = Changelog(
+            repository=REPO_EXAMPLE, versions=VERSIONS_EXAMPLE
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(main, ["diff", "0.0.1", "1.0.1", "--format", "json"])
+
+        self.assertEqual(0, result.exit_code)
+        self.assertEqual(
+            {
+                "from": "0.0.1",
+                "to": "1.0.1",
+                "versions": ["1.0.1"],
+                "changes": [
+                    {"type": "Added", "entries": ["New feature", "Tests"]},
+                    {"type": "Security", "entries": ["New patch"]},
+                ],
+            },
+            json.loads(result.output),
+        )
+
+    @patch("changeloggh.cli.Path")
+    @patch("changeloggh.cli.load_changelog")
+    def test_diff_missing_version(self, mock_function_load, mock_class_path):
+        mock_class_path.return_value.exists.return_value = True
+        mock_function_load.return_value = Changelog(
+            repository=REPO_EXAMPLE, versions=VERSIONS_EXAMPLE
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(main, ["diff", "0.0.1", "2.0.0"])
+
+        self.assertEqual(1, result.exit_code)
+        self.assertEqual("Version 2.0.0 does not exist", result.output.strip())
+
     @patch("changeloggh.cli.Path")
     @patch("changeloggh.cli.load_changelog")
     def test_latest(self, mock_function_load, mock_class_path):
@@ -162,29 +366,28 @@ class TestApp(TestCase):
         self.assertEqual(0, result.exit_code)
         self.assertEqual("1.0.1", result.output.strip())
 
-    @patch("changeloggh.cli.load_changelog")
-    def test_bump_command(self, mock_function_load):
+    @patch("changeloggh.cli.commit")
+    def test_bump_command(self, mock_function_commit):
         for rule, version in [("major", "2.0.0"), ("minor", "1.1.0"), ("patch", "1.0.2")]:
-            mock_function_load.return_value = MagicMock()
-            mock_function_load.return_value.bump.return_value = version
+            mock_function_commit.return_value = ([version], ["./changelog.lock"])
 
             runner = CliRunner()
             result = runner.invoke(main, ["bump", rule])
 
-            mock_function_load.assert_called()
-            mock_function_load.return_value.bump.assert_called_with(BumpRule[rule])
-            mock_function_load.return_value.save.assert_called_once()
+            mock_function_commit.assert_called_with([{"command": "bump", "rule": rule}])
 
             self.assertEqual(0, result.exit_code)
-            self.assertEqual(version, result.output.strip())
+            self.assertEqual(version, result.stdout.strip())
+            self.assertEqual("Wrote changelog.lock", result.stderr.strip())
 
-    @patch("changeloggh.cli.load_changelog")
+    @patch("changeloggh.changelog.load_changelog")
     def test_raise_error_in_bump_command_when_cl_is_empty(self, mock_function_load):
         rule = "major"
         mock_function_load.return_value = Changelog()
 
-        runner = CliRunner()
-        result = runner.invoke(main, ["bump", rule])
+        with working_directory():
+            runner = CliRunner()
+            result = runner.invoke(main, ["bump", rule])
 
         mock_function_load.assert_called()
         self.assertEqual(1, result.exit_code)
@@ -196,29 +399,28 @@ class TestApp(TestCase):
             result.output.strip(),
         )
 
-    @patch("changeloggh.cli.load_changelog")
-    def test_release_command(self, mock_function_load):
+    @patch("changeloggh.cli.commit")
+    def test_release_command(self, mock_function_commit):
         version = "1.0.2"
-        mock_function_load.return_value = MagicMock()
-        mock_function_load.return_value.release.return_value = version
+        mock_function_commit.return_value = ([version], [])
 
         runner = CliRunner()
         result = runner.invoke(main, ["release", version])
 
-        mock_function_load.assert_called()
-        mock_function_load.return_value.release.assert_called_with(version)
-        mock_function_load.return_value.save.assert_called_once()
+        mock_function_commit.assert_called_with([{"command": "release", "version": version}])
 
         self.assertEqual(0, result.exit_code)
-        self.assertEqual(version, result.output.strip())
+        self.assertEqual(version, result.stdout.strip())
+        self.assertEqual("Nothing to write, the files are up to date", result.stderr.strip())
 
-    @patch("changeloggh.cli.load_changelog")
+    @patch("changeloggh.changelog.load_changelog")
     def test_raise_error_in_release_command_when_cl_is_empty(self, mock_function_load):
         version = "1.0.1"
         mock_function_load.return_value = Changelog()
 
-        runner = CliRunner()
-        result = runner.invoke(main, ["release", version])
+        with working_directory():
+            runner = CliRunner()
+            result = runner.invoke(main, ["release", version])
 
         mock_function_load.assert_called()
         self.assertEqual(1, result.exit_code)
@@ -230,7 +432,7 @@ class TestApp(TestCase):
             result.output.strip(),
         )
 
-    @patch("changeloggh.cli.load_changelog")
+    @patch("changeloggh.changelog.load_changelog")
     def test_raise_error_in_release_command_when_version_is_invalid(self, mock_function_load):
         version = "random"
         mock_function_load.return_value = Changelog(
@@ -242,8 +444,9 @@ class TestApp(TestCase):
             ]
         )
 
-        runner = CliRunner()
-        result = runner.invoke(main, ["release", version])
+        with working_directory():
+            runner = CliRunner()
+            result = runner.invoke(main, ["release", version])
 
         mock_function_load.assert_called()
         self.assertEqual(1, result.exit_code)
@@ -293,14 +496,45 @@ class TestApp(TestCase):
         mock_function_parse.return_value.save.assert_called_once()
         self.assertEqual(0, result.exit_code)
 
+    def test_import_many_changelog_files(self):
+        with working_directory():
+            for repository in ["one", "two", "three"]:
+                os.makedirs(f"repos/{repository}")
+                with open(f"repos/{repository}/CHANGELOG.md", "w") as file:
+                    file.write(CHANGELOG_EXAMPLE)
+            with open("repos/three/changelog.lock", "w") as file:
+                file.write("{}")
+
+            runner = CliRunner()
+            result = runner.invoke(
+                main, ["import", "--jobs", "2", "repos/one", "repos/t*/CHANGELOG.md", "missing"]
+            )
+
+            self.assertEqual(1, result.exit_code)
+            self.assertEqual(
+                [
+                    "repos/one/CHANGELOG.md: 3 versions, 5 entries",
+                    "repos/three/CHANGELOG.md: failed, ./changelog.lock file already exists."
+                    " Use --force to override it",
+                    "repos/two/CHANGELOG.md: 3 versions, 5 entries",
+                    "missing: failed, file does not exist",
+                    "2 imported, 2 failed",
+                ],
+                result.output.strip().splitlines(),
+            )
+            with open("repos/two/changelog.lock") as file:
+                self.assertEqual(JSON_INDENT_EXAMPLE, file.read())
+
+    @patch("changeloggh.cli.file_lock")
     @patch("changeloggh.cli.load_changelog", new_callable=MagicMock())
     @patch("changeloggh.cli.Path")
-    def test_update(self, mock_class_path, mock_function_load):
+    def test_update(self, mock_class_path, mock_function_load, mock_function_lock):
         mock_class_path.return_value.exists.return_value = True
 
         runner = CliRunner()
         result = runner.invoke(main, ["update"])
 
+        mock_function_lock.assert_called_with(CHANGELOG_MUTEX_PATH)
         mock_function_load.assert_called()
         mock_function_load.return_value.save.assert_called_once()
         self.assertEqual(0, result.exit_code)
@@ -332,3 +566,238 @@ class TestApp(TestCase):
             './changelog.lock file does not exist. Use "init" command to initialize.',
             result.output.strip(),
         )
+
+    @patch("changeloggh.cli.load_storage", return_value=Storage.lock)
+    @patch("changeloggh.cli.load_changelog")
+    @patch("changeloggh.cli.send")
+    @patch("changeloggh.cli.Path")
+    def test_forward_to_daemon(
+        self, mock_class_path, mock_function_send, mock_function_load, mock_function_storage
+    ):
+        mock_class_path.return_value.exists.return_value = True
+        for command, request in [
+            (["latest"], {"command": "latest"}),
+            (["fixed", "fix 1"], {"command": "fixed", "entries": ["fix 1"]}),
+            (["bump", "patch"], {"command": "bump", "rule": "patch"}),
+            (["release", "1.0.2"], {"command": "release", "version": "1.0.2"}),
+            (["print", "--format", "text"], {"command": "print", "format": "text"}),
+            (
+                ["print", "--limit", "2", "--type", "Fixed, Security"],
+                {"command": "print", "format": "rich", "limit": 2, "types": ["Fixed", "Security"]},
+            ),
+        ]:
+            mock_function_send.return_value = {"output": "1.0.2", "written": []}
+
+            runner = CliRunner()
+            result = runner.invoke(main, command)
+
+            mock_function_send.assert_called_with(request)
+            mock_function_load.assert_not_called()
+            self.assertEqual(0, result.exit_code)
+
+    @patch("changeloggh.cli.send")
+    def test_forward_error_to_daemon(self, mock_function_send):
+        mock_function_send.return_value = {"error": "There are not available changes"}
+
+        runner = CliRunner()
+        result = runner.invoke(main, ["bump", "patch"])
+
+        self.assertEqual(1, result.exit_code)
+        self.assertEqual(
+            (
+                "There are not available changes. Use"
+                " {added|changed|deprecated|removed|fixed|security} commands to add changes."
+            ),
+            result.output.strip(),
+        )
+
+    @patch("changeloggh.changelog.load_changelog")
+    @patch("changeloggh.cli.Path")
+    def test_batch(self, mock_class_path, mock_function_load):
+        mock_class_path.return_value.exists.return_value = True
+        cl = Changelog(repository=REPO_EXAMPLE, versions=[Version("Unreleased")])
+        cl.save = MagicMock(return_value=["./CHANGELOG.md", "./changelog.lock"])
+        mock_function_load.return_value = cl
+
+        with working_directory():
+            runner = CliRunner()
+            result = runner.invoke(
+                main,
+                ["batch"],
+                input=(
+                    '{"command": "added", "entries": ["feature 1", "feature 2"]}\n'
+                    '{"command": "fixed", "entries": ["fix 1"]}\n'
+                    '{"command": "bump", "rule": "minor"}\n'
+                ),
+            )
+
+        mock_function_load.assert_called_once()
+        cl.save.assert_called_once()
+        self.assertEqual("0.1.0", cl.latest())
+        self.assertEqual(0, result.exit_code)
+        self.assertEqual("3 operations applied", result.stdout.strip())
+        self.assertEqual("Wrote CHANGELOG.md, changelog.lock", result.stderr.strip())
+
+    @patch("changeloggh.changelog.load_changelog")
+    @patch("changeloggh.cli.Path")
+    def test_reject_batch_if_an_operation_fails(self, mock_class_path, mock_function_load):
+        mock_class_path.return_value.exists.return_value = True
+        cl = Changelog(versions=[Version("Unreleased")])
+        cl.save = MagicMock()
+        mock_function_load.return_value = cl
+
+        with working_directory():
+            runner = CliRunner()
+            result = runner.invoke(
+                main,
+                ["batch"],
+                input='{"command": "added", "entries": ["feature"]}\n{"command": "bump"}\n',
+            )
+
+        cl.save.assert_not_called()
+        self.assertEqual(1, result.exit_code)
+        self.assertEqual(
+            "Operation 2 failed: Invalid bump rule None. Nothing was saved.", result.output.strip()
+        )
+
+    @patch("changeloggh.cli.empty_changelog")
+    def test_init_journal_storage(self, mock_function_empty):
+        runner = CliRunner()
+        result = runner.invoke(main, ["init", "--force", "--storage", "journal", REPO_EXAMPLE])
+
+        mock_function_empty.assert_called_with(REPO_EXAMPLE, Storage.journal)
+        mock_function_empty.return_value.save_snapshot.assert_called_once()
+        self.assertEqual(0, result.exit_code)
+
+    def test_add_changes_with_fragments_storage(self):
+        with working_directory():
+            runner = CliRunner()
+            runner.invoke(main, ["init", "--storage", "fragments", REPO_EXAMPLE])
+            result = runner.invoke(main, ["added", "feature 1"])
+
+            self.assertEqual(0, result.exit_code)
+            self.assertEqual(1, len(os.listdir("changelog.unreleased")))
+
+            result = runner.invoke(main, ["bump", "minor"])
+
+            self.assertEqual("0.1.0", result.stdout.strip())
+            self.assertEqual([], os.listdir("changelog.unreleased"))
+            self.assertEqual(
+                [{"type": "Added", "entries": ["feature 1"]}],
+                load_changelog().to_dict()["versions"][1]["changes"],
+            )
+
+    def test_init_sharded_storage(self):
+        with working_directory():
+            runner = CliRunner()
+            result = runner.invoke(main, ["init", "--storage", "sharded", REPO_EXAMPLE])
+
+            self.assertEqual(0, result.exit_code)
+            self.assertEqual(
+                ["Unreleased.json", "manifest.json"], sorted(os.listdir("changelog.d"))
+            )
+            self.assertEqual(Storage.sharded, load_changelog().storage)
+
+    @patch("changeloggh.cli.file_lock")
+    @patch("changeloggh.cli.load_changelog", new_callable=MagicMock())
+    @patch("changeloggh.cli.Path")
+    def test_update_journal_storage(self, mock_class_path, mock_function_load, mock_function_lock):
+        mock_class_path.return_value.exists.return_value = True
+        mock_function_load.return_value.storage = Storage.journal
+
+        runner = CliRunner()
+        result = runner.invoke(main, ["update"])
+
+        mock_function_load.return_value.save_markdown.assert_called_once()
+        mock_function_load.return_value.save.assert_not_called()
+        self.assertEqual(0, result.exit_code)
+
+    @patch("changeloggh.cli.file_lock")
+    @patch("changeloggh.cli.load_changelog", new_callable=MagicMock())
+    @patch("changeloggh.cli.Path")
+    def test_compact(self, mock_class_path, mock_function_load, mock_function_lock):
+        mock_class_path.return_value.exists.return_value = True
+
+        runner = CliRunner()
+        result = runner.invoke(main, ["compact"])
+
+        mock_function_load.return_value.save_snapshot.assert_called_once()
+        self.assertEqual(0, result.exit_code)
+
+    def test_dedupe(self):
+        with working_directory():
+            Changelog(
+                versions=[
+                    Version("Unreleased", changes=[Change("Added", ["New", " new "])]),
+                    Version("1.0.0", "2023-03-17", [Change("Fixed", ["Fix", "Fix", "Other"])]),
+                ]
+            ).save()
+
+            runner = CliRunner()
+            result = runner.invoke(main, ["dedupe"])
+            again = runner.invoke(main, ["dedupe"])
+
+            self.assertEqual(0, result.exit_code)
+            self.assertEqual("2 duplicated entries removed", result.stdout.strip())
+            self.assertEqual("Wrote CHANGELOG.md, changelog.lock", result.stderr.strip())
+            self.assertEqual(
+                [["New"], ["Fix", "Other"]],
+                [
+                    version["changes"][0]["entries"]
+                    for version in load_changelog().to_dict()["versions"]
+                ],
+            )
+            self.assertEqual("0 duplicated entries removed", again.stdout.strip())
+            self.assertEqual("Nothing to write, the files are up to date", again.stderr.strip())
+
+    def test_search(self):
+        with working_directory():
+            Changelog(repository=REPO_EXAMPLE, versions=VERSIONS_EXAMPLE).save()
+
+            runner = CliRunner()
+            result = runner.invoke(main, ["search", "new", "NOT", "feature"])
+            missing = runner.invoke(main, ["search", "missing"])
+            invalid = runner.invoke(main, ["search", "new", "AND"])
+
+            self.assertEqual(0, result.exit_code)
+            self.assertEqual(
+                "[1.0.1] - 2023-03-17 Security: New patch\n[Unreleased] Added: New command",
+                "\n".join(sorted(result.output.strip().splitlines())),
+            )
+            self.assertEqual("No entries found", missing.output.strip())
+            self.assertEqual(1, invalid.exit_code)
+            self.assertEqual("Invalid query new AND", invalid.output.strip())
+
+    def test_stats(self):
+        with working_directory():
+            Changelog(repository=REPO_EXAMPLE, versions=VERSIONS_EXAMPLE).save()
+
+            runner = CliRunner()
+            result = runner.invoke(main, ["stats", "--by", "release", "--format", "csv"])
+            summary = runner.invoke(main, ["stats", "--format", "json"])
+
+            self.assertEqual(0, result.exit_code)
+            self.assertEqual(
+                "version,date,days,Added,Changed,Deprecated,Fixed,Removed,Security,fixed_share\n"
+                "0.0.1,2023-03-17,,1,0,0,0,0,0,0.0\n"
+                "1.0.1,2023-03-17,0,2,0,0,0,0,1,0.0\n",
+                result.output,
+            )
+            self.assertEqual(
+                {"month": "2023-03", "releases": 2, "Added": 3, "Security": 1},
+                {k: v for k, v in json.loads(summary.output)["months"][0].items() if v != 0},
+            )
+            self.assertEqual(1, json.loads(summary.output)["summary"]["unreleased"])
+
+    @patch("changeloggh.cli.Path")
+    def test_reject_compact_if_file_does_not_exist(self, mock_class_path):
+        mock_class_path.return_value.exists.return_value = False
+
+        runner = CliRunner()
+        result = runner.invoke(main, ["compact"])
+
+        self.assertEqual(1, result.exit_code)
+        self.assertEqual(
+            './changelog.lock file does not exist. Use "init" command to initialize.',
+            result.output.strip(),
+        )
@@ -0,0 +1,113 @@
+import os
+import tempfile
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+from changeloggh.changelog import empty_changelog, load_changelog, Changelog, ChangeType
+from changeloggh.daemon import create_server, send, CHANGELOG_SOCKET_PATH
+from tests.test_changelog import REPO_EXAMPLE
+
+
+class TestApp(TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        empty_changelog(REPO_EXAMPLE).save()
+
+        self.server = create_server(delay=0.01)
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.01}
+        )
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_no_daemon(self):
+        self.assertIsNone(send({"command": "latest"}, "./missing.sock"))
+
+    def test_remove_socket_on_close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.assertFalse(os.path.exists(CHANGELOG_SOCKET_PATH))
+
+    def test_reject_second_daemon(self):
+        with self.assertRaises(Exception) as context:
+            create_server()
+
+        self.assertIn("There is a daemon running", str(context.exception))
+
+    def test_add_and_release(self):
+        written = ["./CHANGELOG.md", "./changelog.lock"]
+        self.assertEqual(
+            {"output": None, "written": written}, send({"command": "fixed", "entries": ["Fix"]})
+        )
+        self.assertEqual(
+            {"output": "1.0.0", "written": written},
+            send({"command": "release", "version": "1.0.0"}),
+        )
+        self.assertEqual({"output": "1.0.0"}, send({"command": "latest"}))
+
+        cl = load_changelog()
+        self.assertEqual("1.0.0", cl.latest())
+        self.assertEqual(cl.to_string(), send({"command": "print"})["output"])
+        self.assertEqual(
+            {"output": cl.show("1.0.0", "json")},
+            send({"command": "show", "version": "1.0.0", "format": "json"}),
+        )
+        self.assertEqual(
+            {"output": cl.select(limit=1).to_string()},
+            send({"command": "print", "limit": 1}),
+        )
+        self.assertEqual(
+            {"output": cl.diff("1.0.0", "Unreleased")},
+            send({"command": "diff", "from": "1.0.0", "to": "Unreleased"}),
+        )
+
+    def test_return_errors(self):
+        response = send({"command": "bump", "rule": "patch"})
+        self.assertEqual({"error": "There are not available changes"}, response)
+        response = send({"command": "show", "version": "2.0.0"})
+        self.assertEqual({"error": "Version 2.0.0 does not exist"}, response)
+
+    def test_coalesce_writes(self):
+        with patch.object(Changelog, "save", autospec=True, side_effect=Changelog.save) as save:
+            threads = [
+                threading.Thread(target=send, args=({"command": "added", "entries": [str(i)]},))
+                for i in range(20)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertLess(save.call_count, 20)
+        self.assertEqual(20, len(load_changelog().versions[0].changes[0].entries))
+
+    def test_reload_when_lock_changes(self):
+        cl = load_changelog()
+        cl.add(ChangeType.Added, "Edited by hand")
+        cl.release("2.0.0")
+        cl.save()
+
+        self.assertEqual({"output": "2.0.0"}, send({"command": "latest"}))
+
+    def test_drop_mutations_that_were_not_saved(self):
+        with patch.object(Changelog, "save", side_effect=Exception("Disk full")):
+            response = send({"command": "fixed", "entries": ["First"]})
+        self.assertEqual({"error": "Disk full"}, response)
+
+        send({"command": "added", "entries": ["Second"]})
+
+        cl = load_changelog()
+        self.assertEqual(
+            [("Added", ("Second",))],
+            [(change.change_type, tuple(change.entries)) for change in cl.versions[0].changes],
+        )
+        self.assertEqual(cl.to_string(), send({"command": "print"})["output"])
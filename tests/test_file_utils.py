@@ -0,0 +1,66 @@
+import os
+import stat
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+from changeloggh.file_utils import write_atomic, write_if_changed, file_lock
+from tests.test_changelog import working_directory
+
+
+class TestApp(TestCase):
+    def test_write_atomic(self):
+        with working_directory():
+            write_atomic("./file.txt", "old")
+            os.chmod("./file.txt", 0o640)
+
+            write_atomic("./file.txt", "new")
+
+            self.assertEqual(["file.txt"], os.listdir())
+            self.assertEqual(0o640, stat.S_IMODE(os.stat("./file.txt").st_mode))
+            with open("./file.txt") as file:
+                self.assertEqual("new", file.read())
+
+    def test_keep_old_content_if_write_fails(self):
+        with working_directory():
+            write_atomic("./file.txt", "old")
+
+            with patch("os.replace", side_effect=OSError("disk full")):
+                with self.assertRaises(OSError):
+                    write_atomic("./file.txt", "new")
+
+            self.assertEqual(["file.txt"], os.listdir())
+            with open("./file.txt") as file:
+                self.assertEqual("old", file.read())
+
+    def test_file_lock_is_exclusive(self):
+        events = []
+
+        def hold(name):
+            with file_lock("./state/mutex"):
+                events.append(f"{name} in")
+                time.sleep(0.05)
+                events.append(f"{name} out")
+
+        with working_directory():
+            threads = [threading.Thread(target=hold, args=(name,)) for name in "ab"]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(events[0].split()[0], events[1].split()[0])
+        self.assertEqual(events[2].split()[0], events[3].split()[0])
+
+    def test_write_if_changed(self):
+        with working_directory():
+            self.assertTrue(write_if_changed("./file.txt", "old"))
+            os.utime("./file.txt", ns=(0, 0))
+
+            self.assertFalse(write_if_changed("./file.txt", "old"))
+            self.assertEqual(0, os.stat("./file.txt").st_mtime_ns)
+
+            self.assertTrue(write_if_changed("./file.txt", "new"))
+            with open("./file.txt") as file:
+                self.assertEqual("new", file.read())
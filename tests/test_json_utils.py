@@ -0,0 +1,47 @@
+import io
+import json
+from unittest import TestCase
+from unittest.mock import patch
+
+from changeloggh.json_utils import JsonStreamReader
+
+
+class TestApp(TestCase):
+    def test_read_values_across_chunks(self):
+        reader = JsonStreamReader(io.StringIO('{"a": [{"b": "long value"}, 2, 3]}'), chunk_size=3)
+
+        reader.expect("{")
+        self.assertEqual("a", reader.value())
+        reader.expect(":")
+        reader.expect("[")
+        self.assertEqual({"b": "long value"}, reader.value())
+        self.assertEqual(",", reader.expect(",]"))
+        self.assertEqual(" 2, 3]}", reader.rest())
+
+    def test_object_hook(self):
+        reader = JsonStreamReader(io.StringIO('[{"a": 1}]'), object_hook=lambda obj: obj["a"])
+
+        reader.expect("[")
+
+        self.assertEqual(1, reader.value())
+
+    def test_raise_error_on_unexpected_character(self):
+        reader = JsonStreamReader(io.StringIO("  [1]"))
+
+        with self.assertRaises(ValueError):
+            reader.expect("{")
+
+    def test_raise_error_on_truncated_value(self):
+        reader = JsonStreamReader(io.StringIO('{"a'), chunk_size=2)
+
+        with self.assertRaises(json.JSONDecodeError):
+            reader.value()
+
+    def test_large_value_is_decoded_a_few_times(self):
+        content = json.dumps([{"version": f"1.0.{patch}"} for patch in range(10000)])
+        reader = JsonStreamReader(io.StringIO(content), chunk_size=16)
+
+        with patch.object(reader, "decoder", wraps=reader.decoder) as decoder:
+            self.assertEqual(10000, len(reader.value()))
+
+        self.assertLess(decoder.raw_decode.call_count, 20)
@@ -0,0 +1,44 @@
+from unittest import TestCase
+
+from changeloggh.markdown_utils import tokenize, repository_from_link
+
+
+class TestApp(TestCase):
+    def test_tokenize(self):
+        lines = [
+            "# Changelog\n",
+            "\n",
+            "## [Unreleased]\n",
+            "## [1.0.0] - 2023-03-17\n",
+            "### Added\n",
+            "- Entry - with dashes -\n",
+            "  second line\n",
+            "#### Not a change\n",
+            "[1.0.0]: https://github.com/user/repo/releases/tag/v1.0.0\n",
+        ]
+
+        self.assertEqual(
+            [
+                ("text", "# Changelog"),
+                ("blank",),
+                ("version", "Unreleased", None),
+                ("version", "1.0.0", "2023-03-17"),
+                ("change", "Added"),
+                ("entry", "Entry - with dashes -"),
+                ("continuation", "  second line"),
+                ("text", "#### Not a change"),
+                ("link", "1.0.0", "https://github.com/user/repo/releases/tag/v1.0.0"),
+            ],
+            list(tokenize(lines)),
+        )
+
+    def test_repository_from_link(self):
+        self.assertEqual(
+            "https://github.com/user/repo",
+            repository_from_link("https://github.com/user/repo/compare/v1.0.0...HEAD"),
+        )
+        self.assertEqual(
+            "https://github.com/user/repo",
+            repository_from_link("https://github.com/user/repo/releases/tag/v1.0.0"),
+        )
+        self.assertIsNone(repository_from_link("https://example.com"))
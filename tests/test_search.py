@@ -0,0 +1,175 @@
+import os
+from contextlib import closing
+from unittest import TestCase
+
+from changeloggh.changelog import (
+    CHANGELOG_INDEX_PATH,
+    CHANGELOG_LOCK_PATH,
+    Change,
+    Changelog,
+    ChangeType,
+    Version,
+    commit,
+    load_changelog,
+)
+from changeloggh.search import connect, search, to_fts_query, update_index
+from tests.test_changelog import REPO_EXAMPLE, working_directory
+
+
+def history() -> Changelog:
+    return Changelog(
+        repository=REPO_EXAMPLE,
+        versions=[
+            Version("Unreleased", changes=[Change("Added", ["Export to csv"])]),
+            Version(
+                "1.1.0",
+                "2023-03-18",
+                [Change("Fixed", ["Fix login timeout", "Fix session expired page"])],
+            ),
+            Version(
+                "1.0.0",
+                "2023-03-17",
+                [Change("Added", ["Login page", "Logout button"]), Change("Security", ["Csrf"])],
+            ),
+        ],
+    )
+
+
+def entries(results: list[dict]) -> list[str]:
+    return sorted(result["entry"] for result in results)
+
+
+def indexed_versions() -> dict[str, tuple]:
+    with closing(connect()) as connection:
+        return {
+            version: (fingerprint, first, last)
+            for version, fingerprint, first, last in connection.execute("SELECT * FROM versions")
+        }
+
+
+class TestApp(TestCase):
+    def test_search(self):
+        with working_directory():
+            history().save()
+
+            results = search("login timeout")
+
+            self.assertEqual(
+                [
+                    {
+                        "version": "1.1.0",
+                        "type": "Fixed",
+                        "date": "2023-03-18",
+                        "entry": "Fix login timeout",
+                    }
+                ],
+                results,
+            )
+            self.assertTrue(os.path.exists(CHANGELOG_INDEX_PATH))
+
+    def test_boolean_and_prefix_queries(self):
+        with working_directory():
+            history().save()
+
+            self.assertEqual(
+                ["Fix login timeout", "Login page", "Logout button"], entries(search("log*"))
+            )
+            self.assertEqual(
+                ["Csrf", "Fix login timeout", "Login page"], entries(search("login OR csrf"))
+            )
+            self.assertEqual(["Login page"], entries(search("login NOT timeout")))
+            self.assertEqual(
+                ["Fix login timeout", "Fix session expired page"],
+                entries(search('fix AND ("session expired" OR timeout)')),
+            )
+            self.assertEqual([], search("missing"))
+
+    def test_newest_entries_first(self):
+        with working_directory():
+            history().save()
+
+            self.assertEqual(
+                ["Export to csv", "Fix login timeout", "Fix session expired page", "Login page"],
+                [result["entry"] for result in search("export OR fix OR login")],
+            )
+            self.assertEqual(
+                ["Fix login timeout"], [result["entry"] for result in search("fix", limit=1)]
+            )
+
+    def test_raise_error_if_query_is_invalid(self):
+        with working_directory():
+            history().save()
+
+            with self.assertRaisesRegex(Exception, "Invalid query login AND"):
+                search("login AND")
+            with self.assertRaisesRegex(Exception, "Empty query"):
+                search('""')
+
+    def test_to_fts_query(self):
+        self.assertEqual('"login" "time"*', to_fts_query("login time*"))
+        self.assertEqual('( "a" OR "b c" ) NOT "d""e"', to_fts_query('(a OR "b c") NOT d"e'))
+
+    def test_save_updates_only_changed_versions(self):
+        with working_directory():
+            history().save()
+            search("login")
+            before = indexed_versions()
+
+            commit([{"command": "added", "entries": ["Import from json"]}])
+            after = indexed_versions()
+
+            self.assertEqual(before["1.0.0"], after["1.0.0"])
+            self.assertEqual(before["1.1.0"], after["1.1.0"])
+            self.assertNotEqual(before["Unreleased"], after["Unreleased"])
+            self.assertEqual(0, update_index(load_changelog()))
+            self.assertEqual(
+                ["Export to csv", "Import from json"], entries(search("export OR import"))
+            )
+
+    def test_refresh_after_hand_edits(self):
+        with working_directory():
+            history().save()
+            search("login")
+
+            with open(CHANGELOG_LOCK_PATH) as file:
+                lock = file.read()
+            with open(CHANGELOG_LOCK_PATH, "w") as file:
+                file.write(lock.replace("Logout button", "Sign out button"))
+
+            self.assertEqual([], search("logout"))
+            self.assertEqual(["Sign out button"], entries(search("sign")))
+
+    def test_newest_entries_first_after_editing_an_old_version(self):
+        with working_directory():
+            history().save()
+            search("login")
+
+            with open(CHANGELOG_LOCK_PATH) as file:
+                lock = file.read()
+            with open(CHANGELOG_LOCK_PATH, "w") as file:
+                file.write(lock.replace("Logout button", "Logout link"))
+
+            self.assertEqual(
+                ["Export to csv", "Fix login timeout", "Fix session expired page", "Login page"],
+                [result["entry"] for result in search("export OR fix OR login")],
+            )
+            self.assertEqual(
+                ["Fix login timeout"], [result["entry"] for result in search("login", limit=1)]
+            )
+
+    def test_partial_load_does_not_update_a_stale_index(self):
+        with working_directory():
+            history().save()
+            search("login")
+            with open(CHANGELOG_LOCK_PATH) as file:
+                lock = file.read()
+            with open(CHANGELOG_LOCK_PATH, "w") as file:
+                file.write(lock.replace("Logout button", "Sign out button"))
+
+            cl = load_changelog(limit=1)
+            cl.add(ChangeType.Fixed, "Fix export")
+
+            self.assertEqual(0, update_index(cl))
+            cl.save()
+            self.assertEqual(["Export to csv", "Fix export"], entries(search("export")))
+            self.assertEqual(["Sign out button"], entries(search("sign")))
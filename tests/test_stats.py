@@ -0,0 +1,121 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from changeloggh.changelog import Change, Version
+from changeloggh.stats import Stats
+
+VERSIONS = [
+    Version("Unreleased", changes=[Change("Added", ["Pending 1", "Pending 2"])]),
+    Version(
+        "1.2.0",
+        "2023-04-02",
+        [Change("Fixed", ["Fix 3"]), Change("Performance", ["Faster load"])],
+    ),
+    Version("1.1.0", "2023-03-20", [Change("Added", ["Feature 2"]), Change("Fixed", ["Fix 2"])]),
+    Version("1.0.0", "2023-03-17", [Change("Added", ["Feature 1", "Tests"])]),
+    Version("0.1.0", None, [Change("Security", ["Patch"])]),
+]
+
+
+def counts(row: dict) -> dict:
+    return {key: value for key, value in row.items() if value}
+
+
+class TestApp(TestCase):
+    def test_release_rows(self):
+        stats = Stats().count(version.to_dict() for version in VERSIONS)
+
+        self.assertEqual(
+            [
+                {"version": "0.1.0", "Security": 1},
+                {"version": "1.0.0", "date": "2023-03-17", "Added": 2},
+                {"version": "1.1.0", "date": "2023-03-20", "days": 3, "Added": 1, "Fixed": 1},
+                {
+                    "version": "1.2.0",
+                    "date": "2023-04-02",
+                    "days": 13,
+                    "Fixed": 1,
+                    "Performance": 1,
+                },
+            ],
+            [
+                {key: value for key, value in counts(row).items() if key != "fixed_share"}
+                for row in stats.rows("release")
+            ],
+        )
+        self.assertEqual(
+            [None, 0.0, 0.5, 1.0], [row["fixed_share"] for row in stats.rows("release")]
+        )
+
+    def test_month_rows(self):
+        stats = Stats().count(version.to_dict() for version in VERSIONS)
+
+        self.assertEqual(
+            [
+                {"month": "2023-03", "releases": 2, "Added": 3, "Fixed": 1, "fixed_share": 0.25},
+                {
+                    "month": "2023-04",
+                    "releases": 1,
+                    "Fixed": 1,
+                    "Performance": 1,
+                    "fixed_share": 1.0,
+                },
+            ],
+            [counts(row) for row in stats.rows("month")],
+        )
+
+    def test_summary(self):
+        summary = Stats().count(version.to_dict() for version in VERSIONS).summary()
+
+        self.assertEqual(
+            {
+                "releases": 4,
+                "entries": 7,
+                "unreleased": 2,
+                "Added": 3,
+                "Fixed": 2,
+                "Security": 1,
+                "Performance": 1,
+                "fixed_share": 0.4,
+                "days_min": 3,
+                "days_median": 8,
+                "days_mean": 8,
+                "days_max": 13,
+            },
+            counts(summary),
+        )
+
+    def test_empty_changelog(self):
+        stats = Stats().count([{"version": "Unreleased"}])
+
+        self.assertEqual([], stats.rows("release"))
+        self.assertEqual("month\n", stats.to_csv("month"))
+        self.assertIsNone(stats.summary()["fixed_share"])
+
+    def test_to_csv(self):
+        stats = Stats().count(version.to_dict() for version in VERSIONS[:2])
+
+        self.assertEqual(
+            "version,date,days,Added,Changed,Deprecated,Fixed,Removed,Security,Performance,"
+            "fixed_share\n1.2.0,2023-04-02,,0,0,0,1,0,0,1,1.0\n",
+            stats.to_csv("release"),
+        )
+
+    def test_counters_grow_by_blocks(self):
+        versions = [
+            {
+                "version": f"1.0.{patch}",
+                "date": f"2023-01-{patch % 28 + 1:02}",
+                "changes": [{"type": "Fixed" if patch < 5 else "Custom", "entries": ["Entry"]}],
+            }
+            for patch in range(10, -1, -1)
+        ]
+
+        with patch("changeloggh.stats.STATS_BLOCK", 2):
+            stats = Stats().count(versions)
+
+        rows = stats.rows("release")
+        self.assertEqual(11, len(stats.days))
+        self.assertEqual([1] * 5 + [0] * 6, [row["Fixed"] for row in rows])
+        self.assertEqual([0] * 5 + [1] * 6, [row["Custom"] for row in rows])
+        self.assertEqual([None] + [1] * 10, [row["days"] for row in rows])
@@ -1,7 +1,16 @@
+import random
 from unittest import TestCase
 
 from changeloggh.changelog import Version, Change
-from changeloggh.version_utils import version_comparator, change_comparator
+from changeloggh.version_utils import (
+    version_comparator,
+    change_comparator,
+    change_key,
+    insert_version,
+    sort_versions,
+    version_key,
+    version_range,
+)
 
 
 class TestApp(TestCase):
@@ -49,3 +58,87 @@ class TestApp(TestCase):
         data.sort(key=change_comparator())
 
         self.assertEqual(expected_data, data)
+
+    def test_sort_versions_by_key(self):
+        data = [
+            Version("1.0.0-rc.1"),
+            Version("1.0.0"),
+            Version("1.0.0-alpha"),
+            Version("1.0.0-alpha.beta"),
+            Version("Unreleased"),
+            Version("1.0.0-alpha.1"),
+            Version("1.0.0-beta.11"),
+            Version("1.0.0-beta.2"),
+            Version("1.0.0-beta"),
+            Version("10.0.0"),
+            Version("2.0.0+build"),
+        ]
+        expected_data = sorted(data, key=version_comparator())
+
+        sort_versions(data)
+
+        self.assertEqual(
+            [version.version for version in expected_data], [version.version for version in data]
+        )
+
+    def test_version_key_ignores_build_and_case(self):
+        self.assertEqual(version_key("1.0.0"), version_key("1.0.0+build.1"))
+        self.assertEqual(version_key("Unreleased"), version_key("unreleased"))
+        self.assertEqual(version_key("1.0.0-RC.1"), version_key("1.0.0-rc.1"))
+
+    def test_raise_error_if_version_is_not_semver(self):
+        for version in ["", "1.0", "01.0.0", "1.0.0-", "v1.0.0"]:
+            with self.assertRaisesRegex(ValueError, "is not valid SemVer string"):
+                version_key(version)
+
+    def test_sort_changes_by_key(self):
+        data = [Change("fixed"), Change("Security"), Change("Added"), Change("changed")]
+
+        data.sort(key=change_key)
+
+        self.assertEqual(["Added", "changed", "fixed", "Security"], [c.change_type for c in data])
+
+    def test_insert_version_keeps_comparator_order(self):
+        generator = random.Random(17)
+        for _ in range(200):
+            names = [
+                "Unreleased" if generator.random() < 0.05 else random_version(generator)
+                for _ in range(generator.randint(0, 30))
+            ]
+            data = []
+
+            for name in names:
+                insert_version(data, Version(name))
+
+            expected_data = sorted((Version(name) for name in names), key=version_comparator())
+            self.assertEqual(
+                [version.version for version in expected_data],
+                [version.version for version in data],
+            )
+
+    def test_version_range_matches_a_scan(self):
+        generator = random.Random(23)
+        for _ in range(200):
+            data = [Version(random_version(generator)) for _ in range(generator.randint(0, 30))]
+            data.append(Version("Unreleased"))
+            sort_versions(data)
+            oldest, newest = sorted(
+                [version_key(random_version(generator)), version_key(random_version(generator))]
+            )
+            if generator.random() < 0.1:
+                newest = version_key("Unreleased")
+
+            self.assertEqual(
+                [version for version in data if oldest < version.sort_key <= newest],
+                data[version_range(data, oldest, newest)],
+            )
+
+
+def random_version(generator: random.Random) -> str:
+    version = ".".join(str(generator.randint(0, 3)) for _ in range(3))
+    if generator.random() < 0.3:
+        identifiers = ["alpha", "beta", "rc", "0", "1", "11", "2", "x-1"]
+        version += "-" + ".".join(generator.sample(identifiers, generator.randint(1, 3)))
+    if generator.random() < 0.1:
+        version += "+build"
+    return version